@@ -1,14 +1,28 @@
 import os
 import sys
+import time
+from typing import TYPE_CHECKING
 from PyQt6 import QtCore, QtGui, QtWidgets
 from .config import CONFIG, WinHotkey
 from .hotkey import HotkeyFilter, register_hotkey, unregister_hotkey
-from .hotkey_dialog import HotkeyCaptureDialog
-from .overlay import SnipOverlay
-from .preview import PreviewWindow
+from .perf import PERF, PERF_EXPORT_PATH
+from .session import Session, default_path, load_session, save_session, validate
+from .startup import STARTUP
 from .style import Style
 from .version import __version__
 
+if TYPE_CHECKING:
+    # The capture, preview and overlay modules (and NumPy behind them) are imported on
+    # first use so the tray comes up without them.
+    from .capture_worker import CaptureService
+    from .filters import FilterPool
+    from .overlay import SnipOverlay
+    from .preview import PreviewWindow
+    from .stream import StreamServer
+
+# Selection target meaning "the primary preview", resolved only once the selection is made.
+_PRIMARY = object()
+
 
 class App(QtWidgets.QApplication):
     def __init__(self, argv):
@@ -17,18 +31,22 @@ class App(QtWidgets.QApplication):
         self.setApplicationName("LoL-Map_Tool")
         self.setApplicationVersion(__version__)
         self.setQuitOnLastWindowClosed(False)
+        STARTUP.mark("qt app created")
 
-        self._overlay = SnipOverlay(CONFIG)
-        self._preview = PreviewWindow(self._on_hotkey, self._change_hotkey, self.quit, CONFIG, __version__)
-        self._overlay.selectionMade.connect(self._preview.set_rect)
-        self._overlay.canceled.connect(self._preview.stop_preview)
-        self._preview.minimized.connect(self._on_preview_minimized)
-        self._preview.status_changed.connect(self._on_preview_status_changed)
+        # Built on first use; most launches sit in the tray until the hotkey is pressed.
+        self._capture = None
+        self._overlay = None
+        self._preview = None
+        self._extra_previews = []
+        self._stream = None
+        self._filter_pool = None
+        self._select_target = _PRIMARY
 
         self._hotkey_filter = HotkeyFilter(self._on_hotkey)
         self.installNativeEventFilter(self._hotkey_filter)
 
         self._tray = self._init_tray()
+        STARTUP.mark("tray visible")
 
         # Register global hotkey
         self._hotkey_id = 1
@@ -41,14 +59,229 @@ class App(QtWidgets.QApplication):
                 "Hotkey Error",
                 f"Failed to register hotkey {hotkey_text}. It may be in use by another app.",
             )
+        STARTUP.mark("hotkey registered")
+
+        self._session_path = CONFIG.session_path or default_path()
+        self._event_loop_started = False
+        self._awaiting_first_frame = False
+        if CONFIG.restore_session:
+            self._restore_session()
 
         self.aboutToQuit.connect(self._cleanup)
+        QtCore.QTimer.singleShot(0, self._on_event_loop_started)
+
+    def _on_event_loop_started(self):
+        self._event_loop_started = True
+        STARTUP.mark("event loop running")
+        if self._awaiting_first_frame:
+            # Report anyway if the restored region never produces a frame.
+            QtCore.QTimer.singleShot(5000, STARTUP.report)
+        else:
+            STARTUP.report()
+        # Pay native window creation for the overlay now, while idle, not at hotkey time.
+        QtCore.QTimer.singleShot(0, lambda: self._snip_overlay().prewarm())
+        if CONFIG.stream_enabled:
+            QtCore.QTimer.singleShot(0, self._toggle_stream)
+
+    def _restore_session(self):
+        session = load_session(self._session_path)
+        if session is None:
+            return
+        screens = [screen.geometry() for screen in QtGui.QGuiApplication.screens()]
+        session = validate(session, screens, CONFIG.min_selection_px)
+        if not session.regions:
+            return
+        self._awaiting_first_frame = True
+        primary = self._primary_preview()
+        primary.first_frame.connect(self._on_first_frame)
+        primary.restore(session.regions[0])
+        for region in session.regions[1:]:
+            self._create_extra_preview().restore(region)
+        STARTUP.mark("session restored")
+
+    def _on_first_frame(self, ms: float):
+        self._awaiting_first_frame = False
+        STARTUP.mark("first frame")
+        if self._event_loop_started:
+            STARTUP.report()
+
+    def _save_session(self):
+        previews = [self._preview] if self._preview else []
+        regions = [state for state in (p.session_state() for p in previews + self._extra_previews) if state]
+        try:
+            save_session(self._session_path, Session(regions))
+        except OSError:
+            pass
+
+    def _capture_service(self) -> "CaptureService":
+        if self._capture is None:
+            from .capture_worker import CaptureService
+
+            # One capture thread serves every region, so regions on one screen share a grab.
+            self._capture = CaptureService.from_config(CONFIG, self)
+        return self._capture
+
+    def _stream_server(self) -> "StreamServer":
+        if self._stream is None:
+            from .stream import StreamServer
+
+            # Not listening until started; previews publish into it regardless.
+            self._stream = StreamServer(
+                CONFIG.stream_host, CONFIG.stream_port, CONFIG.stream_encoders, CONFIG.stream_format, CONFIG.stream_quality
+            )
+        return self._stream
+
+    def _shared_filter_pool(self) -> "FilterPool | None":
+        if self._filter_pool is None and CONFIG.filter_workers:
+            from .filters import FilterPool
+
+            # One set of worker processes for every region, not one per preview.
+            self._filter_pool = FilterPool(CONFIG.filter_workers)
+        return self._filter_pool
+
+    def _toggle_stream(self):
+        stream = self._stream_server()
+        if stream.running:
+            stream.stop()
+            message = "Network stream stopped."
+        else:
+            try:
+                stream.start()
+            except OSError as exc:
+                message = f"Could not start the network stream on port {CONFIG.stream_port}: {exc.strerror or exc}"
+            else:
+                message = f"Streaming at {stream.url()}"
+        self._action_stream.setText("Stop Streaming" if stream.running else "Start Streaming")
+        if self._tray:
+            self._tray.showMessage("LoL-Map_Tool", message, QtWidgets.QSystemTrayIcon.MessageIcon.Information, 4000)
+
+    def _snip_overlay(self) -> "SnipOverlay":
+        if self._overlay is None:
+            from .overlay import SnipOverlay
+
+            self._overlay = SnipOverlay(CONFIG)
+            self._overlay.selectionMade.connect(self._on_selection_made)
+            self._overlay.canceled.connect(self._on_selection_canceled)
+        return self._overlay
+
+    def _primary_preview(self) -> "PreviewWindow":
+        if self._preview is None:
+            from .preview import PreviewWindow
+
+            self._preview = PreviewWindow(
+                self._on_hotkey,
+                self._change_hotkey,
+                self.quit,
+                CONFIG,
+                __version__,
+                self._capture_service(),
+                self._add_region,
+                self._stream_server(),
+                self._shared_filter_pool(),
+            )
+            self._preview.minimized.connect(self._on_preview_minimized)
+            self._preview.region_moved.connect(self._save_session)
+            self._preview.region_closed.connect(self._save_session)
+            self._preview.status_changed.connect(self._on_preview_status_changed)
+        return self._preview
 
     def _on_hotkey(self):
-        self._overlay.start()
+        # The primary preview is built after the overlay is up, so it never delays it.
+        self._select_region(_PRIMARY)
+
+    def _add_region(self):
+        # None: the next selection opens a new preview window.
+        self._select_region(None)
+
+    def _auto_detect_minimap(self):
+        # Detects straight from a fresh desktop grab; on a miss the overlay opens for a
+        # manual selection instead.
+        self._select_target = _PRIMARY
+        if self._snip_overlay().auto_detect():
+            return
+        self._select_region(_PRIMARY)
+        if self._tray:
+            self._tray.showMessage(
+                "LoL-Map_Tool",
+                "No minimap found. Select it manually.",
+                QtWidgets.QSystemTrayIcon.MessageIcon.Information,
+                2500,
+            )
+
+    def _select_region(self, target):
+        requested_at = time.perf_counter()
+        self._select_target = target
+        self._snip_overlay().start(requested_at)
+
+    def _on_selection_made(self, rect: QtCore.QRect):
+        target = self._select_target
+        if target is _PRIMARY:
+            target = self._primary_preview()
+        elif target is None:
+            target = self._create_extra_preview()
+        target.set_rect(rect)
+        self._save_session()
+
+    def _on_selection_canceled(self):
+        # Canceling a reselect keeps the region running; only a preview still waiting for
+        # its first region is put away.
+        target = self._preview if self._select_target is _PRIMARY else self._select_target
+        if target is not None and not target.in_session():
+            target.stop_preview()
+
+    def _create_extra_preview(self) -> "PreviewWindow":
+        from .preview import PreviewWindow
+
+        preview = None
+
+        def reselect():
+            self._select_region(preview)
+
+        def close():
+            self._close_extra_preview(preview)
+
+        preview = PreviewWindow(
+            reselect,
+            self._change_hotkey,
+            close,
+            CONFIG,
+            __version__,
+            self._capture_service(),
+            self._add_region,
+            self._stream_server(),
+            self._shared_filter_pool(),
+        )
+        preview.minimized.connect(self._on_preview_minimized)
+        preview.region_moved.connect(self._save_session)
+        preview.region_closed.connect(close)
+        self._extra_previews.append(preview)
+        return preview
+
+    def _close_extra_preview(self, preview: "PreviewWindow"):
+        if preview in self._extra_previews:
+            self._extra_previews.remove(preview)
+        preview.shutdown()
+        preview.hide()
+        preview.deleteLater()
+        self._save_session()
 
     def _cleanup(self):
         unregister_hotkey(self._hotkey_id)
+        self._save_session()
+        if PERF.enabled and PERF_EXPORT_PATH:
+            extra = self._preview.perf_counters() if self._preview else {}
+            if self._overlay is not None:
+                extra.update({f"overlay_{key}": value for key, value in self._overlay.stats().items()})
+            PERF.export(PERF_EXPORT_PATH, extra)
+        previews = [self._preview] if self._preview else []
+        for preview in previews + self._extra_previews:
+            preview.shutdown()
+        if self._stream is not None:
+            self._stream.stop()
+        if self._filter_pool is not None:
+            self._filter_pool.close()
+        if self._capture is not None:
+            self._capture.shutdown()
 
     def _init_tray(self) -> QtWidgets.QSystemTrayIcon:
         icon = self._load_tray_icon()
@@ -59,12 +292,21 @@ class App(QtWidgets.QApplication):
         action_select = menu.addAction("Select Region")
         action_select.triggered.connect(self._on_hotkey)
 
+        action_detect = menu.addAction("Auto-detect Minimap")
+        action_detect.triggered.connect(self._auto_detect_minimap)
+
+        action_add = menu.addAction("Add Region")
+        action_add.triggered.connect(self._add_region)
+
         action_show = menu.addAction("Show Preview")
         action_show.triggered.connect(self._show_or_select)
 
         action_hotkey = menu.addAction("Change Hotkey")
         action_hotkey.triggered.connect(self._change_hotkey)
 
+        self._action_stream = menu.addAction("Start Streaming")
+        self._action_stream.triggered.connect(self._toggle_stream)
+
         menu.addSeparator()
         action_quit = menu.addAction("Quit")
         action_quit.triggered.connect(self.quit)
@@ -86,7 +328,7 @@ class App(QtWidgets.QApplication):
         return os.path.join(base_path, relative_path)
 
     def _show_or_select(self):
-        if not self._preview.show_if_ready():
+        if self._preview is None or not self._preview.show_if_ready():
             self._on_hotkey()
 
     def _on_tray_activated(self, reason: QtWidgets.QSystemTrayIcon.ActivationReason):
@@ -113,6 +355,8 @@ class App(QtWidgets.QApplication):
         return register_hotkey(self._hotkey_id, self._hotkey_mods, self._hotkey_key)
 
     def _change_hotkey(self):
+        from .hotkey_dialog import HotkeyCaptureDialog
+
         dialog = HotkeyCaptureDialog(self._hotkey_mods, self._hotkey_key)
         if dialog.exec() != QtWidgets.QDialog.DialogCode.Accepted:
             return
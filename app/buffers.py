@@ -0,0 +1,117 @@
+import sys
+import numpy as np
+from PyQt6 import QtGui
+from . import frames
+
+
+# References to a pooled QImage nobody else holds: the slot list, the local name in
+# image() and getrefcount()'s own argument.
+_POOL_REFS = 3
+
+
+class FramePool:
+    # Reusable frame buffers for one thread. Images are frames.FRAME_FORMAT, handed out
+    # round-robin, `depth` per (size, lane); a lane is one of several same-sized frames
+    # produced together, e.g. two regions of equal size. A consumer may keep a frame as
+    # long as it likes: a buffer whose QImage is still referenced outside the pool when
+    # its turn comes round is left to that consumer and replaced by a new one. Holding
+    # the pool's own Python object does not show in Qt's refcount, so this is checked on
+    # the Python side; a consumer's QImage(frame) copy shares the pixels at the C++
+    # level instead, and bits() then detaches. Either way the buffer is never written
+    # under a reader. Depth covers the frames normally in flight (being written, waiting
+    # in the mailbox, on screen), so in steady state nothing is allocated.
+    # Every allocation is counted, including frames that had to come from elsewhere
+    # (e.g. a platform screen grab), so per-frame costs can be checked.
+
+    def __init__(self, depth: int = 3):
+        self._depth = depth
+        self._slots = {}  # (width, height, lane) -> [images, next turn]
+        self._arrays = {}
+        self.allocations = 0
+        self.allocated_bytes = 0
+        self.detaches = 0
+        self.held = 0  # buffers replaced because a consumer still referenced them
+        self.reuses = 0
+        self.external = 0
+        self.external_bytes = 0
+
+    def image(self, width: int, height: int, lane: int = 0) -> tuple[QtGui.QImage, np.ndarray]:
+        # A buffer of that size plus a writable (height, width, 4) view of it. Contents are
+        # whatever the buffer held last; the caller overwrites every pixel.
+        slot = self._slots.get((width, height, lane))
+        if slot is None:
+            slot = self._slots[(width, height, lane)] = [[], 0]
+        images, turn = slot
+        if len(images) < self._depth:
+            image = QtGui.QImage(width, height, frames.FRAME_FORMAT)
+            images.append(image)
+            slot[1] = 0
+            self._count(image.sizeInBytes())
+            return image, frames.writable_view(image)
+        image = images[turn]
+        slot[1] = (turn + 1) % len(images)
+        if sys.getrefcount(image) > _POOL_REFS:
+            # Still held by a consumer (the mailbox, a canvas, the recorder or stream
+            # threads...): it keeps the old buffer, the pool takes a new one.
+            image = images[turn] = QtGui.QImage(width, height, frames.FRAME_FORMAT)
+            self.held += 1
+            self._count(image.sizeInBytes())
+            return image, frames.writable_view(image)
+        before = int(image.constBits())
+        view = frames.writable_view(image)
+        if int(image.constBits()) != before:
+            # Still held elsewhere; Qt copied it.
+            self.detaches += 1
+            self._count(image.sizeInBytes())
+        else:
+            self.reuses += 1
+        return image, view
+
+    def array(self, name: str, shape: tuple, dtype=np.uint32) -> np.ndarray:
+        # Named scratch array that never leaves its owner; replaced only on a shape change.
+        arr = self._arrays.get(name)
+        if arr is None or arr.shape != shape or arr.dtype != dtype:
+            arr = self._arrays[name] = np.empty(shape, dtype)
+            self._count(arr.nbytes)
+        return arr
+
+    def adopt(self, image: QtGui.QImage):
+        # Records a frame allocated outside the pool.
+        if not image.isNull():
+            self.external += 1
+            self.external_bytes += image.sizeInBytes()
+
+    def retain(self, sizes):
+        # Drops the buffers of every size not in `sizes` ((width, height) pairs), e.g.
+        # when a region is moved, resized or closed or the zoom changes.
+        keep = set(sizes)
+        self._slots = {key: slot for key, slot in self._slots.items() if key[:2] in keep}
+
+    def clear(self):
+        self._slots = {}
+        self._arrays = {}
+
+    def totals(self) -> tuple[int, int]:
+        # (allocations, bytes) so far, pooled and external; diff two calls for a frame's share.
+        return self.allocations + self.external, self.allocated_bytes + self.external_bytes
+
+    def held_bytes(self) -> int:
+        # Snapshots the dicts first: stats may be read from another thread.
+        images = sum(image.sizeInBytes() for slot in list(self._slots.values()) for image in list(slot[0]))
+        return images + sum(arr.nbytes for arr in list(self._arrays.values()))
+
+    def stats(self) -> dict:
+        return {
+            "allocations": self.allocations,
+            "allocated_bytes": self.allocated_bytes,
+            "detaches": self.detaches,
+            "held": self.held,
+            "reuses": self.reuses,
+            "external": self.external,
+            "external_bytes": self.external_bytes,
+            "held_bytes": self.held_bytes(),
+        }
+
+    def _count(self, nbytes: int):
+        self.allocations += 1
+        self.allocated_bytes += nbytes
@@ -0,0 +1,261 @@
+import math
+from PyQt6 import QtCore, QtGui, QtWidgets
+from .perf import PERF
+
+
+class RenderQuality:
+    NEAREST = "nearest"  # crisp pixel replication, best for integer zoom on the minimap
+    BILINEAR = "bilinear"
+    SMOOTH = "smooth"  # bilinear plus antialiased edges at fractional offsets
+    # Upscaled ahead of painting by app.upscale: whole pixels at integer zoom, sharp
+    # bilinear seams at fractional zoom, optionally with a sharpening pass.
+    PIXEL = "pixel"
+    PIXEL_SHARP = "pixel_sharp"
+
+    ALL = (NEAREST, BILINEAR, SMOOTH, PIXEL, PIXEL_SHARP)
+    UPSCALED = (PIXEL, PIXEL_SHARP)
+    LABELS = {
+        NEAREST: "Nearest",
+        BILINEAR: "Bilinear",
+        SMOOTH: "Smooth",
+        PIXEL: "Pixel art",
+        PIXEL_SHARP: "Pixel art, sharpened",
+    }
+
+
+class PreviewCanvas(QtWidgets.QWidget):
+    # Keeps the captured frame as-is and applies zoom as a painter transform, so no
+    # scaled copy is ever allocated. Placement matches the old QLabel behaviour: the
+    # frame is fitted to at least fill the widget and centered, cropping any overflow,
+    # and the overflow can be panned. Only the visible part of the frame is resampled,
+    # so the cost of a paint follows the widget size, not the zoom.
+    # Frames are QImages in frames.FRAME_FORMAT, which the raster paint engine draws
+    # without a conversion or a QPixmap upload.
+    # Emitted when the user pans; a preview that renders its own viewport re-renders.
+    view_changed = QtCore.pyqtSignal()
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.setAttribute(QtCore.Qt.WidgetAttribute.WA_StyledBackground, True)
+        self.setAttribute(QtCore.Qt.WidgetAttribute.WA_OpaquePaintEvent, False)
+        self.setSizePolicy(QtWidgets.QSizePolicy.Policy.Ignored, QtWidgets.QSizePolicy.Policy.Ignored)
+        self._image = None
+        self._frame_size = QtCore.QSizeF()  # logical size of the whole frame
+        self._offset = QtCore.QPointF()  # where `_image` sits in it
+        self._zoom = 1.0
+        # View centre relative to the frame centre, in frame pixels.
+        self._pan = QtCore.QPointF()
+        self._drag_from = None
+        self._quality = RenderQuality.SMOOTH
+        self._message = ""
+
+    def set_frame(self, image: QtGui.QImage | None, frame_size: QtCore.QSizeF | None = None, offset=None):
+        # `image` shows the part of a frame of `frame_size` (logical pixels) that starts
+        # at `offset`; by default it is the whole frame.
+        self._image = image
+        self._message = ""
+        if image is not None and not image.isNull():
+            if frame_size is None:
+                frame_size = QtCore.QSizeF(image.size()) / image.devicePixelRatio()
+            self._offset = QtCore.QPointF() if offset is None else QtCore.QPointF(offset)
+            if frame_size != self._frame_size:
+                self._frame_size = QtCore.QSizeF(frame_size)
+                self._view_geometry_changed()
+        self.update()
+
+    def set_message(self, text: str):
+        self._image = None
+        self._message = text
+        self.update()
+
+    def set_zoom(self, zoom: float, anchor: QtCore.QPointF | None = None):
+        # With an `anchor` (widget coordinates), the frame point under it stays put;
+        # otherwise the view centre does.
+        if zoom == self._zoom:
+            return
+        frame = self._frame_size
+        if anchor is None or frame.isEmpty():
+            self._zoom = zoom
+        else:
+            before = self.target_rect(frame)
+            point = (anchor - before.topLeft()) / (before.width() / frame.width())
+            self._zoom = zoom
+            scale = self.scale_for(frame)
+            self._pan = QtCore.QPointF(
+                ((self.width() - frame.width() * scale) / 2.0 - anchor.x()) / scale + point.x(),
+                ((self.height() - frame.height() * scale) / 2.0 - anchor.y()) / scale + point.y(),
+            )
+        self._view_geometry_changed()
+        self.update()
+
+    def zoom(self) -> float:
+        return self._zoom
+
+    def reset_pan(self):
+        if not self._pan.isNull():
+            self._pan = QtCore.QPointF()
+            self.update()
+            self.view_changed.emit()
+
+    def quality(self) -> str:
+        return self._quality
+
+    def set_quality(self, quality: str):
+        if quality not in RenderQuality.ALL:
+            raise ValueError(f"Unknown render quality: {quality}")
+        if quality != self._quality:
+            self._quality = quality
+            self.update()
+
+    def scale_for(self, source: QtCore.QSize) -> float:
+        # Same scale QPixmap.scaled(KeepAspectRatio) produced for max(rect * zoom, label).
+        if source.isEmpty():
+            return self._zoom
+        sx = max(self._zoom, self.width() / source.width())
+        sy = max(self._zoom, self.height() / source.height())
+        return min(sx, sy)
+
+    def target_rect(self, source: QtCore.QSizeF) -> QtCore.QRectF:
+        scale = self.scale_for(source)
+        w = source.width() * scale
+        h = source.height() * scale
+        return QtCore.QRectF(
+            (self.width() - w) / 2.0 - self._pan.x() * scale,
+            (self.height() - h) / 2.0 - self._pan.y() * scale,
+            w,
+            h,
+        )
+
+    def visible_source(self, source: QtCore.QSizeF) -> QtCore.QRectF:
+        # The part of a frame of size `source` that lands inside the widget, in frame pixels.
+        if source.isEmpty():
+            return QtCore.QRectF()
+        target = self.target_rect(source)
+        scale = target.width() / source.width()
+        view = QtCore.QRectF(-target.x() / scale, -target.y() / scale, self.width() / scale, self.height() / scale)
+        return view.intersected(QtCore.QRectF(QtCore.QPointF(), source))
+
+    def visible_region(self, image: QtGui.QImage) -> QtCore.QRect:
+        # Whole pixels of `image`, shown as the frame, covering the visible part. The size
+        # only depends on the zoom, not on where the pan puts it, so panning keeps reusing
+        # same-sized buffers instead of flipping between two sizes.
+        ratio = image.devicePixelRatio()
+        visible = self.visible_source(QtCore.QSizeF(image.size()) / ratio)
+        size = image.size()
+        w = min(size.width(), math.ceil(visible.width() * ratio) + 1)
+        h = min(size.height(), math.ceil(visible.height() * ratio) + 1)
+        x = max(0, min(math.floor(visible.left() * ratio), size.width() - w))
+        y = max(0, min(math.floor(visible.top() * ratio), size.height() - h))
+        return QtCore.QRect(x, y, w, h)
+
+    def can_pan(self) -> bool:
+        frame = self._frame_size
+        if frame.isEmpty():
+            return False
+        scale = self.scale_for(frame)
+        return frame.width() * scale > self.width() + 0.5 or frame.height() * scale > self.height() + 0.5
+
+    def resizeEvent(self, event):
+        super().resizeEvent(event)
+        self._view_geometry_changed()
+
+    def mousePressEvent(self, event):
+        if event.button() == QtCore.Qt.MouseButton.LeftButton and self.can_pan():
+            self._drag_from = event.position()
+            self.setCursor(QtCore.Qt.CursorShape.ClosedHandCursor)
+            event.accept()
+            return
+        super().mousePressEvent(event)
+
+    def mouseMoveEvent(self, event):
+        if self._drag_from is None:
+            super().mouseMoveEvent(event)
+            return
+        delta = event.position() - self._drag_from
+        self._drag_from = event.position()
+        self._pan -= delta / self.scale_for(self._frame_size)
+        self._clamp_pan()
+        self.update()
+        self.view_changed.emit()
+
+    def mouseReleaseEvent(self, event):
+        if self._drag_from is not None and event.button() == QtCore.Qt.MouseButton.LeftButton:
+            self._drag_from = None
+            self._update_cursor()
+            return
+        super().mouseReleaseEvent(event)
+
+    def mouseDoubleClickEvent(self, event):
+        if event.button() == QtCore.Qt.MouseButton.LeftButton:
+            self.reset_pan()
+            return
+        super().mouseDoubleClickEvent(event)
+
+    def paintEvent(self, event):
+        painter = QtGui.QPainter(self)
+        opt = QtWidgets.QStyleOption()
+        opt.initFrom(self)
+        self.style().drawPrimitive(QtWidgets.QStyle.PrimitiveElement.PE_Widget, opt, painter, self)
+
+        if self._image is None or self._image.isNull():
+            if self._message:
+                painter.drawText(self.rect(), QtCore.Qt.AlignmentFlag.AlignCenter, self._message)
+            return
+
+        t0 = PERF.begin()
+        frame = self._frame_size
+        target = self.target_rect(frame)
+        scale = target.width() / frame.width()
+        # An upscaled frame arrives at device resolution and is blitted 1:1; below 1x the
+        # painter still does the downscaling.
+        smooth = self._quality in (RenderQuality.BILINEAR, RenderQuality.SMOOTH) or (
+            self._quality in RenderQuality.UPSCALED and scale < 1.0
+        )
+        painter.setRenderHint(QtGui.QPainter.RenderHint.SmoothPixmapTransform, smooth)
+        painter.setRenderHint(QtGui.QPainter.RenderHint.Antialiasing, self._quality == RenderQuality.SMOOTH)
+        painter.setClipRect(event.rect())
+        # Only the visible part of the image (which may itself be part of the frame).
+        ratio = self._image.devicePixelRatio()
+        part = QtCore.QRectF(self._offset, QtCore.QSizeF(self._image.size()) / ratio)
+        visible = part.intersected(self.visible_source(frame))
+        if not visible.isEmpty():
+            dest = QtCore.QRectF(
+                target.x() + visible.x() * scale,
+                target.y() + visible.y() * scale,
+                visible.width() * scale,
+                visible.height() * scale,
+            )
+            source = QtCore.QRectF(
+                (visible.x() - part.x()) * ratio,
+                (visible.y() - part.y()) * ratio,
+                visible.width() * ratio,
+                visible.height() * ratio,
+            )
+            painter.drawImage(dest, self._image, source)
+        PERF.end("scale", t0)
+
+    def _clamp_pan(self):
+        # Panning stops at the frame edges; an axis that fits in the widget stays centred.
+        frame = self._frame_size
+        if frame.isEmpty():
+            self._pan = QtCore.QPointF()
+            return
+        scale = self.scale_for(frame)
+        limit_x = max(0.0, (frame.width() * scale - self.width()) / (2.0 * scale))
+        limit_y = max(0.0, (frame.height() * scale - self.height()) / (2.0 * scale))
+        self._pan = QtCore.QPointF(
+            min(limit_x, max(-limit_x, self._pan.x())),
+            min(limit_y, max(-limit_y, self._pan.y())),
+        )
+
+    def _update_cursor(self):
+        if self._drag_from is None:
+            if self.can_pan():
+                self.setCursor(QtCore.Qt.CursorShape.OpenHandCursor)
+            else:
+                self.unsetCursor()
+
+    def _view_geometry_changed(self):
+        # Zoom, widget or frame size changed: keep the pan in range.
+        self._clamp_pan()
+        self._update_cursor()
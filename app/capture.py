@@ -1,24 +1,332 @@
+import time
+import traceback
+from dataclasses import dataclass
+import numpy as np
 from PyQt6 import QtCore, QtGui
+from . import frames
+from .buffers import FramePool
+from .perf import PERF
+
+
+class CaptureBackend:
+    name = "base"
+
+    def begin_frame(self) -> None:
+        pass
+
+    def watch_layout(self, callback) -> None:
+        # Call `callback()` whenever screens are added, removed or change geometry.
+        pass
+
+    def screen_geometries(self) -> list[QtCore.QRect]:
+        raise NotImplementedError
+
+    def grab_screen(self, index: int, local: QtCore.QRect, pool: FramePool) -> QtGui.QImage:
+        # `local` is relative to the top-left of screen `index`. Returns a frame in (or
+        # close to) frames.FRAME_FORMAT, from `pool` when the backend can paint into one;
+        # anything else is recorded with pool.adopt().
+        raise NotImplementedError
+
+
+class QtScreenBackend(CaptureBackend):
+    name = "qt"
+
+    def __init__(self):
+        self._screens = None
+        self._callbacks = []
+        self._watching = False
+
+    def watch_layout(self, callback) -> None:
+        self._callbacks.append(callback)
+        if self._watching:
+            return
+        app = QtGui.QGuiApplication.instance()
+        if app is None:
+            return
+        self._watching = True
+        app.screenAdded.connect(self._on_screen_added)
+        app.screenRemoved.connect(self._on_layout_changed)
+        for screen in app.screens():
+            screen.geometryChanged.connect(self._on_layout_changed)
+
+    def screen_geometries(self) -> list[QtCore.QRect]:
+        return [screen.geometry() for screen in self._current_screens()]
+
+    def grab_screen(self, index: int, local: QtCore.QRect, pool: FramePool) -> QtGui.QImage:
+        screens = self._current_screens()
+        if index >= len(screens):
+            return QtGui.QImage()
+        # grabWindow always allocates; toImage() of a raster pixmap shares its pixels.
+        image = screens[index].grabWindow(0, local.x(), local.y(), local.width(), local.height()).toImage()
+        pool.adopt(image)
+        return image
+
+    def _current_screens(self):
+        # Without layout signals there is nothing to invalidate the cache, so re-query.
+        if self._screens is None or not self._watching:
+            self._screens = QtGui.QGuiApplication.screens()
+        return self._screens
+
+    def _on_screen_added(self, screen: QtGui.QScreen):
+        screen.geometryChanged.connect(self._on_layout_changed)
+        self._on_layout_changed()
+
+    def _on_layout_changed(self, *_):
+        self._screens = None
+        for callback in self._callbacks:
+            callback()
+
+
+class SyntheticBackend(CaptureBackend):
+    # Deterministic moving frames over a fake monitor layout. Pixels are a function
+    # of global desktop coordinates and the frame counter, so a rect spanning two
+    # fake screens composes seamlessly.
+    name = "synthetic"
+
+    # Secondary monitor left of the primary, offset upwards: exercises negative coords.
+    DEFAULT_LAYOUT = (
+        (-1920, -120, 1920, 1080),
+        (0, 0, 2560, 1440),
+    )
+
+    def __init__(self, layout=DEFAULT_LAYOUT, icons: int = 12, speed: int = 3):
+        self._layout = [QtCore.QRect(*geo) for geo in layout]
+        self._icons = icons
+        self._speed = speed
+        self._callbacks = []
+        self.frame = 0
+
+    def begin_frame(self) -> None:
+        self.frame += 1
+
+    def watch_layout(self, callback) -> None:
+        self._callbacks.append(callback)
+
+    def set_layout(self, layout) -> None:
+        self._layout = [QtCore.QRect(*geo) for geo in layout]
+        for callback in self._callbacks:
+            callback()
+
+    def screen_geometries(self) -> list[QtCore.QRect]:
+        return [QtCore.QRect(geo) for geo in self._layout]
+
+    def grab_screen(self, index: int, local: QtCore.QRect, pool: FramePool) -> QtGui.QImage:
+        if index >= len(self._layout):
+            return QtGui.QImage()
+        area = self._layout[index].intersected(local.translated(self._layout[index].topLeft()))
+        if area.isEmpty():
+            return QtGui.QImage()
+        # Lanes below zero keep screen grabs apart from the region frames cut from them.
+        image, _ = pool.image(area.width(), area.height(), -1 - index)
+        painter = QtGui.QPainter(image)
+        # Paint in global coordinates.
+        painter.translate(-area.x(), -area.y())
+        self._paint(painter, area)
+        painter.end()
+        return image
+
+    def _paint(self, painter: QtGui.QPainter, area: QtCore.QRect):
+        # Static "terrain": coarse checker keyed on global position.
+        cell = 64
+        x0 = area.left() - area.left() % cell
+        y0 = area.top() - area.top() % cell
+        for y in range(y0, area.bottom() + 1, cell):
+            for x in range(x0, area.right() + 1, cell):
+                shade = 40 + ((x // cell + y // cell) % 2) * 24
+                painter.fillRect(x, y, cell, cell, QtGui.QColor(shade // 2, shade, shade // 2))
+
+        # Moving "champion icons" on fixed Lissajous-like paths.
+        t = self.frame * self._speed
+        for i in range(self._icons):
+            cx = -1800 + (i * 397 + t * (1 + i % 3)) % 4200
+            cy = -100 + (i * 211 + t * (2 - i % 2)) % 1500
+            color = QtGui.QColor(220, 60, 60) if i % 2 else QtGui.QColor(60, 140, 230)
+            painter.setBrush(color)
+            painter.setPen(QtCore.Qt.PenStyle.NoPen)
+            painter.drawEllipse(QtCore.QPoint(cx, cy), 14, 14)
+
+
+@dataclass(frozen=True)
+class ScreenSlice:
+    index: int
+    local: QtCore.QRect  # source rect, screen-local
+    dest: QtCore.QPoint  # top-left inside the captured frame
+
+
+@dataclass(frozen=True)
+class CapturePlan:
+    rect: QtCore.QRect
+    slices: tuple[ScreenSlice, ...]
+
+    @property
+    def single_screen(self) -> bool:
+        return len(self.slices) == 1 and self.slices[0].local.size() == self.rect.size()
+
+
+@dataclass
+class CaptureCounters:
+    fast_path: int = 0  # frame is the screen grab itself
+    crop_path: int = 0  # frame cut out of a grab shared with other regions
+    compose_path: int = 0  # frame painted together from several screens
+    screen_grabs: int = 0
+    layout_rebuilds: int = 0
+    last_path: str = ""
+
+    def reset(self):
+        self.fast_path = 0
+        self.crop_path = 0
+        self.compose_path = 0
+        self.screen_grabs = 0
+        self.layout_rebuilds = 0
+        self.last_path = ""
 
 
 class CaptureManager:
-    def grab_rect(self, rect: QtCore.QRect) -> QtGui.QPixmap:
-        # Compose from all screens so multi-monitor and negative coords work.
-        result = QtGui.QPixmap(rect.size())
-        result.fill(QtCore.Qt.GlobalColor.black)
-        painter = QtGui.QPainter(result)
-        for screen in QtGui.QGuiApplication.screens():
-            s_geo = screen.geometry()
+    _MAX_PLANS = 16
+
+    def __init__(self, backend: CaptureBackend | None = None):
+        self._backend = backend or QtScreenBackend()
+        # Frame buffers; like the rest of grab_images(), used from one thread at a time.
+        self.pool = FramePool()
+        self._plans = {}
+        self._consumers = ()
+        self._seq = 0
+        self.counters = CaptureCounters()
+        self._backend.watch_layout(self.invalidate_layout)
+
+    @property
+    def backend(self) -> CaptureBackend:
+        return self._backend
+
+    def invalidate_layout(self):
+        # Swap rather than clear: a worker may be reading the old dict.
+        self._plans = {}
+
+    def add_consumer(self, callback) -> None:
+        # `callback(view, seq, timestamp)` receives every grabbed frame as a read-only
+        # NumPy view (see frames.frame_view for layout), once per region when several are
+        # captured together. It runs on the capture thread and the view is only valid
+        # during the call: copy anything you want to keep, and keep the work short, since
+        # it delays the next grab.
+        if callback not in self._consumers:
+            # Swap the tuple so the capture thread never iterates a mutating list.
+            self._consumers = self._consumers + (callback,)
+
+    def remove_consumer(self, callback) -> None:
+        self._consumers = tuple(c for c in self._consumers if c != callback)
+
+    def plan_for(self, rect: QtCore.QRect) -> CapturePlan:
+        plans = self._plans
+        key = (rect.x(), rect.y(), rect.width(), rect.height())
+        plan = plans.get(key)
+        if plan is not None:
+            return plan
+        slices = []
+        for index, s_geo in enumerate(self._backend.screen_geometries()):
             intersect = rect.intersected(s_geo)
             if intersect.isEmpty():
                 continue
             # Convert global coords to screen-local
-            local_x = intersect.x() - s_geo.x()
-            local_y = intersect.y() - s_geo.y()
-            part = screen.grabWindow(0, local_x, local_y, intersect.width(), intersect.height())
+            slices.append(
+                ScreenSlice(
+                    index,
+                    intersect.translated(-s_geo.x(), -s_geo.y()),
+                    intersect.topLeft() - rect.topLeft(),
+                )
+            )
+        plan = CapturePlan(QtCore.QRect(rect), tuple(slices))
+        if len(plans) >= self._MAX_PLANS:
+            plans.clear()
+        plans[key] = plan
+        self.counters.layout_rebuilds += 1
+        return plan
+
+    def grab_image(self, rect: QtCore.QRect) -> QtGui.QImage:
+        return self.grab_images([rect])[0]
+
+    def grab_images(self, rects: list[QtCore.QRect]) -> list[QtGui.QImage]:
+        # Frames are frames.FRAME_FORMAT QImages, mostly pool buffers (see FramePool):
+        # keeping one is fine, it is copied rather than overwritten if still held.
+        plans = [self.plan_for(rect) for rect in rects]
+        # Convert each screen grab once (only exotic formats need it), then crop every
+        # region from the converted image.
+        grabbed = self._grab_screens(plans)
+        t0 = PERF.begin()
+        shared = {}
+        for index, (union, part) in grabbed.items():
+            image = frames.normalize(part)
+            if image is not part:
+                self.pool.adopt(image)
+            shared[index] = (union, image)
+        PERF.end("convert", t0)
+        t0 = PERF.begin()
+        lanes = {}
+        images = []
+        for plan in plans:
+            size = (plan.rect.width(), plan.rect.height())
+            lanes[size] = lane = lanes.get(size, -1) + 1
+            images.append(self._assemble(plan, shared, lane))
+        PERF.end("compose", t0)
+        self._seq += 1
+        consumers = self._consumers
+        if consumers:
+            timestamp = time.perf_counter()
+            for image in images:
+                if image.isNull():
+                    continue
+                view = frames.frame_view(image)
+                for callback in consumers:
+                    try:
+                        callback(view, self._seq, timestamp)
+                    except Exception:
+                        # A broken consumer must not stop capture.
+                        traceback.print_exc()
+        return images
+
+    def _grab_screens(self, plans: list[CapturePlan]) -> dict:
+        # One grab per screen over the union of every region that touches it.
+        self._backend.begin_frame()
+        unions = {}
+        for plan in plans:
+            for part_slice in plan.slices:
+                union = unions.get(part_slice.index)
+                unions[part_slice.index] = part_slice.local if union is None else union.united(part_slice.local)
+        shared = {}
+        t0 = PERF.begin()
+        for index, union in unions.items():
+            part = self._backend.grab_screen(index, union, self.pool)
+            self.counters.screen_grabs += 1
             if not part.isNull():
-                dest_x = intersect.x() - rect.x()
-                dest_y = intersect.y() - rect.y()
-                painter.drawPixmap(dest_x, dest_y, part)
+                shared[index] = (union, part)
+        PERF.end("grab", t0)
+        return shared
+
+    def _assemble(self, plan: CapturePlan, shared: dict, lane: int) -> QtGui.QImage:
+        if plan.single_screen and plan.slices[0].index in shared:
+            part_slice = plan.slices[0]
+            union, part = shared[part_slice.index]
+            if union == part_slice.local:
+                # Rect lies inside one monitor and nothing else shares the grab: hand it back as-is.
+                self.counters.fast_path += 1
+                self.counters.last_path = "fast"
+                return part
+            self.counters.crop_path += 1
+            self.counters.last_path = "crop"
+            source = part_slice.local.translated(-union.topLeft())
+            result, view = self.pool.image(source.width(), source.height(), lane)
+            np.copyto(view, frames.frame_view(part)[source.top() : source.bottom() + 1, source.left() : source.right() + 1])
+            return result
+
+        # Compose from all screens so multi-monitor and negative coords work.
+        result, _ = self.pool.image(plan.rect.width(), plan.rect.height(), lane)
+        result.fill(QtCore.Qt.GlobalColor.black)
+        painter = QtGui.QPainter(result)
+        for part_slice in plan.slices:
+            if part_slice.index not in shared:
+                continue
+            union, part = shared[part_slice.index]
+            painter.drawImage(part_slice.dest, part, part_slice.local.translated(-union.topLeft()))
         painter.end()
-        return result
+        self.counters.compose_path += 1
+        self.counters.last_path = "compose"
+        return result
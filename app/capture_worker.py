@@ -0,0 +1,265 @@
+import threading
+import time
+from dataclasses import dataclass
+from PyQt6 import QtCore, QtGui
+from . import frames
+from .capture import CaptureManager
+from .change_detect import TileHasher
+from .history import FrameHistory
+from .perf import PERF
+from .scheduler import AdaptiveScheduler
+from .stats import RollingStats
+
+
+@dataclass
+class Frame:
+    seq: int
+    image: QtGui.QImage
+    captured_at: float  # time.perf_counter() when the grab finished
+    grab_ms: float
+    dirty: QtGui.QRegion | None = None  # changed area vs. the previous frame; None means all
+
+
+class FrameMailbox:
+    # Single-slot "latest frame wins" handoff between the capture thread and the GUI.
+    # A frame that is replaced before the consumer takes it is counted as dropped.
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._frame = None
+        self.produced = 0
+        self.delivered = 0
+        self.dropped = 0
+        self.age_ms = RollingStats()
+
+    def put(self, frame: Frame) -> bool:
+        # Returns True when the slot was empty, i.e. the consumer needs a wake-up.
+        with self._lock:
+            was_empty = self._frame is None
+            if not was_empty:
+                self.dropped += 1
+            self._frame = frame
+            self.produced += 1
+        return was_empty
+
+    def take(self) -> Frame | None:
+        with self._lock:
+            frame, self._frame = self._frame, None
+        if frame is not None:
+            self.delivered += 1
+            self.age_ms.add((time.perf_counter() - frame.captured_at) * 1000.0)
+        return frame
+
+    def clear(self):
+        with self._lock:
+            self._frame = None
+
+    def stats(self) -> dict:
+        return {
+            "produced": self.produced,
+            "delivered": self.delivered,
+            "dropped": self.dropped,
+            "age_p50_ms": self.age_ms.percentile(50),
+            "age_max_ms": self.age_ms.max(),
+        }
+
+
+class CaptureWorker(QtCore.QObject):
+    # Lives on the capture thread. Every tick grabs all active regions together, so
+    # regions on the same screen share one screen grab.
+
+    def __init__(self, capture: CaptureManager, scheduler: AdaptiveScheduler):
+        super().__init__()
+        self._capture = capture
+        self._scheduler = scheduler
+        self._regions = {}
+        self._timer = None
+        # Frame buffers allocated by the latest tick (pool, history); steady state is 0.
+        # Plain ints, read from the GUI thread.
+        self.ticks = 0
+        self.tick_allocations = 0
+        self.tick_allocated_bytes = 0
+        self.allocation_free_ticks = 0
+
+    @QtCore.pyqtSlot(object, QtCore.QRect, int)
+    def start(self, channel: "CaptureChannel", rect: QtCore.QRect, interval_ms: int):
+        if self._timer is None:
+            # Created lazily so it lives in the worker thread. Single-shot and re-armed
+            # per tick against the scheduler's deadline.
+            self._timer = QtCore.QTimer(self)
+            self._timer.setSingleShot(True)
+            self._timer.setTimerType(QtCore.Qt.TimerType.PreciseTimer)
+            self._timer.timeout.connect(self._tick)
+        self._regions[channel.id] = (channel, QtCore.QRect(rect))
+        self._retain_buffers()
+        # Always deliver the first frame after a (re)start.
+        channel.hasher.reset()
+        self._scheduler.reset(interval_ms / 1000.0)
+        self._tick()
+
+    @QtCore.pyqtSlot(object)
+    def stop(self, channel: "CaptureChannel"):
+        self._regions.pop(channel.id, None)
+        self._retain_buffers()
+        if not self._regions and self._timer is not None:
+            self._timer.stop()
+
+    def _retain_buffers(self):
+        # A moved, resized or stopped region releases the buffers of its old size.
+        self._capture.pool.retain({(rect.width(), rect.height()) for _, rect in self._regions.values()})
+
+    def _allocation_totals(self, regions) -> tuple[int, int]:
+        count, nbytes = self._capture.pool.totals()
+        for channel, _ in regions:
+            count += channel.history.allocations
+            nbytes += channel.history.allocated_bytes
+        return count, nbytes
+
+    def _tick(self):
+        if not self._regions:
+            return
+        regions = list(self._regions.values())
+        before = self._allocation_totals(regions)
+        t0 = time.perf_counter()
+        self._scheduler.tick_started(t0)
+        images = self._capture.grab_images([rect for _, rect in regions])
+        now = time.perf_counter()
+        grab_ms = (now - t0) * 1000.0
+        any_changed = False
+        for (channel, _), image in zip(regions, images):
+            t_detect = PERF.begin()
+            change = channel.hasher.diff(image)
+            PERF.end("detect", t_detect)
+            if not change.changed:
+                # Nothing to scale or present downstream.
+                continue
+            any_changed = True
+            channel.seq += 1
+            if channel.mailbox.put(Frame(channel.seq, image, now, grab_ms, change.dirty)):
+                channel.frameReady.emit()
+            t_history = PERF.begin()
+            channel.history.push(image, now)
+            PERF.end("history", t_history)
+            export = channel.export
+            if export is not None:
+                # Other processes read it from shared memory; they never hold this up.
+                t_export = PERF.begin()
+                export.write(frames.frame_view(image), channel.seq, time.time())
+                PERF.end("export", t_export)
+        after = self._allocation_totals(regions)
+        self.ticks += 1
+        self.tick_allocations = after[0] - before[0]
+        self.tick_allocated_bytes = after[1] - before[1]
+        self.allocation_free_ticks = 0 if self.tick_allocations else self.allocation_free_ticks + 1
+        delay = self._scheduler.frame_done(any_changed, time.perf_counter())
+        self._timer.start(max(0, int(delay * 1000.0)))
+
+
+class CaptureChannel(QtCore.QObject):
+    # One region's handle on the shared capture thread, with its own mailbox, change
+    # detection and history. `frameReady` fires (queued) when a new frame is waiting.
+    frameReady = QtCore.pyqtSignal()
+
+    def __init__(self, service: "CaptureService", channel_id: int, history: FrameHistory):
+        super().__init__(service)
+        self._service = service
+        self.id = channel_id
+        self.mailbox = FrameMailbox()
+        self.hasher = TileHasher()
+        self.history = history
+        self.seq = 0  # written by the capture thread only
+        self.export = None  # SharedFrameWriter, fed on the capture thread
+        self._running = False
+
+    @property
+    def capture(self) -> CaptureManager:
+        return self._service.capture
+
+    @property
+    def running(self) -> bool:
+        return self._running
+
+    def start(self, rect: QtCore.QRect, interval_ms: int):
+        self._running = True
+        self._service._start_requested.emit(self, QtCore.QRect(rect), interval_ms)
+
+    def stop(self):
+        self._running = False
+        self._service._stop_requested.emit(self)
+        self.mailbox.clear()
+
+    def take(self) -> Frame | None:
+        return self.mailbox.take()
+
+    def stats(self) -> dict:
+        stats = self.mailbox.stats()
+        stats["unchanged"] = self.hasher.unchanged
+        stats["skip_ratio"] = self.hasher.skip_ratio
+        stats.update(self._service.stats())
+        return stats
+
+    def set_export(self, writer):
+        # Publishes this region's frames to other processes; None stops and closes it.
+        old, self.export = self.export, writer
+        if old is not None:
+            old.close()
+
+    def close(self):
+        self.stop()
+        self.set_export(None)
+        self._service._channels.pop(self.id, None)
+
+
+class CaptureService(QtCore.QObject):
+    # Owns the capture thread shared by every preview window. Grabs never run on the GUI thread.
+    _start_requested = QtCore.pyqtSignal(object, QtCore.QRect, int)
+    _stop_requested = QtCore.pyqtSignal(object)
+
+    def __init__(self, capture: CaptureManager, scheduler: AdaptiveScheduler, parent=None):
+        super().__init__(parent)
+        self._capture = capture
+        self._scheduler = scheduler
+        self._channels = {}
+        self._next_id = 1
+        self._thread = QtCore.QThread(self)
+        self._thread.setObjectName("CaptureThread")
+        self._worker = CaptureWorker(capture, scheduler)
+        self._worker.moveToThread(self._thread)
+        self._thread.finished.connect(self._worker.deleteLater)
+        self._start_requested.connect(self._worker.start)
+        self._stop_requested.connect(self._worker.stop)
+        self._thread.start()
+
+    @classmethod
+    def from_config(cls, config, parent=None) -> "CaptureService":
+        return cls(CaptureManager(), AdaptiveScheduler(config.capture_min_fps, config.capture_max_fps), parent)
+
+    @property
+    def capture(self) -> CaptureManager:
+        return self._capture
+
+    def channel(self, history: FrameHistory) -> CaptureChannel:
+        channel = CaptureChannel(self, self._next_id, history)
+        self._channels[channel.id] = channel
+        self._next_id += 1
+        return channel
+
+    def stats(self) -> dict:
+        stats = self._scheduler.stats()
+        counters = self._capture.counters
+        stats["regions"] = sum(1 for channel in self._channels.values() if channel.running)
+        stats["screen_grabs"] = counters.screen_grabs
+        worker = self._worker
+        stats["alloc_per_frame"] = worker.tick_allocations
+        stats["alloc_bytes_per_frame"] = worker.tick_allocated_bytes
+        stats["alloc_free_frames"] = worker.allocation_free_ticks
+        pool = self._capture.pool
+        stats["pool_allocations"] = pool.allocations + pool.external
+        stats["pool_held_bytes"] = pool.held_bytes()
+        return stats
+
+    def shutdown(self):
+        for channel in list(self._channels.values()):
+            channel.stop()
+        self._thread.quit()
+        self._thread.wait()
@@ -13,12 +13,41 @@ class WinHotkey:
 class AppConfig:
     hotkey_mods: int = WinHotkey.MOD_CONTROL | WinHotkey.MOD_SHIFT
     hotkey_key: int = ord("S")
-    capture_fps_ms: int = 33  # ~30 FPS
+    capture_fps_ms: int = 33  # ~30 FPS, starting rate after select/unfreeze
+    capture_min_fps: float = 5.0  # floor while the region stays static
+    capture_max_fps: float = 60.0  # ceiling while the region keeps changing
     zoom_min: float = 0.2
     zoom_max: float = 6.0
     zoom_step: float = 1.1
+    zoom_animation_ms: int = 120  # glide between zoom levels; 0 jumps
     default_opacity: float = 0.95
+    render_quality: str = "smooth"  # nearest | bilinear | smooth | pixel | pixel_sharp
+    scaled_cache_frames: int = 4  # upscaled frames kept for re-showing (pixel qualities)
     min_selection_px: int = 5
+    history_seconds: float = 30.0  # rewind window available while frozen
+    history_bytes: int = 96 * 1024 * 1024
+    perf_enabled: bool = False  # or set LOLMAP_PERF=1
+    perf_export_path: str = ""  # .json or .csv written at exit; or set LOLMAP_PERF_EXPORT
+    record_path: str = ""  # empty: recording.lmr in the per-user app data folder
+    record_bytes: int = 256 * 1024 * 1024
+    restore_session: bool = True  # reopen the last regions live at launch, skipping the overlay
+    session_path: str = ""  # empty: session.json in the per-user app data folder
+    track_minimap: bool = True  # follow the minimap when the game window moves or resizes
+    track_interval_ms: int = 500  # how often the minimap border is verified
+    track_max_misses: int = 10  # failed searches in a row before tracking stops until reselect
+    stream_enabled: bool = False  # serve the captured regions over HTTP at launch
+    stream_host: str = "127.0.0.1"  # this PC only; "0.0.0.0" serves other devices on the network
+    stream_port: int = 8765
+    stream_format: str = "jpeg"  # jpeg | png
+    stream_quality: int = 80  # JPEG quality, 0-100
+    stream_encoders: int = 2  # encoder threads shared by every region
+    shm_export: bool = False  # publish frames to shared memory as "<shm_name>-<region>"
+    shm_name: str = "lolmap"
+    shm_slots: int = 4  # frames kept; a reader has this many frames' time to use one
+    shm_slot_bytes: int = 4 * 1024 * 1024  # largest frame, 1024x1024 by default
+    # Preview filters, "name" or "name:key=value,...", e.g. ("contrast:gamma=0.8", "enemy_highlight").
+    frame_filters: tuple[str, ...] = ()
+    filter_workers: int = 0  # worker processes shared by every region, one band of rows each; 0 filters on the GUI thread
 
 
-CONFIG = AppConfig()
+CONFIG = AppConfig()
@@ -0,0 +1,444 @@
+import concurrent.futures
+import multiprocessing
+import threading
+import time
+import traceback
+from multiprocessing import shared_memory
+import numpy as np
+from .shared_frames import attach
+from .stats import RollingStats
+
+# Post-capture filters for the preview: per-pixel kernels over (height, width, 4) uint8
+# frames in B, G, R, A byte order (frames.FRAME_FORMAT). Needs only NumPy, not Qt, so
+# filter worker processes start quickly. Every kernel is a handful of whole-array
+# operations; curves are lookup tables built once per filter, applied to two bytes at
+# once (one gather over half as many elements). Frames are opaque: alpha is set back to
+# 255 rather than looked up.
+_B, _G, _R, _A = 0, 1, 2, 3
+_LANES = np.uint32(0x00FF00FF)
+_OPAQUE = np.uint32(0xFF000000)
+
+# name -> Filter subclass, in the order a chain applies them.
+FILTERS = {}
+
+
+def register(cls):
+    FILTERS[cls.name] = cls
+    return cls
+
+
+def parse(spec: str) -> tuple[str, dict]:
+    # "name" or "name:key=value,key=value", e.g. "contrast:contrast=1.4,gamma=0.8".
+    name, _, args = spec.partition(":")
+    name = name.strip()
+    if name not in FILTERS:
+        raise ValueError(f"Unknown frame filter {name!r}; known: {', '.join(FILTERS)}.")
+    params = {}
+    for item in filter(None, (arg.strip() for arg in args.split(","))):
+        key, _, value = item.partition("=")
+        params[key.strip()] = float(value)
+    return name, params
+
+
+def _pair_table(lut: np.ndarray) -> np.ndarray:
+    # A byte LUT as a table over uint16 pairs of bytes.
+    v = np.arange(65536)
+    return lut[v & 0xFF].astype(np.uint16) | (lut[v >> 8].astype(np.uint16) << 8)
+
+
+def _words(frame: np.ndarray) -> np.ndarray:
+    # (h, w) uint32 view of a frame, one word per pixel.
+    return frame.view(np.uint32)[..., 0]
+
+
+def _byte_lut(values: np.ndarray) -> np.ndarray:
+    return np.clip(np.round(values), 0, 255).astype(np.uint8)
+
+
+class FilterContext:
+    # What the filters of a chain share while filtering one frame (or band of rows):
+    # the unfiltered pixels, the enemy-icon key computed from them once, and scratch
+    # arrays that are reused from frame to frame.
+
+    def __init__(self):
+        self.source = None
+        self._arrays = {}
+        self._keys = {}
+
+    def start(self, source: np.ndarray):
+        self.source = source
+        self._keys.clear()
+
+    def array(self, name: str, shape: tuple, dtype) -> np.ndarray:
+        arr = self._arrays.get(name)
+        if arr is None or arr.shape != shape or arr.dtype != dtype:
+            arr = self._arrays[name] = np.empty(shape, dtype)
+        return arr
+
+    def lookup(self, table: np.ndarray, src: np.ndarray, dst: np.ndarray):
+        # dst = a _pair_table applied to src; src and dst may be the same.
+        pairs = src.view(np.uint16)
+        index = self.array("pairs", pairs.shape, np.intp)
+        np.copyto(index, pairs)
+        np.take(table, index, out=dst.view(np.uint16), mode="clip")
+        dst[..., _A] = 255
+
+    def red_key(self, min_red: int, margin: int) -> np.ndarray:
+        # Pixels of the unfiltered frame that are clearly red: R at least `min_red` and
+        # at least `margin` above both G and B, like enemy champion icons and pings.
+        key = self._keys.get((min_red, margin))
+        if key is not None:
+            return key
+        src = self.source
+        shape = src.shape[:2]
+        others = self.array("others", shape, np.uint8)
+        np.maximum(src[..., _G], src[..., _B], out=others)
+        lead = self.array("lead", shape, np.int16)
+        np.subtract(src[..., _R], others, out=lead, dtype=np.int16)
+        key = self.array(f"key{len(self._keys)}", shape, np.bool_)
+        np.greater_equal(lead, margin, out=key)
+        bright = self.array("bright", shape, np.bool_)
+        np.greater_equal(src[..., _R], min_red, out=bright)
+        key &= bright
+        self._keys[(min_red, margin)] = key
+        return key
+
+
+class Filter:
+    # One kernel. apply() reads `src` and writes `dst`, both (h, w, 4) uint8 views of the
+    # same pixels; they are the same array for every filter but the first of a chain.
+    name = ""
+    label = ""
+
+    def apply(self, src: np.ndarray, dst: np.ndarray, ctx: FilterContext):
+        raise NotImplementedError
+
+
+@register
+class ContrastFilter(Filter):
+    # Contrast around mid-grey after a gamma curve (below 1 lifts the dark terrain).
+    name = "contrast"
+    label = "Contrast and gamma boost"
+
+    def __init__(self, contrast: float = 1.25, gamma: float = 0.85):
+        x = np.arange(256) / 255.0
+        lut = _byte_lut(((x**gamma - 0.5) * contrast + 0.5) * 255.0)
+        self._table = _pair_table(lut)
+
+    def apply(self, src, dst, ctx):
+        ctx.lookup(self._table, src, dst)
+
+
+@register
+class EnemyHighlightFilter(Filter):
+    # Colour-keys red pixels and turns them full red, dimming their G and B, so enemy
+    # icons stand out from the red-brown terrain.
+    name = "enemy_highlight"
+    label = "Highlight enemy icons"
+
+    def __init__(self, min_red: float = 150, margin: float = 60, dim: float = 0.35):
+        self._min_red = int(min_red)
+        self._margin = int(margin)
+        self._table = _pair_table(_byte_lut(np.arange(256) * dim)).astype(np.uint32)
+
+    def apply(self, src, dst, ctx):
+        if dst is not src:
+            np.copyto(dst, src)
+        key = ctx.red_key(self._min_red, self._margin)
+        # Only the keyed pixels, a small share of the frame, are gathered, as whole
+        # pixel words: (B, G) through the table, R and A set to 255.
+        icons = _words(src)[key]
+        icons &= 0xFFFF
+        icons = self._table[icons]
+        icons |= 0xFFFF0000
+        _words(dst)[key] = icons
+
+
+@register
+class DesaturateFilter(Filter):
+    # Pulls everything but the colour-keyed red pixels towards grey, so the icons are
+    # the only saturated colour left: channel * saturation + luma * (1 - saturation).
+    # Linear, so it runs in fixed point on whole pixel words, two channels per multiply
+    # in 16-bit lanes (as upscale._blend does) instead of through a table.
+    name = "desaturate"
+    label = "Desaturate background"
+
+    def __init__(self, saturation: float = 0.25, min_red: float = 150, margin: float = 60):
+        saturation = min(max(saturation, 0.0), 1.0)
+        self._min_red = int(min_red)
+        self._margin = int(margin)
+        # Weights of 256, rounded down so the two terms never add up past 255.
+        self._keep = np.uint32(int(saturation * 256))
+        fade = 1.0 - saturation
+        # BT.601 luma: R and B come from the same lane word, multiplied at once.
+        self._rb = np.uint32((int(29 * fade) << 16) | int(77 * fade))
+        self._g = np.uint32(int(150 * fade))
+
+    def apply(self, src, dst, ctx):
+        key = ctx.red_key(self._min_red, self._margin)
+        icons = _words(src)[key]
+        shape = src.shape[:2]
+        even = ctx.array("even", shape, np.uint32)  # B | R << 16
+        odd = ctx.array("odd", shape, np.uint32)  # G | A << 16
+        grey = ctx.array("grey", shape, np.uint32)
+        words = _words(src)
+        np.bitwise_and(words, _LANES, out=even)
+        np.right_shift(words, 8, out=odd)
+        odd &= _LANES
+        # High lane of even * (wb << 16 | wr) is wb * B + wr * R.
+        np.multiply(even, self._rb, out=grey)
+        grey >>= 16
+        scratch = _words(dst)  # overwritten below anyway
+        np.bitwise_and(odd, 0xFF, out=scratch)
+        scratch *= self._g
+        grey += scratch
+        grey >>= 8
+        grey *= 0x010101
+        # Every channel scaled by the saturation, then grey added to B, G and R.
+        even *= self._keep
+        even >>= 8
+        even &= _LANES
+        odd *= self._keep
+        odd &= ~_LANES
+        pixels = _words(dst)
+        np.bitwise_or(even, odd, out=pixels)
+        pixels += grey
+        pixels |= _OPAQUE
+        pixels[key] = icons
+
+
+class FilterChain:
+    # The filters named by `specs`, applied in registry order.
+
+    def __init__(self, specs=()):
+        parsed = {}
+        for spec in specs:
+            name, params = parse(spec)
+            parsed[name] = (spec, params)
+        names = [name for name in FILTERS if name in parsed]
+        self.specs = tuple(parsed[name][0] for name in names)
+        self.filters = [FILTERS[name](**parsed[name][1]) for name in names]
+        self._ctx = FilterContext()
+
+    def apply(self, src: np.ndarray, dst: np.ndarray, timings: dict | None = None):
+        # `timings` (name -> RollingStats) collects each filter's cost in ms.
+        self._ctx.start(src)
+        if not self.filters:
+            np.copyto(dst, src)
+        current = src
+        for f in self.filters:
+            t0 = time.perf_counter()
+            f.apply(current, dst, self._ctx)
+            if timings is not None:
+                timings[f.name].add((time.perf_counter() - t0) * 1000.0)
+            current = dst
+
+
+# Worker process state: the frame segments attached so far (one per FrameFilter using
+# the pool) and the chains built so far.
+_segments = {}
+_chains = {}
+_MAX_SEGMENTS = 8
+
+
+def _warm_up() -> bool:
+    return True
+
+
+def _filter_band(name: str, shape: tuple[int, int], rows: tuple[int, int], specs: tuple[str, ...]):
+    # Runs in a worker: filters rows [rows[0], rows[1]) of the input half of segment
+    # `name` into the output half.
+    segment = _segments.get(name)
+    if segment is None:
+        if len(_segments) >= _MAX_SEGMENTS:
+            # Oldest first: the FrameFilter it belonged to has most likely grown or closed.
+            _segments.pop(next(iter(_segments))).close()
+        segment = _segments[name] = attach(name)
+    chain = _chains.get(specs)
+    if chain is None:
+        chain = _chains[specs] = FilterChain(specs)
+    h, w = shape
+    frame = np.ndarray((2, h, w, 4), np.uint8, segment.buf)
+    chain.apply(frame[0, rows[0] : rows[1]], frame[1, rows[0] : rows[1]])
+
+
+class FilterPool:
+    # Worker processes filtering frames one band of rows each; the kernels are per-pixel,
+    # so bands need no overlap. One pool serves every preview (the application owns it).
+    # Frames travel through each FrameFilter's own shared-memory segment, so the only
+    # copies are into and out of it. Pays off for heavy chains with cores to spare; a
+    # small frame is faster in-process.
+
+    def __init__(self, workers: int):
+        self.workers = workers
+        self._executor = concurrent.futures.ProcessPoolExecutor(workers, multiprocessing.get_context("spawn"))
+        # Workers start in the background; until they are up, frames are filtered in-process.
+        self._warm = [self._executor.submit(_warm_up) for _ in range(workers)]
+
+    def ready(self) -> bool:
+        return all(f.done() for f in self._warm)
+
+    def run(self, segment: str, shape: tuple[int, int], specs: tuple[str, ...], done):
+        # Filters the input half of `segment` into its output half without waiting for it.
+        # `done(error)` is called once on a pool thread, with None or the exception.
+        h = shape[0]
+        bounds = np.linspace(0, h, self.workers + 1).astype(int)
+        bands = [(r0, r1) for r0, r1 in zip(bounds[:-1], bounds[1:]) if r1 > r0]
+        lock = threading.Lock()
+        state = {"left": len(bands), "error": None}
+
+        def band_done(future):
+            with lock:
+                if state["error"] is None and (future.cancelled() or future.exception() is not None):
+                    state["error"] = future.exception() if not future.cancelled() else OSError("Filter pool closed.")
+                state["left"] -= 1
+                last = state["left"] == 0
+            if last:
+                done(state["error"])
+
+        try:
+            futures = [self._executor.submit(_filter_band, segment, shape, rows, specs) for rows in bands]
+        except (RuntimeError, concurrent.futures.BrokenExecutor) as exc:
+            # Shut down or broken before anything was queued.
+            done(exc)
+            return
+        for future in futures:
+            future.add_done_callback(band_done)
+
+    def close(self):
+        self._executor.shutdown(wait=True, cancel_futures=True)
+
+
+class FrameFilter:
+    # The preview's filter stage. apply() runs the chain on the calling thread; with a
+    # shared FilterPool, submit() hands a frame to the workers instead and returns right
+    # away. One frame is in flight at a time: the caller collects it with result() and
+    # then finish(). Keeps the cost per frame and, when run in-process, per filter.
+
+    def __init__(self, specs=(), pool: FilterPool | None = None):
+        self.frames = 0
+        self.pooled_frames = 0
+        self.filter_ms = RollingStats()
+        self._pool = pool
+        self._shm = None
+        self._shape = None
+        self._busy = threading.Event()  # submitted and not yet finish()ed
+        self._idle = True  # no worker is writing into the segment
+        self._lock = threading.Lock()
+        self._retired = []  # segments released while workers were still writing to them
+        self._submitted_at = 0.0
+        self.set_filters(specs)
+
+    @property
+    def active(self) -> bool:
+        return bool(self._chain.filters)
+
+    @property
+    def pooled(self) -> bool:
+        # Whether frames should go through submit(): workers are up and none has died.
+        return self._pool is not None and self._pool.ready()
+
+    @property
+    def busy(self) -> bool:
+        return self._busy.is_set()
+
+    @property
+    def specs(self) -> tuple[str, ...]:
+        return self._chain.specs
+
+    def names(self) -> list[str]:
+        return [f.name for f in self._chain.filters]
+
+    def set_filters(self, specs):
+        # A frame in flight finishes with the old chain; its result() is the caller's to drop.
+        self._chain = FilterChain(specs)
+        self._timings = {f.name: RollingStats() for f in self._chain.filters}
+
+    def apply(self, src: np.ndarray, dst: np.ndarray):
+        # src: the frame as captured (may be a strided view); dst: (h, w, 4) uint8.
+        t0 = time.perf_counter()
+        self._chain.apply(src, dst, self._timings)
+        self.frames += 1
+        self.filter_ms.add((time.perf_counter() - t0) * 1000.0)
+
+    def submit(self, src: np.ndarray, done) -> bool:
+        # Copies `src` into the shared segment and queues it on the pool; `done(ok)` is
+        # called on a pool thread when result() is ready. False when a frame is already
+        # in flight or there is no pool.
+        if not self.pooled or self._busy.is_set():
+            return False
+        h, w = src.shape[:2]
+        size = 2 * h * w * 4
+        if self._shm is None or self._shm.size < size:
+            self._release()
+            self._shm = shared_memory.SharedMemory(create=True, size=size)
+        self._shape = (h, w)
+        np.copyto(self._frame()[0], src)
+        self._busy.set()
+        self._idle = False
+        self._submitted_at = time.perf_counter()
+
+        def finished(error):
+            with self._lock:
+                self._idle = True
+                retired, self._retired = self._retired, []
+            for shm in retired:
+                _free(shm)
+            if error is not None:
+                # A worker died or the pool closed; carry on in-process.
+                traceback.print_exception(error)
+                self._pool = None
+            else:
+                self.frames += 1
+                self.pooled_frames += 1
+                self.filter_ms.add((time.perf_counter() - self._submitted_at) * 1000.0)
+            done(error is None)
+
+        self._pool.run(self._shm.name, self._shape, self._chain.specs, finished)
+        return True
+
+    def result(self) -> np.ndarray | None:
+        # The submitted frame, filtered: a view into the segment, valid until finish().
+        # None once close() has released it.
+        return self._frame()[1] if self._shm is not None else None
+
+    def finish(self):
+        # The result has been copied out; the next frame may be submitted.
+        self._busy.clear()
+
+    def stats(self) -> dict:
+        return {
+            "filters": self.names(),
+            "frames": self.frames,
+            "pooled_frames": self.pooled_frames,
+            "workers": self._pool.workers if self._pool is not None else 0,
+            "filter_p50_ms": self.filter_ms.percentile(50),
+            "filter_max_ms": self.filter_ms.max(),
+            **{f"{name}_p50_ms": stats.percentile(50) for name, stats in self._timings.items()},
+        }
+
+    def close(self):
+        # Leaves the shared pool running; only this filter's segment is released.
+        self._release()
+
+    def _frame(self) -> np.ndarray:
+        h, w = self._shape
+        return np.ndarray((2, h, w, 4), np.uint8, self._shm.buf)
+
+    def _release(self):
+        if self._shm is None:
+            return
+        shm, self._shm = self._shm, None
+        self._busy.clear()
+        with self._lock:
+            if not self._idle:
+                # Workers are still writing a frame nobody will collect; never wait for
+                # them here: the pool's completion callback frees the segment.
+                self._retired.append(shm)
+                return
+        _free(shm)
+
+
+def _free(shm: shared_memory.SharedMemory):
+    shm.close()
+    shm.unlink()
@@ -0,0 +1,50 @@
+import numpy as np
+from PyQt6 import QtGui
+
+# Frames handed to consumers are 32-bit ARGB in native (little-endian) order, i.e. the
+# bytes of each pixel are B, G, R, A. Screen grabs are opaque, so alpha is always 255
+# and Format_RGB32 shares the exact same memory layout; neither is converted.
+FRAME_FORMAT = QtGui.QImage.Format.Format_ARGB32_Premultiplied
+_NATIVE_FORMATS = (
+    QtGui.QImage.Format.Format_ARGB32_Premultiplied,
+    QtGui.QImage.Format.Format_RGB32,
+    QtGui.QImage.Format.Format_ARGB32,
+)
+
+# Channel indices into the last axis of a frame view.
+B, G, R, A = 0, 1, 2, 3
+
+
+def normalize(image: QtGui.QImage) -> QtGui.QImage:
+    # Only exotic grabs (e.g. 16-bit desktops) pay for a conversion.
+    if image.isNull() or image.format() in _NATIVE_FORMATS:
+        return image
+    return image.convertToFormat(FRAME_FORMAT)
+
+
+def frame_view(image: QtGui.QImage) -> np.ndarray:
+    # Read-only (height, width, 4) uint8 view over the QImage's own pixel buffer; no
+    # pixel data is copied. Rows may be padded, so use the strides rather than assuming
+    # a contiguous array. The view does not keep `image` alive: it is only valid while
+    # the caller holds the image (for consumers, the duration of the callback).
+    ptr = image.constBits()
+    ptr.setsize(image.sizeInBytes())
+    return np.ndarray(
+        shape=(image.height(), image.width(), 4),
+        dtype=np.uint8,
+        buffer=ptr,
+        strides=(image.bytesPerLine(), 4, 1),
+    )
+
+
+def writable_view(image: QtGui.QImage) -> np.ndarray:
+    # Writable counterpart of frame_view(). bits() detaches first, so an image that is
+    # shared with another holder is copied rather than written under it.
+    ptr = image.bits()
+    ptr.setsize(image.sizeInBytes())
+    return np.ndarray(
+        shape=(image.height(), image.width(), 4),
+        dtype=np.uint8,
+        buffer=ptr,
+        strides=(image.bytesPerLine(), 4, 1),
+    )
@@ -0,0 +1,163 @@
+import threading
+from collections import deque
+from dataclasses import dataclass
+import numpy as np
+from PyQt6 import QtGui
+from . import frames
+from .recorder import apply_runs, encode_runs
+
+# Per-entry bookkeeping (deque slot, tuple, bytes object header) counted against the budget.
+_ENTRY_OVERHEAD = 160
+
+
+@dataclass
+class _Entry:
+    timestamp: float
+    payload: bytes
+    width: int
+    height: int
+    key: bool
+
+    @property
+    def nbytes(self) -> int:
+        return len(self.payload) + _ENTRY_OVERHEAD
+
+
+class FrameHistory:
+    # In-memory rewind buffer: the last `seconds` of changed frames, stored as pixel runs
+    # against the previous frame with a keyframe every `key_interval` frames, and evicted
+    # oldest-first to stay under `budget` bytes. The oldest entry is always a keyframe.
+    # Pushed from the capture thread, read from the GUI thread.
+
+    def __init__(self, seconds: float, budget: int, key_interval: int = 30):
+        self._seconds = seconds
+        self._budget = budget
+        self._key_interval = key_interval
+        self._lock = threading.Lock()
+        self._entries = deque()
+        self._bytes = 0
+        self._prev = None
+        self._spare = None  # the previous frame's buffer before last, refilled by push()
+        self._since_key = 0
+        self._decoded_index = None
+        self._decoded = None
+        self.rejected = 0
+        self.allocations = 0
+        self.allocated_bytes = 0
+
+    @property
+    def budget(self) -> int:
+        return self._budget
+
+    @property
+    def bytes_used(self) -> int:
+        return self._bytes
+
+    def __len__(self):
+        return len(self._entries)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+            self._prev = None
+            self._spare = None
+            self._decoded_index = None
+            self._decoded = None
+
+    def push(self, image: QtGui.QImage, timestamp: float):
+        if image.isNull():
+            return
+        size = (image.width(), image.height())
+        with self._lock:
+            # Two flat buffers take turns as the current and the previous frame.
+            cur = self._spare
+            if cur is None or cur.size != size[0] * size[1]:
+                cur = np.empty(size[0] * size[1], "<u4")
+                self.allocations += 1
+                self.allocated_bytes += cur.nbytes
+            np.copyto(cur.view(np.uint8).reshape(size[1], size[0], 4), frames.frame_view(image))
+            prev = self._prev
+            key = (
+                prev is None
+                or not self._entries
+                or (self._entries[-1].width, self._entries[-1].height) != size
+                or self._since_key >= self._key_interval
+            )
+            entry = _Entry(timestamp, encode_runs(cur, None if key else prev), size[0], size[1], key)
+            if entry.nbytes > self._budget:
+                # A single frame of this selection cannot fit: keep nothing rather than overrun.
+                self.rejected += 1
+                self._entries.clear()
+                self._bytes = 0
+                self._prev = None
+                self._decoded_index = None
+                return
+            self._entries.append(entry)
+            self._bytes += entry.nbytes
+            self._since_key = 0 if key else self._since_key + 1
+            self._spare = prev
+            self._prev = cur
+            self._evict(timestamp)
+
+    def _evict(self, now: float):
+        while self._entries and (
+            self._bytes > self._budget or now - self._entries[0].timestamp > self._seconds
+        ):
+            if len(self._entries) == 1:
+                if self._bytes > self._budget:
+                    self._entries.clear()
+                    self._bytes = 0
+                break
+            oldest = self._entries.popleft()
+            self._bytes -= oldest.nbytes
+            nxt = self._entries[0]
+            if not nxt.key:
+                # Fold the dropped keyframe into its successor so the chain stays decodable.
+                pixels = np.zeros(oldest.width * oldest.height, dtype="<u4")
+                apply_runs(oldest.payload, pixels)
+                apply_runs(nxt.payload, pixels)
+                folded = _Entry(nxt.timestamp, encode_runs(pixels, None), nxt.width, nxt.height, True)
+                self._bytes += folded.nbytes - nxt.nbytes
+                self._entries[0] = folded
+            self._decoded_index = None
+
+    def timestamp(self, index: int) -> float:
+        with self._lock:
+            return self._entries[index].timestamp
+
+    def frame(self, index: int) -> QtGui.QImage:
+        with self._lock:
+            entries = self._entries
+            if not 0 <= index < len(entries):
+                raise IndexError(f"History frame {index} out of range (0..{len(entries) - 1}).")
+            key = index
+            while not entries[key].key:
+                key -= 1
+            cached = self._decoded_index
+            if cached is not None and key <= cached <= index:
+                start, pixels = cached + 1, self._decoded
+            else:
+                start = key
+                pixels = np.zeros(entries[key].width * entries[key].height, dtype="<u4")
+            for i in range(start, index + 1):
+                apply_runs(entries[i].payload, pixels)
+            self._decoded_index = index
+            self._decoded = pixels
+            width, height = entries[index].width, entries[index].height
+        image = QtGui.QImage(pixels.tobytes(), width, height, width * 4, frames.FRAME_FORMAT)
+        # Detach from the temporary bytes object.
+        return image.copy()
+
+    def stats(self) -> dict:
+        with self._lock:
+            span = self._entries[-1].timestamp - self._entries[0].timestamp if self._entries else 0.0
+            return {
+                "frames": len(self._entries),
+                "bytes": self._bytes,
+                "budget": self._budget,
+                "span_s": span,
+                "rejected": self.rejected,
+                "allocations": self.allocations,
+                "allocated_bytes": self.allocated_bytes,
+            }
@@ -0,0 +1,183 @@
+import math
+import time
+from dataclasses import dataclass
+import numpy as np
+from PyQt6 import QtCore, QtGui
+from . import frames
+
+# The minimap is a square whose side is this fraction of the screen height across HUD
+# and minimap scale settings.
+MIN_SIDE_FRAC = 0.12
+MAX_SIDE_FRAC = 0.45
+
+# Height of the coarsest pyramid level; the full search runs there.
+_COARSE_HEIGHT = 216
+# Coarse candidates carried to full resolution, and how close to the best one they must score.
+_CANDIDATES = 3
+_CANDIDATE_RATIO = 0.5
+# A framed minimap also scores on its inner rim; a larger square enclosing the best one
+# that scores at least this fraction of it is the outer frame and wins.
+_OUTER_RATIO = 0.5
+
+# Which image edges (top, bottom, left, right) are screen edges; see _gray().
+SCREEN_EDGES = (True, True, True, True)
+
+
+@dataclass
+class MinimapMatch:
+    rect: QtCore.QRect  # image pixels
+    score: float  # weakest side's mean edge contrast, 0-255
+    elapsed_ms: float
+
+
+def _gray(view: np.ndarray, top: int, bottom: int, left: int, right: int, edges=SCREEN_EDGES) -> np.ndarray:
+    # Cheap luma in float32 of view[top:bottom, left:right] plus a 1 px frame. The frame is
+    # black past a screen edge, so the edge counts as one and a minimap flush with the
+    # bottom/right of the screen still has four sides; inside the image it is real pixels.
+    # Image edges that are not screen edges (`edges`: top, bottom, left, right) repeat the
+    # border pixels instead, so a cropped grab has no edge of its own.
+    h, w = view.shape[:2]
+    t, b, l, r = max(0, top - 1), min(h, bottom + 1), max(0, left - 1), min(w, right + 1)
+    crop = view[t:b, l:r]
+    g = crop[..., frames.G].astype(np.float32) * 2.0
+    g += crop[..., frames.R]
+    g += crop[..., frames.B]
+    g *= 0.25
+    pad = ((t - (top - 1), (bottom + 1) - b), (l - (left - 1), (right + 1) - r))
+    g = np.pad(g, pad)
+    if pad[0][0] and not edges[0]:
+        g[0] = g[1]
+    if pad[0][1] and not edges[1]:
+        g[-1] = g[-2]
+    if pad[1][0] and not edges[2]:
+        g[:, 0] = g[:, 1]
+    if pad[1][1] and not edges[3]:
+        g[:, -1] = g[:, -2]
+    return g
+
+
+def _side_sums(gray: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    # cv[y, x]: vertical-edge strength at column x (between x-1 and x), summed over rows < y.
+    # ch[y, x]: horizontal-edge strength at row y (between y-1 and y), summed over columns < x.
+    h, w = gray.shape
+    ev = np.zeros((h, w), np.float32)
+    ev[:, 1:] = np.abs(np.diff(gray, axis=1))
+    eh = np.zeros((h, w), np.float32)
+    eh[1:, :] = np.abs(np.diff(gray, axis=0))
+    cv = np.zeros((h + 1, w), np.float32)
+    np.cumsum(ev, axis=0, out=cv[1:])
+    ch = np.zeros((h, w + 1), np.float32)
+    np.cumsum(eh, axis=1, out=ch[:, 1:])
+    return cv, ch
+
+
+def _square_scores(cv, ch, s: int, y0: int, y1: int, x0: int, x1: int) -> np.ndarray:
+    # Score of every s x s square with its top-left in [y0, y1) x [x0, x1): the mean edge
+    # contrast of its weakest side, so all four borders have to be present.
+    vertical = cv[y0 + s : y1 + s, x0 : x1 + s] - cv[y0:y1, x0 : x1 + s]
+    horizontal = ch[y0 : y1 + s, x0 + s : x1 + s] - ch[y0 : y1 + s, x0:x1]
+    scores = np.minimum(vertical[:, : x1 - x0], vertical[:, s : s + x1 - x0])
+    np.minimum(scores, horizontal[: y1 - y0], out=scores)
+    np.minimum(scores, horizontal[s : s + y1 - y0], out=scores)
+    scores *= 1.0 / s
+    return scores
+
+
+def _search(gray: np.ndarray, sizes, y_range, x_range) -> list[tuple[float, int, int, int]]:
+    # Best (score, y, x, s) per size, in padded coordinates.
+    cv, ch = _side_sums(gray)
+    h, w = gray.shape
+    results = []
+    for s in sizes:
+        y0, y1 = max(1, y_range[0]), min(h - s, y_range[1])
+        x0, x1 = max(1, x_range[0]), min(w - s, x_range[1])
+        if y1 <= y0 or x1 <= x0:
+            continue
+        scores = _square_scores(cv, ch, s, y0, y1, x0, x1)
+        iy, ix = np.unravel_index(int(np.argmax(scores)), scores.shape)
+        results.append((float(scores[iy, ix]), y0 + int(iy), x0 + int(ix), s))
+    return results
+
+
+def _overlap(a, b) -> float:
+    _, ay, ax, as_ = a
+    _, by, bx, bs = b
+    iw = min(ax + as_, bx + bs) - max(ax, bx)
+    ih = min(ay + as_, by + bs) - max(ay, by)
+    if iw <= 0 or ih <= 0:
+        return 0.0
+    return iw * ih / min(as_ * as_, bs * bs)
+
+
+def _encloses(a, b) -> bool:
+    _, ay, ax, as_ = a
+    _, by, bx, bs = b
+    return ax <= bx and ay <= by and ax + as_ >= bx + bs and ay + as_ >= by + bs
+
+
+def find_minimap(
+    image: QtGui.QImage,
+    min_score: float = 12.0,
+    sides: tuple[int, int] | None = None,
+    edges: tuple[bool, bool, bool, bool] = SCREEN_EDGES,
+) -> MinimapMatch | None:
+    # Coarse-to-fine: an exhaustive square search on a ~216 px high downscale, then a
+    # small window around the best few candidates at full resolution. `sides` bounds the
+    # side length in image pixels; by default it follows from the screen height. For a
+    # grab of part of a screen, `edges` says which image edges are the screen's.
+    t0 = time.perf_counter()
+    image = frames.normalize(image)
+    width, height = image.width(), image.height()
+    if width < 32 or height < 32:
+        return None
+    factor = max(1, round(height / _COARSE_HEIGHT))
+    cw, ch_ = width // factor, height // factor
+    coarse = image.scaled(
+        cw, ch_, QtCore.Qt.AspectRatioMode.IgnoreAspectRatio, QtCore.Qt.TransformationMode.SmoothTransformation
+    )
+    gray = _gray(frames.frame_view(coarse), 0, ch_, 0, cw, edges)
+    sx, sy = width / cw, height / ch_
+    if sides is None:
+        side_min, side_max = max(8, int(MIN_SIDE_FRAC * ch_)), int(MAX_SIDE_FRAC * ch_)
+    else:
+        side_min, side_max = max(8, int(sides[0] / sy)), min(cw, ch_, int(math.ceil(sides[1] / sy)))
+    coarse_hits = sorted(_search(gray, range(side_min, side_max + 1), (0, ch_ + 2), (0, cw + 2)), reverse=True)
+
+    candidates = []
+    for hit in coarse_hits:
+        if hit[0] < _CANDIDATE_RATIO * coarse_hits[0][0]:
+            break
+        if all(_overlap(hit, kept) < 0.5 for kept in candidates):
+            candidates.append(hit)
+        if len(candidates) == _CANDIDATES:
+            break
+
+    view = frames.frame_view(image)
+    best = None
+    reach = int(max(sx, sy)) + 2  # one coarse pixel of slack, in full-resolution pixels
+    for _, cy, cx, cs in candidates:
+        x, y, s = round((cx - 1) * sx), round((cy - 1) * sy), round(cs * sy)
+        # The coarse hit may be the inner rim, so the window leans outwards by another reach.
+        margin = 3 * reach + 2
+        left, top = max(0, x - margin), max(0, y - margin)
+        right, bottom = min(width, x + s + margin), min(height, y + s + margin)
+        gray = _gray(view, top, bottom, left, right, edges)
+        sizes = range(max(8, s - 2 * reach), s + 4 * reach + 1)
+        # Window of top-left positions around the candidate, in padded crop coordinates.
+        py, px = y - top + 1, x - left + 1
+        hits = _search(gray, sizes, (py - 2 * reach, py + reach + 1), (px - 2 * reach, px + reach + 1))
+        if not hits:
+            continue
+        inner = max(hits)
+        outer = max(
+            (hit for hit in hits if hit[0] >= _OUTER_RATIO * inner[0] and _encloses(hit, inner)),
+            key=lambda hit: hit[3],
+        )
+        if best is None or inner[0] > best[0]:
+            best = (inner[0], outer[1] - 1 + top, outer[2] - 1 + left, outer[3])
+
+    elapsed = (time.perf_counter() - t0) * 1000.0
+    if best is None or best[0] < min_score:
+        return None
+    score, y, x, s = best
+    return MinimapMatch(QtCore.QRect(x, y, s, s), score, elapsed)
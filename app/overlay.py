@@ -1,8 +1,43 @@
+import math
+import time
+from dataclasses import dataclass
 from PyQt6 import QtCore, QtGui, QtWidgets
 from .config import AppConfig
+from .minimap import find_minimap
+from .stats import RollingStats
+
+# Half-widths of what is drawn around each feature, including antialiasing.
+_CROSSHAIR_PAD = 1
+_BORDER_PAD = 3
+
+# Loupe: LOUPE_PIXELS x LOUPE_PIXELS device pixels around the cursor, each LOUPE_ZOOM wide.
+LOUPE_PIXELS = 21
+LOUPE_ZOOM = 8
+_LOUPE_OFFSET = 24
+_LOUPE_TEXT_H = 20
+
+
+def _region_area(region: QtGui.QRegion) -> int:
+    # PyQt6 does not expose QRegion's rects; a path gets one rectangular subpath per rect.
+    path = QtGui.QPainterPath()
+    path.addRegion(region)
+    return int(sum(p.boundingRect().width() * p.boundingRect().height() for p in path.toSubpathPolygons()))
+
+
+@dataclass
+class _ScreenShot:
+    rect: QtCore.QRect  # screen geometry in overlay coordinates (logical pixels)
+    image: QtGui.QImage  # device pixels, devicePixelRatio set
+    dpr: float
 
 
 class SnipOverlay(QtWidgets.QWidget):
+    # Full-desktop selection over a snapshot grabbed once in start(): the desktop stays
+    # frozen while selecting, and the loupe samples the snapshot instead of the screen.
+    # Global logical coordinates. Capture backends, sessions and the tracker all work in
+    # logical coordinates (grabWindow takes them). The rect is the smallest logical rect
+    # covering the device pixels shown as selected; at integer scaling that is exactly
+    # them, at fractional scaling it can include one more device pixel on an edge.
     selectionMade = QtCore.pyqtSignal(QtCore.QRect)
     canceled = QtCore.pyqtSignal()
 
@@ -14,104 +49,410 @@ class SnipOverlay(QtWidgets.QWidget):
             | QtCore.Qt.WindowType.WindowStaysOnTopHint
             | QtCore.Qt.WindowType.Tool
         )
-        self.setAttribute(QtCore.Qt.WidgetAttribute.WA_TranslucentBackground)
+        # The snapshot covers every pixel, so the window is opaque rather than layered.
+        self.setAttribute(QtCore.Qt.WidgetAttribute.WA_OpaquePaintEvent)
         self.setCursor(QtCore.Qt.CursorShape.CrossCursor)
-        self._origin = None
+        self._origin = None  # QPointF, overlay coordinates
         self._current = None
         self._last_pos = None
+        self._shots = []
         self._cancel_btn = QtWidgets.QPushButton("Cancel", self)
         self._cancel_btn.setObjectName("CancelButton")
         self._cancel_btn.clicked.connect(self._cancel)
         self._cancel_btn.hide()
+        self._detect_btn = QtWidgets.QPushButton("Auto-detect Minimap", self)
+        self._detect_btn.setObjectName("DetectButton")
+        self._detect_btn.clicked.connect(self.auto_detect)
+        self._detect_btn.hide()
 
-    def start(self):
+        # Mouse moves are applied at most once per display frame; the newest one wins.
+        self._pending_pos = None
+        self._frame_ms = 16.0
+        self._move_timer = QtCore.QTimer(self)
+        self._move_timer.setSingleShot(True)
+        self._move_timer.setTimerType(QtCore.Qt.TimerType.PreciseTimer)
+        self._move_timer.timeout.connect(self._flush_move)
+
+        self._shown_at = None
+        self.show_latency_ms = RollingStats()
+        self.snapshot_ms = RollingStats()
+        self.painted_px = RollingStats()
+        self.detect_ms = RollingStats()
+        self.paints = 0
+        self.moves = 0
+        self.coalesced = 0
+
+    def prewarm(self):
+        # Creates the native window up front so start() only has to map it.
+        self.setGeometry(QtGui.QGuiApplication.primaryScreen().virtualGeometry())
+        self.ensurePolished()
+        self._cancel_btn.ensurePolished()
+        self._detect_btn.ensurePolished()
+        self.winId()
+
+    def start(self, requested_at: float | None = None):
+        # `requested_at` (perf_counter) is when the hotkey fired; latency runs to the first paint.
+        self._shown_at = requested_at if requested_at is not None else time.perf_counter()
         # Cover the entire virtual desktop (all monitors)
         virtual_geo = QtGui.QGuiApplication.primaryScreen().virtualGeometry()
-        self.setGeometry(virtual_geo)
+        if self.geometry() != virtual_geo:
+            self.setGeometry(virtual_geo)
+        # Grab before showing so the overlay itself is not in the snapshot.
+        self._grab_snapshot(virtual_geo)
         self._origin = None
         self._current = None
         self._last_pos = None
+        self._pending_pos = None
+        self._frame_ms = 1000.0 / max(1.0, QtGui.QGuiApplication.primaryScreen().refreshRate())
+        self._detect_btn.setText("Auto-detect Minimap")
+        self._detect_btn.setEnabled(True)
+        self._place_buttons()
         self._cancel_btn.show()
+        self._detect_btn.show()
         self.show()
         self.raise_()
         self.activateWindow()
 
+    def _grab_snapshot(self, virtual_geo: QtCore.QRect):
+        t0 = time.perf_counter()
+        shots = []
+        for screen in QtGui.QGuiApplication.screens():
+            image = screen.grabWindow(0).toImage()
+            if image.isNull():
+                continue
+            rect = screen.geometry().translated(-virtual_geo.topLeft())
+            # Derive the ratio from the grab itself; not every platform tags the pixmap.
+            dpr = image.width() / max(1, rect.width())
+            image.setDevicePixelRatio(dpr)
+            shots.append(_ScreenShot(rect, image, dpr))
+        self._shots = shots
+        self.snapshot_ms.add((time.perf_counter() - t0) * 1000.0)
+
+    def _finish(self):
+        self._move_timer.stop()
+        self._pending_pos = None
+        self.hide()
+        self._cancel_btn.hide()
+        self._detect_btn.hide()
+        self._origin = None
+        self._current = None
+        self._last_pos = None
+        # A desktop-sized snapshot is large; drop it until the next start().
+        self._shots = []
+
+    def stats(self) -> dict:
+        area = self.width() * self.height()
+        return {
+            "show_p50_ms": self.show_latency_ms.percentile(50),
+            "show_max_ms": self.show_latency_ms.max(),
+            "snapshot_p50_ms": self.snapshot_ms.percentile(50),
+            "detect_p50_ms": self.detect_ms.percentile(50),
+            "paints": self.paints,
+            "moves": self.moves,
+            "coalesced_moves": self.coalesced,
+            "painted_px_p50": self.painted_px.percentile(50),
+            "painted_fraction_p50": self.painted_px.percentile(50) / area if area else 0.0,
+        }
+
+    def _shot_at(self, pos: QtCore.QPointF) -> _ScreenShot | None:
+        for shot in self._shots:
+            if QtCore.QRectF(shot.rect).contains(pos):
+                return shot
+        return None
+
+    def _device_pixel(self, shot: _ScreenShot, pos: QtCore.QPointF) -> QtCore.QPoint:
+        # Device pixel under `pos`, relative to the screen's top-left.
+        x = math.floor((pos.x() - shot.rect.x()) * shot.dpr)
+        y = math.floor((pos.y() - shot.rect.y()) * shot.dpr)
+        return QtCore.QPoint(
+            max(0, min(x, shot.image.width() - 1)),
+            max(0, min(y, shot.image.height() - 1)),
+        )
+
+    def _device_selection(self) -> tuple[_ScreenShot, QtCore.QRect] | None:
+        # Selection snapped to whole device pixels, including both the origin and the
+        # current pixel. A selection spanning screens has no single device pixel grid.
+        if self._origin is None or self._current is None:
+            return None
+        shot = self._shot_at(self._origin)
+        if shot is None or self._shot_at(self._current) is not shot:
+            return None
+        a = self._device_pixel(shot, self._origin)
+        b = self._device_pixel(shot, self._current)
+        return shot, QtCore.QRect(a, b).normalized()
+
+    @staticmethod
+    def _logical_rect(shot: _ScreenShot, rect: QtCore.QRect) -> QtCore.QRect:
+        # Screen device-pixel rect to the overlay-coordinate rect covering it.
+        left = math.floor(rect.left() / shot.dpr)
+        top = math.floor(rect.top() / shot.dpr)
+        right = math.ceil((rect.right() + 1) / shot.dpr) - 1
+        bottom = math.ceil((rect.bottom() + 1) / shot.dpr) - 1
+        return QtCore.QRect(QtCore.QPoint(left, top), QtCore.QPoint(right, bottom)).translated(shot.rect.topLeft())
+
+    def _device_origin(self, shot: _ScreenShot) -> QtCore.QPoint:
+        # Top-left of the shot's screen in global device pixels.
+        return QtCore.QPoint(
+            round((shot.rect.x() + self.x()) * shot.dpr),
+            round((shot.rect.y() + self.y()) * shot.dpr),
+        )
+
+    def _selection(self) -> QtCore.QRect | None:
+        # Selection in overlay (logical) coordinates: the device selection mapped back
+        # outwards, or the plain point rect when there is no snapshot to snap to.
+        device = self._device_selection()
+        if device is not None:
+            return self._logical_rect(*device)
+        if self._origin is not None and self._current is not None:
+            return QtCore.QRect(self._origin.toPoint(), self._current.toPoint()).normalized()
+        return None
+
+    def _label_text(self, rect: QtCore.QRect) -> str:
+        # Size in device pixels of what the preview will capture: the logical rect, which
+        # at fractional scaling can reach one device pixel past the snapped selection.
+        device = self._device_selection()
+        if device is not None:
+            logical = self._logical_rect(*device)
+            return f"{round(logical.width() * device[0].dpr)} x {round(logical.height() * device[0].dpr)}"
+        return f"{rect.width()} x {rect.height()}"
+
+    def _label_rect(self, rect: QtCore.QRect, metrics: QtGui.QFontMetrics) -> QtCore.QRect:
+        label_rect = metrics.boundingRect(self._label_text(rect)).adjusted(-6, -3, 6, 3)
+        label_rect.moveTopLeft(rect.topLeft() + QtCore.QPoint(6, -label_rect.height() - 6))
+        if label_rect.top() < 0:
+            label_rect.moveTop(rect.topLeft().y() + 6)
+        return label_rect
+
+    def _loupe_rect(self, pos: QtCore.QPointF | None) -> QtCore.QRect | None:
+        if pos is None or not self._shots:
+            return None
+        side = LOUPE_PIXELS * LOUPE_ZOOM
+        rect = QtCore.QRect(0, 0, side, side + _LOUPE_TEXT_H)
+        p = pos.toPoint()
+        # Below-right of the cursor, flipped to the other side near the desktop edges.
+        x = p.x() + _LOUPE_OFFSET
+        y = p.y() + _LOUPE_OFFSET
+        if x + rect.width() > self.width():
+            x = p.x() - _LOUPE_OFFSET - rect.width()
+        if y + rect.height() > self.height():
+            y = p.y() - _LOUPE_OFFSET - rect.height()
+        rect.moveTopLeft(QtCore.QPoint(x, y))
+        return rect
+
+    def _crosshair_region(self, pos: QtCore.QPointF | None) -> QtGui.QRegion:
+        if pos is None:
+            return QtGui.QRegion()
+        p = pos.toPoint()
+        pad = _CROSSHAIR_PAD
+        region = QtGui.QRegion(0, p.y() - pad, self.width(), 2 * pad + 1)
+        return region.united(QtGui.QRegion(p.x() - pad, 0, 2 * pad + 1, self.height()))
+
+    def _selection_dirty(self, old, new, old_label, new_label) -> QtGui.QRegion:
+        # The undimmed interior only changes where the two rects differ; borders and
+        # size labels are repainted in full at both positions.
+        dirty = QtGui.QRegion(old or QtCore.QRect()).xored(QtGui.QRegion(new or QtCore.QRect()))
+        for rect, label in ((old, old_label), (new, new_label)):
+            if rect is None:
+                continue
+            outer = QtGui.QRegion(rect.adjusted(-_BORDER_PAD, -_BORDER_PAD, _BORDER_PAD, _BORDER_PAD))
+            inner = QtGui.QRegion(rect.adjusted(_BORDER_PAD, _BORDER_PAD, -_BORDER_PAD, -_BORDER_PAD))
+            dirty = dirty.united(outer.subtracted(inner))
+            dirty = dirty.united(QtGui.QRegion(label.adjusted(-1, -1, 1, 1)))
+        return dirty
+
+    def _state(self):
+        # Everything drawn over the snapshot, for dirty-region diffs.
+        sel = self._selection()
+        label = self._label_rect(sel, self.fontMetrics()) if sel is not None else None
+        return self._last_pos, sel, label, self._loupe_rect(self._last_pos)
+
+    def _invalidate(self, old, new):
+        old_pos, old_sel, old_label, old_loupe = old
+        new_pos, new_sel, new_label, new_loupe = new
+        dirty = self._crosshair_region(old_pos).united(self._crosshair_region(new_pos))
+        dirty = dirty.united(self._selection_dirty(old_sel, new_sel, old_label, new_label))
+        for loupe in (old_loupe, new_loupe):
+            if loupe is not None:
+                dirty = dirty.united(QtGui.QRegion(loupe.adjusted(-2, -2, 2, 2)))
+        self.update(dirty)
+
     def paintEvent(self, event):
+        self.paints += 1
+        self.painted_px.add(_region_area(event.region()))
+        if self._shown_at is not None:
+            self.show_latency_ms.add((time.perf_counter() - self._shown_at) * 1000.0)
+            self._shown_at = None
+
+        # The painter is clipped to the invalidated region, so only that area is drawn.
         painter = QtGui.QPainter(self)
-        painter.setRenderHint(QtGui.QPainter.RenderHint.Antialiasing)
-        # Darken the background
+        painter.fillRect(self.rect(), QtGui.QColor(24, 24, 24))
+        for shot in self._shots:
+            painter.drawImage(shot.rect.topLeft(), shot.image)
+
+        rect = self._selection()
+        # Darken the background, leaving the selection at full brightness
+        painter.save()
+        if rect is not None:
+            outside = QtGui.QRegion(self.rect()).subtracted(QtGui.QRegion(rect))
+            painter.setClipRegion(outside, QtCore.Qt.ClipOperation.IntersectClip)
         painter.fillRect(self.rect(), QtGui.QColor(0, 0, 0, 120))
+        painter.restore()
 
-        if self._last_pos:
+        painter.setRenderHint(QtGui.QPainter.RenderHint.Antialiasing)
+        if self._last_pos is not None:
             # Crosshair
+            p = self._last_pos.toPoint()
             pen = QtGui.QPen(QtGui.QColor(0, 200, 255, 180), 1, QtCore.Qt.PenStyle.DashLine)
             painter.setPen(pen)
-            painter.drawLine(0, self._last_pos.y(), self.width(), self._last_pos.y())
-            painter.drawLine(self._last_pos.x(), 0, self._last_pos.x(), self.height())
-
-        if self._origin and self._current:
-            rect = QtCore.QRect(self._origin, self._current).normalized()
-            # Clear the selection area
-            painter.setCompositionMode(QtGui.QPainter.CompositionMode.CompositionMode_Clear)
-            painter.fillRect(rect, QtCore.Qt.GlobalColor.transparent)
-            painter.setCompositionMode(QtGui.QPainter.CompositionMode.CompositionMode_SourceOver)
+            painter.drawLine(0, p.y(), self.width(), p.y())
+            painter.drawLine(p.x(), 0, p.x(), self.height())
+
+        if rect is not None:
             # Draw selection border
             pen = QtGui.QPen(QtGui.QColor(0, 200, 255), 2)
             painter.setPen(pen)
             painter.drawRect(rect)
 
             # Size label
-            label = f"{rect.width()} x {rect.height()}"
-            metrics = painter.fontMetrics()
-            label_rect = metrics.boundingRect(label).adjusted(-6, -3, 6, 3)
-            label_rect.moveTopLeft(rect.topLeft() + QtCore.QPoint(6, -label_rect.height() - 6))
-            if label_rect.top() < 0:
-                label_rect.moveTop(rect.topLeft().y() + 6)
+            label_rect = self._label_rect(rect, painter.fontMetrics())
             painter.fillRect(label_rect, QtGui.QColor(0, 0, 0, 160))
             painter.setPen(QtGui.QColor(230, 230, 230))
-            painter.drawText(label_rect, QtCore.Qt.AlignmentFlag.AlignCenter, label)
+            painter.drawText(label_rect, QtCore.Qt.AlignmentFlag.AlignCenter, self._label_text(rect))
+
+        self._paint_loupe(painter)
+
+    def _paint_loupe(self, painter: QtGui.QPainter):
+        loupe = self._loupe_rect(self._last_pos)
+        shot = self._shot_at(self._last_pos) if loupe is not None else None
+        if shot is None:
+            return
+        center = self._device_pixel(shot, self._last_pos)
+        half = LOUPE_PIXELS // 2
+        source = QtCore.QRect(center.x() - half, center.y() - half, LOUPE_PIXELS, LOUPE_PIXELS)
+        side = LOUPE_PIXELS * LOUPE_ZOOM
+        view = QtCore.QRect(loupe.topLeft(), QtCore.QSize(side, side))
+
+        painter.save()
+        painter.setRenderHint(QtGui.QPainter.RenderHint.Antialiasing, False)
+        painter.setRenderHint(QtGui.QPainter.RenderHint.SmoothPixmapTransform, False)
+        painter.fillRect(loupe, QtGui.QColor(0, 0, 0, 220))
+        # Off-screen pixels stay black; nearest-neighbour keeps every device pixel crisp.
+        visible = source.intersected(shot.image.rect())
+        if not visible.isEmpty():
+            target = QtCore.QRectF(
+                view.x() + (visible.x() - source.x()) * LOUPE_ZOOM,
+                view.y() + (visible.y() - source.y()) * LOUPE_ZOOM,
+                visible.width() * LOUPE_ZOOM,
+                visible.height() * LOUPE_ZOOM,
+            )
+            painter.drawImage(target, shot.image, QtCore.QRectF(visible))
+        # Outline the pixel under the cursor
+        painter.setPen(QtGui.QPen(QtGui.QColor(0, 200, 255), 1))
+        painter.drawRect(view.x() + half * LOUPE_ZOOM, view.y() + half * LOUPE_ZOOM, LOUPE_ZOOM, LOUPE_ZOOM)
+        painter.drawRect(view.adjusted(0, 0, -1, -1))
+
+        color = shot.image.pixelColor(center)
+        device = self._device_origin(shot) + center
+        text_rect = QtCore.QRect(loupe.x(), view.bottom() + 1, loupe.width(), _LOUPE_TEXT_H)
+        painter.setPen(QtGui.QColor(230, 230, 230))
+        painter.drawText(
+            text_rect, QtCore.Qt.AlignmentFlag.AlignCenter, f"{device.x()}, {device.y()}  {color.name().upper()}"
+        )
+        painter.restore()
+
+    def _apply_move(self, pos: QtCore.QPointF):
+        old = self._state()
+        self._last_pos = pos
+        if self._origin is not None:
+            self._current = pos
+        self._invalidate(old, self._state())
+
+    def _flush_move(self):
+        if self._pending_pos is not None:
+            pos, self._pending_pos = self._pending_pos, None
+            self._apply_move(pos)
+            self._move_timer.start(int(self._frame_ms))
 
     def mousePressEvent(self, event):
         if event.button() == QtCore.Qt.MouseButton.LeftButton:
-            self._origin = event.position().toPoint()
+            self._flush_move()
+            old = self._state()
+            self._origin = event.position()
             self._current = self._origin
-            self.update()
+            self._invalidate(old, self._state())
 
     def mouseMoveEvent(self, event):
-        self._last_pos = event.position().toPoint()
-        if self._origin:
-            self._current = event.position().toPoint()
-            self.update()
-        else:
-            self.update()
+        self.moves += 1
+        pos = event.position()
+        if self._move_timer.isActive():
+            if self._pending_pos is not None:
+                self.coalesced += 1
+            self._pending_pos = pos
+            return
+        # Leading edge: apply right away, then hold further moves until the next frame.
+        self._apply_move(pos)
+        self._move_timer.start(int(self._frame_ms))
 
     def mouseReleaseEvent(self, event):
-        if event.button() == QtCore.Qt.MouseButton.LeftButton and self._origin:
-            self._current = event.position().toPoint()
-            rect = QtCore.QRect(self._origin, self._current).normalized()
-            self.hide()
-            self._cancel_btn.hide()
+        if event.button() == QtCore.Qt.MouseButton.LeftButton and self._origin is not None:
+            self._current = event.position()
+            rect = self._selection()
+            self._finish()
             if rect.width() > self._config.min_selection_px and rect.height() > self._config.min_selection_px:
-                # Convert to global coordinates
-                global_rect = QtCore.QRect(
-                    self.mapToGlobal(rect.topLeft()),
-                    rect.size(),
-                )
-                self.selectionMade.emit(global_rect)
-            self._origin = None
-            self._current = None
-            self._last_pos = None
+                self._emit_selection(rect)
+
+    def _emit_selection(self, rect: QtCore.QRect):
+        # Convert to global coordinates
+        global_rect = QtCore.QRect(
+            self.mapToGlobal(rect.topLeft()),
+            rect.size(),
+        )
+        self.selectionMade.emit(global_rect)
+
+    def auto_detect(self) -> bool:
+        # Looks for the minimap on every screen of the snapshot and selects the best match.
+        # Works with the overlay hidden too (grabbing a fresh snapshot); on a miss the
+        # overlay, if shown, stays up for a manual selection.
+        if not self._shots:
+            virtual_geo = QtGui.QGuiApplication.primaryScreen().virtualGeometry()
+            if self.geometry() != virtual_geo:
+                self.setGeometry(virtual_geo)
+            self._grab_snapshot(virtual_geo)
+        t0 = time.perf_counter()
+        best = None
+        for shot in self._shots:
+            match = find_minimap(shot.image)
+            if match is not None and (best is None or match.score > best[1].score):
+                best = (shot, match)
+        self.detect_ms.add((time.perf_counter() - t0) * 1000.0)
+        if best is None:
+            if not self.isVisible():
+                self._shots = []
+            self._detect_btn.setText("No minimap found")
+            self._detect_btn.setEnabled(False)
+            self._place_buttons()
+            return False
+        shot, match = best
+        rect = self._logical_rect(shot, match.rect)
+        self._finish()
+        self._emit_selection(rect)
+        return True
 
     def keyPressEvent(self, event):
         event.ignore()
 
     def resizeEvent(self, event):
         super().resizeEvent(event)
+        self._place_buttons()
+
+    def _place_buttons(self):
         margin = 16
         size = self._cancel_btn.sizeHint()
         self._cancel_btn.move(self.width() - size.width() - margin, margin)
+        detect = self._detect_btn.sizeHint()
+        self._detect_btn.resize(detect)
+        self._detect_btn.move(self._cancel_btn.x() - detect.width() - 8, margin)
 
     def _cancel(self):
-        self.hide()
-        self._cancel_btn.hide()
+        self._finish()
         self.canceled.emit()
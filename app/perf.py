@@ -0,0 +1,84 @@
+import csv
+import json
+import os
+import time
+from collections import deque
+from .config import CONFIG
+from .stats import RollingStats
+
+# Pipeline stages, in the order a frame enters them. present spans filter and upscale;
+# track runs on the tracker thread.
+STAGES = ("grab", "convert", "compose", "detect", "history", "export", "present", "filter", "upscale", "scale", "track")
+
+
+def _env_flag(name: str) -> bool:
+    return os.environ.get(name, "").strip().lower() in ("1", "true", "yes", "on")
+
+
+class PerfMonitor:
+    # Rolling per-stage timings for the capture/render pipeline. Instrumented code calls
+    # begin()/end() around a stage; while disabled both are a single attribute check.
+
+    def __init__(self, enabled: bool = False, window: int = 600):
+        self.enabled = enabled
+        self._window = window
+        self._stages = {name: RollingStats(window) for name in STAGES}
+        self._presents = deque(maxlen=window)
+
+    def begin(self) -> float:
+        return time.perf_counter() if self.enabled else 0.0
+
+    def end(self, stage: str, t0: float):
+        if self.enabled:
+            self._stages[stage].add((time.perf_counter() - t0) * 1000.0)
+
+    def mark_present(self):
+        if self.enabled:
+            self._presents.append(time.perf_counter())
+
+    def reset(self):
+        for stats in self._stages.values():
+            stats.clear()
+        self._presents.clear()
+
+    def fps(self) -> float:
+        presents = list(self._presents)
+        if len(presents) < 2 or presents[-1] == presents[0]:
+            return 0.0
+        return (len(presents) - 1) / (presents[-1] - presents[0])
+
+    def snapshot(self) -> dict:
+        stages = {}
+        for name, stats in self._stages.items():
+            stages[name] = {
+                "count": len(stats),
+                "mean_ms": stats.mean(),
+                "p50_ms": stats.percentile(50),
+                "p95_ms": stats.percentile(95),
+                "p99_ms": stats.percentile(99),
+                "max_ms": stats.max(),
+            }
+        return {"fps": self.fps(), "stages": stages}
+
+    def export(self, path: str, extra: dict | None = None):
+        snapshot = self.snapshot()
+        extra = extra or {}
+        if path.lower().endswith(".csv"):
+            with open(path, "w", newline="") as f:
+                writer = csv.writer(f)
+                writer.writerow(["stage", "count", "mean_ms", "p50_ms", "p95_ms", "p99_ms", "max_ms"])
+                for name, row in snapshot["stages"].items():
+                    writer.writerow([name, row["count"]] + [f"{row[k]:.4f}" for k in list(row)[1:]])
+                writer.writerow([])
+                writer.writerow(["metric", "value"])
+                writer.writerow(["fps", f"{snapshot['fps']:.2f}"])
+                for key, value in extra.items():
+                    writer.writerow([key, value])
+        else:
+            snapshot["extra"] = extra
+            with open(path, "w") as f:
+                json.dump(snapshot, f, indent=2)
+
+
+PERF = PerfMonitor(enabled=CONFIG.perf_enabled or _env_flag("LOLMAP_PERF"))
+PERF_EXPORT_PATH = os.environ.get("LOLMAP_PERF_EXPORT") or CONFIG.perf_export_path
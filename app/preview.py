@@ -1,6 +1,21 @@
+import os
+import time
+import traceback
 from PyQt6 import QtCore, QtGui, QtWidgets
-from .capture import CaptureManager
+from . import frames
+from .buffers import FramePool
+from .canvas import PreviewCanvas, RenderQuality
+from .capture_worker import CaptureService
 from .config import AppConfig
+from .filters import FILTERS, FilterPool, FrameFilter, parse
+from .history import FrameHistory
+from .perf import PERF, STAGES
+from .recorder import FrameRecorder
+from .session import RegionSession
+from .shared_frames import SharedFrameWriter
+from .stream import StreamServer
+from .tracker import MinimapTracker, TrackerThread
+from .upscale import Upscaler
 
 
 class TitleBar(QtWidgets.QWidget):
@@ -24,8 +39,23 @@ class TitleBar(QtWidgets.QWidget):
 class PreviewWindow(QtWidgets.QWidget):
     minimized = QtCore.pyqtSignal()
     status_changed = QtCore.pyqtSignal(str)
-
-    def __init__(self, on_reselect, on_change_hotkey, on_close_app, config: AppConfig, version: str):
+    first_frame = QtCore.pyqtSignal(float)  # ms from restore() to the first presented frame
+    region_moved = QtCore.pyqtSignal(QtCore.QRect)  # the tracker followed the minimap
+    region_closed = QtCore.pyqtSignal()  # dropped from the saved session
+    _filter_done = QtCore.pyqtSignal(int, bool)  # from a filter pool thread: submit number, ok
+
+    def __init__(
+        self,
+        on_reselect,
+        on_change_hotkey,
+        on_close_app,
+        config: AppConfig,
+        version: str,
+        service: CaptureService | None = None,
+        on_add_region=None,
+        stream: StreamServer | None = None,
+        filter_pool: FilterPool | None = None,
+    ):
         super().__init__()
         self._config = config
         self._version = version
@@ -42,16 +72,64 @@ class PreviewWindow(QtWidgets.QWidget):
         self._rect = None
         self._zoom = 1.0
         self._frozen = False
-        self._capture = CaptureManager()
+        self._interval_ms = self._config.capture_fps_ms
+        self._restore_t0 = None
+        self.first_frame_ms = None
+        # Cleared only when the user dismisses the preview, not when quitting hides it.
+        self._in_session = False
+        # Windows normally share the app's capture thread; a standalone window runs its own.
+        self._owned_service = None
+        if service is None:
+            service = self._owned_service = CaptureService.from_config(self._config, self)
+        self._capture = service.channel(FrameHistory(self._config.history_seconds, self._config.history_bytes))
+        self._capture.frameReady.connect(self._update_frame)
+        if self._config.shm_export:
+            self._start_export()
+        self._on_add_region = on_add_region
+        self._recorder = FrameRecorder(self)
+        self._recorder.error.connect(self._recording_failed)
+        self._stream = stream
+        if stream is not None:
+            stream.add_channel(self._capture.id)
+        self._tracker = None
+        if self._config.track_minimap:
+            tracker = MinimapTracker(self._config.track_interval_ms / 1000.0, max_misses=self._config.track_max_misses)
+            self._tracker = TrackerThread(tracker, self)
+            self._tracker.moved.connect(self._move_rect)
+        self._upscaler = Upscaler(self._config.scaled_cache_frames)
+        # Filters run on each new frame before it is rendered; _last_image is the
+        # filtered frame, _source_image the one captured. With filter workers, frames go
+        # to the app's shared pool (a standalone window starts its own) and are rendered
+        # when they come back; the GUI thread never waits for them.
+        self._owned_filter_pool = None
+        if filter_pool is None and self._config.filter_workers:
+            filter_pool = self._owned_filter_pool = FilterPool(self._config.filter_workers)
+        self._filter = FrameFilter(self._config.frame_filters, filter_pool)
+        self._filter_done.connect(self._on_filter_done)
+        self._filter_seq = 0  # numbers the frames to filter
+        self._filter_shown = 0  # the frame on screen; pool results up to it are stale
+        self._filter_pending = None  # newest frame that arrived while one was in flight
+        self._filter_dpr = 1.0
+        self._filtered_frames = FramePool(depth=3)
+        self._source_image = None
+        self._last_image = None
+        # Zoom, resize and pan only re-render the last frame, at most once per display
+        # frame; a zoom change glides there over zoom_animation_ms.
+        self._render_timer = QtCore.QTimer(self)
+        self._render_timer.setSingleShot(True)
+        self._render_timer.setTimerType(QtCore.Qt.TimerType.PreciseTimer)
+        self._render_timer.timeout.connect(self._render_tick)
+        self._zoom_from = None  # (zoom, start time) while animating
+        self._zoom_anchor = None
+        self._presented = 0
+        self._renders = 0
         self._on_reselect = on_reselect
         self._on_change_hotkey = on_change_hotkey
 
-        self._timer = QtCore.QTimer(self)
-        self._timer.timeout.connect(self._update_frame)
-
-        self._label = QtWidgets.QLabel()
-        self._label.setAlignment(QtCore.Qt.AlignmentFlag.AlignCenter)
-        self._label.setObjectName("Preview")
+        self._canvas = PreviewCanvas()
+        self._canvas.setObjectName("Preview")
+        self._canvas.set_quality(self._config.render_quality)
+        self._canvas.view_changed.connect(self._view_changed)
 
         self._title = TitleBar(self)
         self._title.setObjectName("TitleBar")
@@ -167,13 +245,37 @@ class PreviewWindow(QtWidgets.QWidget):
         layout.setContentsMargins(1, 1, 1, 1)
         layout.setSpacing(0)
         layout.addWidget(self._title)
-        layout.addWidget(self._label, 1)
+        layout.addWidget(self._canvas, 1)
+
+        # Rewind through recent frames while frozen; the wheel over the slider scrubs too.
+        self._scrub = QtWidgets.QSlider(QtCore.Qt.Orientation.Horizontal)
+        self._scrub.valueChanged.connect(self._scrub_to)
+        self._scrub_label = QtWidgets.QLabel("")
+        self._scrub_label.setObjectName("TitleLabel")
+        self._scrub_label.setMinimumWidth(48)
+        self._scrub_bar = QtWidgets.QWidget()
+        self._scrub_bar.setObjectName("ScrubBar")
+        scrub_layout = QtWidgets.QHBoxLayout(self._scrub_bar)
+        scrub_layout.setContentsMargins(8, 2, 8, 2)
+        scrub_layout.setSpacing(6)
+        scrub_layout.addWidget(self._scrub, 1)
+        scrub_layout.addWidget(self._scrub_label)
+        self._scrub_bar.hide()
+        layout.addWidget(self._scrub_bar)
+
+        self._hud = QtWidgets.QLabel(self._canvas)
+        self._hud.setObjectName("PerfHud")
+        self._hud.setAttribute(QtCore.Qt.WidgetAttribute.WA_TransparentForMouseEvents)
+        self._hud.move(6, 6)
+        self._hud.hide()
+        self._hud_timer = QtCore.QTimer(self)
+        self._hud_timer.setInterval(500)
+        self._hud_timer.timeout.connect(self._update_hud)
 
         self._size_grip = QtWidgets.QSizeGrip(self)
         layout.addWidget(self._size_grip, 0, QtCore.Qt.AlignmentFlag.AlignBottom | QtCore.Qt.AlignmentFlag.AlignRight)
 
         self._apply_opacity(self._config.default_opacity, update_slider=True)
-        self._last_pix = None
 
         self._btn_zoom_in.setToolTip("Zoom in")
         self._btn_zoom_out.setToolTip("Zoom out")
@@ -209,20 +311,73 @@ class PreviewWindow(QtWidgets.QWidget):
 
     def set_rect(self, rect: QtCore.QRect):
         self._rect = rect
+        self._in_session = True
         self._frozen = False
         self._btn_freeze.setText("Freeze")
         self._zoom = 1.0
+        self._zoom_from = None
+        self._canvas.set_zoom(self._zoom)
+        self._canvas.reset_pan()
         self._update_zoom_label()
         self._set_status("live")
-        self._timer.start(self._config.capture_fps_ms)
-        self._update_frame()
+        self._capture.history.clear()
+        self._scrub_bar.hide()
+        if self._tracker is not None:
+            self._tracker.reset()
+        self._capture.start(self._rect, self._interval_ms)
         self.show()
         self.raise_()
 
+    def restore(self, state: RegionSession):
+        # Warm start from a saved session: straight to LIVE without the snip overlay.
+        self._restore_t0 = time.perf_counter()
+        if state.geometry:
+            self.setGeometry(QtCore.QRect(*state.geometry))
+        self._apply_opacity(state.opacity, update_slider=True)
+        self._interval_ms = state.capture_fps_ms
+        self.set_rect(QtCore.QRect(*state.rect))
+        self._set_zoom(state.zoom, animate=False)
+
+    def session_state(self) -> RegionSession | None:
+        if not self._rect or not self._in_session:
+            return None
+        g = self.geometry()
+        return RegionSession(
+            rect=(self._rect.x(), self._rect.y(), self._rect.width(), self._rect.height()),
+            zoom=self._zoom,
+            opacity=round(self.windowOpacity(), 2),
+            geometry=(g.x(), g.y(), g.width(), g.height()),
+            capture_fps_ms=self._interval_ms,
+        )
+
+    def in_session(self) -> bool:
+        # Showing a selected region, as opposed to waiting for one or closed.
+        return self._in_session
+
     def stop_preview(self):
+        self._in_session = False
         self._stop_capture()
+        self._upscaler.clear()
         self.hide()
 
+    def shutdown(self):
+        if self._stream is not None:
+            self._stream.drop_channel(self._capture.id)
+        self._capture.close()
+        if self._owned_service is not None:
+            self._owned_service.shutdown()
+        self._recorder.shutdown()
+        if self._tracker is not None:
+            self._tracker.shutdown()
+        # A frame still in the pool is dropped; its segment is freed once it is done.
+        self._filter_shown = self._filter_seq
+        self._filter.close()
+        if self._owned_filter_pool is not None:
+            self._owned_filter_pool.close()
+
+    def capture_stats(self) -> dict:
+        return self._capture.stats()
+
     def show_if_ready(self) -> bool:
         if not self._rect:
             return False
@@ -242,22 +397,76 @@ class PreviewWindow(QtWidgets.QWidget):
     def resizeEvent(self, event):
         super().resizeEvent(event)
         self._apply_title_layout(event.size().width())
-        self._render_pixmap()
+        self._request_render()
 
     def _toggle_freeze(self):
         self._frozen = not self._frozen
         self._btn_freeze.setText("Live" if self._frozen else "Freeze")
         if self._frozen:
             self._set_status("paused")
-            self._timer.stop()
+            self._capture.stop()
+            self._show_scrub_bar()
+            self._update_stats_tooltip()
         else:
             self._set_status("live")
-            self._timer.start(self._config.capture_fps_ms)
+            self._scrub_bar.hide()
+            self._capture.start(self._rect, self._interval_ms)
+
+    def _show_scrub_bar(self):
+        count = len(self._capture.history)
+        if count < 2:
+            return
+        self._scrub.blockSignals(True)
+        self._scrub.setRange(0, count - 1)
+        self._scrub.setValue(count - 1)
+        self._scrub.blockSignals(False)
+        self._scrub_label.setText("0.0s")
+        self._scrub_bar.show()
+
+    def _scrub_to(self, index: int):
+        history = self._capture.history
+        try:
+            image = history.frame(index)
+            offset = history.timestamp(len(history) - 1) - history.timestamp(index)
+        except IndexError:
+            return
+        self._scrub_label.setText(f"-{offset:.1f}s")
+        if self._show_filtered(image):
+            self._render_pixmap()
 
-    def _set_zoom(self, zoom):
+    def _set_zoom(self, zoom, anchor: QtCore.QPointF | None = None, animate: bool = True):
+        # `anchor` (canvas coordinates) is the point that stays put, e.g. under the cursor.
+        # Never captures: the last frame is re-rendered.
         self._zoom = max(self._config.zoom_min, min(zoom, self._config.zoom_max))
+        self._zoom_anchor = anchor
         self._update_zoom_label()
-        self._update_frame()
+        if animate and self._config.zoom_animation_ms > 0 and self._last_image is not None:
+            # A wheel burst retargets the running glide from wherever it has got to.
+            self._zoom_from = (self._canvas.zoom(), time.perf_counter())
+        else:
+            self._zoom_from = None
+            self._canvas.set_zoom(self._zoom, anchor)
+        self._request_render()
+
+    def _request_render(self):
+        # Coalesces zoom, resize and pan requests into one render per display frame.
+        if not self._render_timer.isActive():
+            screen = self.screen()
+            rate = screen.refreshRate() if screen is not None else 0.0
+            self._render_timer.start(max(1, round(1000.0 / (rate or 60.0))))
+
+    def _render_tick(self):
+        if self._zoom_from is not None:
+            start, t0 = self._zoom_from
+            t = min(1.0, (time.perf_counter() - t0) * 1000.0 / self._config.zoom_animation_ms)
+            # Ease out, interpolated on a log scale so every step looks the same size.
+            t = 1.0 - (1.0 - t) ** 3
+            self._canvas.set_zoom(start * (self._zoom / start) ** t, self._zoom_anchor)
+            if t >= 1.0:
+                self._zoom_from = None
+            else:
+                self._request_render()
+        self._render_pixmap()
 
     def _set_opacity(self, value):
         self._apply_opacity(value / 100.0, update_slider=False)
@@ -271,57 +480,397 @@ class PreviewWindow(QtWidgets.QWidget):
 
     def _reset_zoom(self):
         self._set_zoom(1.0)
+        self._canvas.reset_pan()
 
     def wheelEvent(self, event):
-        delta = event.angleDelta().y()
+        # Some platforms turn Shift+wheel into horizontal scrolling.
+        delta = event.angleDelta().y() or event.angleDelta().x()
+        if self._scrub_bar.isVisible() and event.modifiers() & QtCore.Qt.KeyboardModifier.ShiftModifier:
+            self._scrub.setValue(self._scrub.value() + (1 if delta > 0 else -1))
+            return
+        # Zoom around the cursor.
+        anchor = QtCore.QPointF(self._canvas.mapFrom(self, event.position().toPoint()))
         if delta > 0:
-            self._set_zoom(self._zoom * self._config.zoom_step)
+            self._set_zoom(self._zoom * self._config.zoom_step, anchor)
         else:
-            self._set_zoom(self._zoom / self._config.zoom_step)
+            self._set_zoom(self._zoom / self._config.zoom_step, anchor)
 
     def _update_frame(self):
-        if not self._rect:
+        # Runs on the GUI thread; only the newest frame from the capture thread is shown.
+        frame = self._capture.take()
+        if frame is None or not self._rect or not self._capture.running:
             return
-        pix = self._capture.grab_rect(self._rect)
-        if pix.isNull():
-            self._label.clear()
-            self._label.setText("No signal")
+        if frame.image.isNull():
+            self._canvas.set_message("No signal")
             self._set_status("no_signal")
             return
-        self._label.setText("")
-        self._last_pix = pix
+        t0 = PERF.begin()
+        if self._recorder.recording:
+            # Encoding and disk writes happen on the recorder thread.
+            self._recorder.submit(frame.image, time.time() - (time.perf_counter() - frame.captured_at))
+        if self._stream is not None:
+            # Encoding happens on the stream's encoder threads, only while someone watches.
+            self._stream.publish(self._capture.id, frame.image, frame.seq, frame.captured_at)
+        # The frame is drawn in the capture format: no QPixmap conversion.
         self._set_status("live")
-        self._render_pixmap()
+        if self._show_filtered(frame.image):
+            self._render_pixmap()
+        PERF.end("present", t0)
+        PERF.mark_present()
+        self._presented += 1
+        if self._restore_t0 is not None:
+            self.first_frame_ms = (time.perf_counter() - self._restore_t0) * 1000.0
+            self._restore_t0 = None
+            self.first_frame.emit(self.first_frame_ms)
+        if self._tracker is not None:
+            self._tracker.submit(frame.image, self._rect, frame.captured_at)
+        if self._presented % 30 == 0:
+            self._update_stats_tooltip()
+
+    def _move_rect(self, rect: QtCore.QRect):
+        # Retargets the live capture in place: zoom, history and LIVE state carry on. A
+        # move reported after Freeze only takes effect when the capture resumes.
+        self._rect = rect
+        if self._capture.running:
+            self._capture.start(self._rect, self._interval_ms)
+        self.region_moved.emit(QtCore.QRect(rect))
+
+    def _show_filtered(self, image: QtGui.QImage) -> bool:
+        # Makes `image`, through the enabled filters, the frame to render; history,
+        # recording, the stream and the tracker keep the unfiltered frames. False when the
+        # frame went to the filter pool: _on_filter_done renders it once it is back.
+        self._source_image = image
+        self._filter_seq += 1
+        if not self._filter.active or image.isNull() or not self._filter.pooled:
+            self._last_image = self._filtered(image)
+            self._filter_shown = self._filter_seq
+            return True
+        if self._filter.busy:
+            # Latest wins: a frame still waiting when a newer one arrives is never filtered.
+            self._filter_pending = image
+            return False
+        self._submit_filter(image)
+        return False
+
+    def _submit_filter(self, image: QtGui.QImage):
+        t0 = PERF.begin()
+        image = frames.normalize(image)
+        self._filter_dpr = image.devicePixelRatio()
+        seq = self._filter_seq
+        if not self._filter.submit(frames.frame_view(image), lambda ok: self._emit_filter_done(seq, ok)):
+            self._last_image = self._filtered(image)
+            self._filter_shown = seq
+            self._render_pixmap()
+        PERF.end("filter", t0)
+
+    def _emit_filter_done(self, seq: int, ok: bool):
+        # On a pool thread: queued to the GUI thread.
+        try:
+            self._filter_done.emit(seq, ok)
+        except RuntimeError:
+            pass  # the window is gone
+
+    def _on_filter_done(self, seq: int, ok: bool):
+        output = self._filter.result() if ok and seq > self._filter_shown else None
+        if output is not None:
+            t0 = PERF.begin()
+            h, w = output.shape[:2]
+            self._filtered_frames.retain({(w, h)})
+            result, view = self._filtered_frames.image(w, h)
+            view[...] = output
+            del output, view
+            result.setDevicePixelRatio(self._filter_dpr)
+            self._last_image = result
+            self._filter_shown = seq
+            PERF.end("filter", t0)
+            self._render_pixmap()
+        self._filter.finish()
+        pending, self._filter_pending = self._filter_pending, None
+        if pending is None and not ok and seq > self._filter_shown:
+            # The pool failed; the frame is filtered in-process instead.
+            pending = self._source_image
+        if pending is not None and self._show_filtered(pending):
+            self._render_pixmap()
+
+    def _filtered(self, image: QtGui.QImage) -> QtGui.QImage:
+        # The enabled filters applied to `image` on this thread, into a pooled frame.
+        if not self._filter.active or image.isNull():
+            return image
+        t0 = PERF.begin()
+        image = frames.normalize(image)
+        self._filtered_frames.retain({(image.width(), image.height())})
+        result, view = self._filtered_frames.image(image.width(), image.height())
+        self._filter.apply(frames.frame_view(image), view)
+        result.setDevicePixelRatio(image.devicePixelRatio())
+        PERF.end("filter", t0)
+        return result
+
+    def _set_filters(self, specs):
+        self._filter.set_filters(specs)
+        # A frame in flight was filtered with the old chain.
+        self._filter_shown = self._filter_seq
+        if not self._filter.active:
+            self._filtered_frames.clear()
+        if self._source_image is not None and self._show_filtered(self._source_image):
+            self._render_pixmap()
+
+    def _toggle_filter(self, name: str):
+        specs = [spec for spec in self._filter.specs if parse(spec)[0] != name]
+        if len(specs) == len(self._filter.specs):
+            # With the parameters from the config, if it names this filter.
+            specs.append(next((spec for spec in self._config.frame_filters if parse(spec)[0] == name), name))
+        self._set_filters(specs)
 
     def _render_pixmap(self):
-        if not self._last_pix or not self._rect:
+        if self._last_image is None or not self._rect:
             return
-        zoomed_size = QtCore.QSize(
-            max(1, int(self._rect.width() * self._zoom)),
-            max(1, int(self._rect.height() * self._zoom)),
-        )
-        label_size = self._label.size()
-        target_size = QtCore.QSize(
-            max(zoomed_size.width(), label_size.width()),
-            max(zoomed_size.height(), label_size.height()),
+        self._renders += 1
+        # Scaling happens at paint time; this only hands over the frame. The pixel-art
+        # qualities upscale here instead, picking the engine mode per zoom, and only the
+        # part of the frame the canvas shows. Mid-glide the painter scales the frame:
+        # every step would be a new output size.
+        quality = self._canvas.quality()
+        if quality in RenderQuality.UPSCALED and self._zoom_from is None:
+            t0 = PERF.begin()
+            # Device pixels of the canvas per pixel of the frame.
+            ratio = self._last_image.devicePixelRatio()
+            frame = QtCore.QSizeF(self._last_image.size()) / ratio
+            scale = self._canvas.scale_for(frame) * self._canvas.devicePixelRatioF() / ratio
+            region = self._canvas.visible_region(self._last_image)
+            upscaled = self._upscaler.upscale(self._last_image, scale, quality == RenderQuality.PIXEL_SHARP, region)
+            if upscaled is not None:
+                self._canvas.set_frame(upscaled, frame, QtCore.QPointF(region.topLeft()) / ratio)
+                PERF.end("upscale", t0)
+                return
+        self._canvas.set_frame(self._last_image)
+
+    def _view_changed(self):
+        # A pan moves the viewport: the upscaled part has to follow.
+        if self._canvas.quality() in RenderQuality.UPSCALED:
+            self._request_render()
+
+    def _set_quality(self, quality: str):
+        self._canvas.set_quality(quality)
+        if quality not in RenderQuality.UPSCALED:
+            self._upscaler.clear()
+        self._render_pixmap()
+
+    def perf_counters(self) -> dict:
+        stats = self._capture.stats()
+        counters = {
+            "presented": self._presented,
+            "renders": self._renders,
+            "dropped_frames": stats["dropped"],
+            "missed_ticks": stats["missed_ticks"],
+            "skip_ratio": round(stats["skip_ratio"], 4),
+            "capture_fps": round(stats["fps"], 2),
+            # Frame buffers allocated by the latest capture tick; 0 in steady state apart
+            # from the platform screen grab itself.
+            "alloc_per_frame": stats["alloc_per_frame"],
+            "alloc_bytes_per_frame": stats["alloc_bytes_per_frame"],
+            "alloc_free_frames": stats["alloc_free_frames"],
+            "pool_allocations": stats["pool_allocations"],
+            "pool_held_bytes": stats["pool_held_bytes"],
+        }
+        if self.first_frame_ms is not None:
+            counters["first_frame_ms"] = round(self.first_frame_ms, 2)
+        if self._upscaler.frames:
+            upscale = self._upscaler.stats()
+            counters.update(
+                {
+                    "upscale_frames": upscale["frames"],
+                    "upscale_cache_hits": upscale["cache_hits"],
+                    "upscale_p50_ms": round(upscale["upscale_p50_ms"], 3),
+                    "upscale_cached_maps": upscale["cached_maps"],
+                    "upscale_pool_allocations": upscale["pool_allocations"],
+                    "upscale_pool_detaches": upscale["pool_detaches"],
+                }
+            )
+        if self._stream is not None and self._stream.running:
+            stream = self._stream.stats()
+            clients = [c for c in stream["clients"] if c["channel"] == self._capture.id]
+            counters.update(
+                {
+                    "stream_clients": len(clients),
+                    "stream_encoded": stream["encoded"],
+                    "stream_encode_p50_ms": round(stream["encode_p50_ms"], 3),
+                    "stream_bytes_per_s": round(stream["bytes_per_s"]),
+                    "stream_lag_max_ms": round(max((c["lag_max_ms"] for c in clients), default=0.0), 2),
+                    "stream_skipped": sum(c["skipped"] for c in clients),
+                }
+            )
+        if self._filter.frames:
+            stats = self._filter.stats()
+            counters.update(
+                {
+                    "filter_frames": stats["frames"],
+                    "filter_pooled_frames": stats["pooled_frames"],
+                    "filter_p50_ms": round(stats["filter_p50_ms"], 3),
+                    "filter_max_ms": round(stats["filter_max_ms"], 3),
+                    **{f"filter_{name}_p50_ms": round(stats[f"{name}_p50_ms"], 3) for name in stats["filters"]},
+                }
+            )
+        if self._capture.export is not None:
+            export = self._capture.export.stats()
+            counters.update(
+                {
+                    "shm_frames": export["frames"],
+                    "shm_oversized": export["oversized"],
+                    "shm_write_ms": round(export["write_ms"], 3),
+                }
+            )
+        if self._tracker is not None:
+            track = self._tracker.stats()
+            counters.update(
+                {
+                    "track_state": track["state"],
+                    "track_checks": track["checks"],
+                    "track_relocations": track["relocations"],
+                    "track_ms_per_frame": round(track["ms_per_frame"], 4),
+                    "track_search_max_ms": round(track["search_max_ms"], 2),
+                }
+            )
+        return counters
+
+    def _toggle_hud(self):
+        if self._hud.isVisible():
+            self._hud.hide()
+            self._hud_timer.stop()
+            return
+        # Timing is off unless asked for; the HUD switches it on for the session.
+        PERF.enabled = True
+        self._update_hud()
+        self._hud.show()
+        self._hud.raise_()
+        self._hud_timer.start()
+
+    def _update_hud(self):
+        snapshot = PERF.snapshot()
+        counters = self.perf_counters()
+        lines = [
+            f"{snapshot['fps']:5.1f} fps  drop {counters['dropped_frames']}  miss {counters['missed_ticks']}",
+            f"alloc {counters['alloc_per_frame']}/frame  {counters['alloc_bytes_per_frame'] / 1024:.0f} KiB",
+            "stage     p50    p95    p99",
+        ]
+        for name in STAGES:
+            row = snapshot["stages"][name]
+            if row["count"]:
+                lines.append(f"{name:<8}{row['p50_ms']:5.2f}  {row['p95_ms']:5.2f}  {row['p99_ms']:5.2f}")
+        self._hud.setText("\n".join(lines))
+        self._hud.adjustSize()
+
+    def _export_perf(self):
+        path, _ = QtWidgets.QFileDialog.getSaveFileName(
+            self, "Export Performance Stats", "lolmap-perf.json", "JSON (*.json);;CSV (*.csv)"
         )
-        scaled = self._last_pix.scaled(
-            target_size,
-            QtCore.Qt.AspectRatioMode.KeepAspectRatio,
-            QtCore.Qt.TransformationMode.SmoothTransformation,
+        if path:
+            PERF.export(path, self.perf_counters())
+
+    def _toggle_recording(self):
+        if self._recorder.recording:
+            self._recorder.stop()
+            return
+        path = self._config.record_path or os.path.join(
+            QtCore.QStandardPaths.writableLocation(QtCore.QStandardPaths.StandardLocation.AppDataLocation),
+            "recording.lmr",
         )
-        self._label.setPixmap(scaled)
+        self._recorder.start(path, self._config.record_bytes)
+
+    def _recording_failed(self, path: str, reason: str):
+        QtWidgets.QMessageBox.warning(self, "Recording Error", f"Could not record to {path}: {reason}")
+
+    def _start_export(self):
+        name = f"{self._config.shm_name}-{self._capture.id}"
+        try:
+            writer = SharedFrameWriter(name, self._config.shm_slots, self._config.shm_slot_bytes)
+        except OSError:
+            # E.g. another instance already exports under this name; the preview works anyway.
+            traceback.print_exc()
+            return
+        self._capture.set_export(writer)
 
     def _close_preview(self):
+        # Unlike Exit, only forgets this region: the next launch no longer restores it.
+        self._in_session = False
         self._stop_capture()
+        self._upscaler.clear()
         self.hide()
+        self.region_closed.emit()
 
     def _stop_capture(self):
-        self._timer.stop()
+        self._capture.stop()
+        self._scrub_bar.hide()
         self._frozen = False
         self._btn_freeze.setText("Freeze")
         self._set_status("idle")
 
+    def _update_stats_tooltip(self):
+        stats = self._capture.stats()
+        self._status.setToolTip(
+            "Capture status\n"
+            f"Frames: {stats['delivered']} shown, {stats['dropped']} dropped, "
+            f"{stats['skip_ratio']:.0%} unchanged\n"
+            f"Rate: {stats['fps']:.0f} FPS, {stats['missed_ticks']} missed ticks\n"
+            f"Regions: {stats['regions']} sharing {stats['screen_grabs']} screen grabs so far\n"
+            f"Queue age: {stats['age_p50_ms']:.1f} ms p50, {stats['age_max_ms']:.1f} ms max"
+            + self._history_tooltip()
+            + self._tracking_tooltip()
+            + self._recording_tooltip()
+            + self._stream_tooltip()
+            + self._export_tooltip()
+            + self._filter_tooltip()
+        )
+
+    def _history_tooltip(self) -> str:
+        stats = self._capture.history.stats()
+        return (
+            f"\nHistory: {stats['frames']} frames over {stats['span_s']:.1f}s, "
+            f"{stats['bytes'] / 1e6:.1f} of {stats['budget'] / 1e6:.0f} MB"
+        )
+
+    def _tracking_tooltip(self) -> str:
+        if self._tracker is None:
+            return ""
+        stats = self._tracker.stats()
+        return (
+            f"\nTracking: {stats['state']}, {stats['ms_per_frame']:.3f} ms/frame, "
+            f"{stats['relocations']} moves, search {stats['search_max_ms']:.0f} ms max"
+        )
+
+    def _recording_tooltip(self) -> str:
+        if not self._recorder.recording:
+            return ""
+        stats = self._recorder.stats()
+        return (
+            f"\nRecording: {stats['frames']} frames, {stats['bytes'] / 1e6:.1f} MB, "
+            f"{stats['dropped']} dropped, {stats['encode_ms']:.1f} ms/frame"
+        )
+
+    def _stream_tooltip(self) -> str:
+        if self._stream is None or not self._stream.running:
+            return ""
+        stats = self._stream.stats()
+        clients = [c for c in stats["clients"] if c["channel"] == self._capture.id]
+        lag = max((c["lag_p50_ms"] for c in clients), default=0.0)
+        return (
+            f"\nStreaming: {len(clients)} viewers, {stats['bytes_per_s'] / 1e3:.0f} KB/s, "
+            f"encode {stats['encode_p50_ms']:.1f} ms, lag {lag:.0f} ms"
+        )
+
+    def _export_tooltip(self) -> str:
+        export = self._capture.export
+        if export is None:
+            return ""
+        stats = export.stats()
+        return f"\nShared memory: {stats['name']}, {stats['frames']} frames, {stats['write_ms']:.2f} ms/frame"
+
+    def _filter_tooltip(self) -> str:
+        if not self._filter.active or not self._filter.frames:
+            return ""
+        stats = self._filter.stats()
+        where = f", {stats['workers']} workers" if stats["workers"] else ""
+        return f"\nFilters: {', '.join(stats['filters'])}, {stats['filter_p50_ms']:.1f} ms/frame{where}"
+
     def _format_zoom(self, zoom):
         return f"{zoom:.2f}".rstrip("0").rstrip(".") + "x"
 
@@ -380,22 +929,60 @@ class PreviewWindow(QtWidgets.QWidget):
             self._status_mode = "tiny"
 
         # Refresh status display to match current mode.
-        self._set_status("live" if self._timer.isActive() else ("paused" if self._frozen else "idle"))
+        self._set_status("live" if self._capture.running else ("paused" if self._frozen else "idle"))
 
     def _show_title_menu(self, pos):
         menu = QtWidgets.QMenu(self)
         action_freeze = menu.addAction("Freeze" if not self._frozen else "Live")
         action_reselect = menu.addAction("Reselect")
         action_hotkey = menu.addAction("Hotkey")
+        action_add = menu.addAction("Add Region") if self._on_add_region else None
+        action_hud = menu.addAction("Performance HUD")
+        action_hud.setCheckable(True)
+        action_hud.setChecked(self._hud.isVisible())
+        action_export = menu.addAction("Export Perf Stats...")
+        action_export.setEnabled(PERF.enabled)
+        action_record = menu.addAction("Stop Recording" if self._recorder.recording else "Start Recording")
+        quality_menu = menu.addMenu("Quality")
+        quality_actions = {}
+        for quality in RenderQuality.ALL:
+            action_quality = quality_menu.addAction(RenderQuality.LABELS[quality])
+            action_quality.setCheckable(True)
+            action_quality.setChecked(quality == self._canvas.quality())
+            quality_actions[action_quality] = quality
+        filter_menu = menu.addMenu("Filters")
+        filter_actions = {}
+        enabled = self._filter.names()
+        for name, cls in FILTERS.items():
+            action_filter = filter_menu.addAction(cls.label)
+            action_filter.setCheckable(True)
+            action_filter.setChecked(name in enabled)
+            filter_actions[action_filter] = name
         menu.addSeparator()
+        action_close = menu.addAction("Close Region")
+        action_close.setEnabled(self._in_session)
         action_exit = menu.addAction("Exit")
 
         action = menu.exec(self._title.mapToGlobal(pos))
-        if action == action_freeze:
+        if action in quality_actions:
+            self._set_quality(quality_actions[action])
+        elif action in filter_actions:
+            self._toggle_filter(filter_actions[action])
+        elif action == action_freeze:
             self._toggle_freeze()
         elif action == action_reselect:
             self._on_reselect()
         elif action == action_hotkey:
             self._on_change_hotkey()
+        elif action == action_record:
+            self._toggle_recording()
+        elif action is not None and action == action_add:
+            self._on_add_region()
+        elif action == action_hud:
+            self._toggle_hud()
+        elif action == action_export:
+            self._export_perf()
+        elif action == action_close:
+            self._close_preview()
         elif action == action_exit:
             self._on_close_app()
@@ -0,0 +1,367 @@
+import bisect
+import mmap
+import os
+import struct
+import threading
+import time
+from collections import deque
+import numpy as np
+from PyQt6 import QtCore, QtGui
+from . import frames
+
+# Ring file layout:
+#   header (64 bytes) | index ring (index_slots * 40 bytes) | data ring (data_capacity bytes)
+# Frame N lives in index slot N % index_slots. Its payload sits at logical byte offset
+# `offset` of an ever-growing data stream, physically at offset % data_capacity; a payload
+# never straddles the end of the ring (the writer skips to 0 instead). A frame is readable
+# while its payload has not been overwritten, i.e. offset >= head - data_capacity.
+MAGIC = b"LMTREC1\0"
+HEADER = struct.Struct("<8sIIQQQ")  # magic, version, index_slots, data_capacity, frame_count, head
+HEADER_SIZE = 64
+ENTRY = struct.Struct("<dQQIHHB7x")  # timestamp, offset, key_frame, length, width, height, flags
+FLAG_KEY = 0x01
+
+# Payload: u32 run count, u32 run starts[n], u32 run lengths[n], u32 pixels[sum(lengths)].
+# A delta payload lists the pixels that differ from the previous frame; a keyframe is the
+# same encoding against an all-zero frame (screen grabs are opaque, so that is one run).
+
+
+def encode_runs(cur: np.ndarray, prev: np.ndarray | None) -> bytes:
+    changed = cur != prev if prev is not None else cur != 0
+    edges = np.flatnonzero(np.diff(changed.view(np.int8), prepend=0, append=0))
+    starts = edges[0::2].astype("<u4")
+    lengths = (edges[1::2] - edges[0::2]).astype("<u4")
+    values = cur[changed].astype("<u4", copy=False)
+    return b"".join((struct.pack("<I", starts.size), starts.tobytes(), lengths.tobytes(), values.tobytes()))
+
+
+def apply_runs(payload, target: np.ndarray):
+    (count,) = struct.unpack_from("<I", payload, 0)
+    if not count:
+        return
+    starts = np.frombuffer(payload, "<u4", count, 4).astype(np.int64)
+    lengths = np.frombuffer(payload, "<u4", count, 4 + 4 * count).astype(np.int64)
+    values = np.frombuffer(payload, "<u4", int(lengths.sum()), 4 + 8 * count)
+    offsets = np.cumsum(lengths) - lengths
+    target[np.arange(values.size) + np.repeat(starts - offsets, lengths)] = values
+
+
+def _pixels(image: QtGui.QImage) -> np.ndarray:
+    # Flat uint32 copy of the frame with row padding dropped.
+    # Must copy: the writer keeps it as the delta base after the QImage is gone.
+    return frames.frame_view(image).copy().view("<u4").reshape(-1)
+
+
+class RingWriter:
+    def __init__(self, path: str, data_capacity: int, index_slots: int = 65536, key_interval: int = 60):
+        self._path = path
+        self._slots = index_slots
+        self._capacity = data_capacity
+        self._key_interval = key_interval
+        size = HEADER_SIZE + index_slots * ENTRY.size + data_capacity
+        with open(path, "wb") as f:
+            f.truncate(size)
+        self._file = open(path, "r+b")
+        try:
+            self._map = mmap.mmap(self._file.fileno(), size)
+        except (OSError, ValueError):
+            self._file.close()
+            raise
+        self._data_base = HEADER_SIZE + index_slots * ENTRY.size
+        self._count = 0
+        self._head = 0
+        self._prev = None
+        self._prev_size = None
+        self._key_frame = 0
+        self._write_header()
+
+    @property
+    def frame_count(self) -> int:
+        return self._count
+
+    def append(self, image: QtGui.QImage, timestamp: float) -> int:
+        cur = _pixels(image)
+        size = (image.width(), image.height())
+        # Keyframes bound replay cost on seek and must follow any size change.
+        key = self._prev is None or size != self._prev_size or self._count - self._key_frame >= self._key_interval
+        payload = encode_runs(cur, None if key else self._prev)
+        if len(payload) > self._capacity:
+            raise ValueError("Frame does not fit in the recording ring.")
+
+        pos = self._head % self._capacity
+        if pos + len(payload) > self._capacity:
+            self._head += self._capacity - pos
+            pos = 0
+        self._map[self._data_base + pos:self._data_base + pos + len(payload)] = payload
+        if key:
+            self._key_frame = self._count
+        entry = ENTRY.pack(
+            timestamp, self._head, self._key_frame, len(payload), size[0], size[1], FLAG_KEY if key else 0
+        )
+        slot = HEADER_SIZE + (self._count % self._slots) * ENTRY.size
+        self._map[slot:slot + ENTRY.size] = entry
+        self._head += len(payload)
+        self._count += 1
+        self._prev = cur
+        self._prev_size = size
+        # Header last, so a concurrent reader never sees an entry before its payload.
+        self._write_header()
+        return len(payload)
+
+    def close(self):
+        if self._map is None:
+            return
+        self._map.flush()
+        self._map.close()
+        self._file.close()
+        self._map = None
+
+    def _write_header(self):
+        self._map[0:HEADER.size] = HEADER.pack(MAGIC, 1, self._slots, self._capacity, self._count, self._head)
+
+
+class RecordingReader:
+    # Random access into a ring file by frame number or timestamp. Seeking by time is a
+    # binary search over the index ring; decoding replays at most key_interval deltas
+    # from the owning keyframe, or none when stepping forward from the last decoded frame.
+
+    def __init__(self, path: str):
+        self._file = open(path, "rb")
+        self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, _version, self._slots, self._capacity, _, _ = HEADER.unpack_from(self._map, 0)
+        if magic != MAGIC:
+            raise ValueError(f"Not a recording file: {path}")
+        self._data_base = HEADER_SIZE + self._slots * ENTRY.size
+        self._cached_index = None
+        self._cached_pixels = None
+
+    def close(self):
+        self._map.close()
+        self._file.close()
+
+    def _state(self) -> tuple[int, int]:
+        _, _, _, _, count, head = HEADER.unpack_from(self._map, 0)
+        return count, head
+
+    def _entry(self, index: int):
+        return ENTRY.unpack_from(self._map, HEADER_SIZE + (index % self._slots) * ENTRY.size)
+
+    def range(self) -> tuple[int, int]:
+        # [first, end) of frame numbers whose payload is still in the ring.
+        count, head = self._state()
+        lo = max(0, count - self._slots)
+        floor = head - self._capacity
+        hi = count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self._entry(mid)[1] >= floor:
+                hi = mid
+            else:
+                lo = mid + 1
+        return lo, count
+
+    def __len__(self):
+        first, end = self.range()
+        return end - first
+
+    def timestamp(self, index: int) -> float:
+        return self._entry(index)[0]
+
+    def index_at(self, timestamp: float) -> int:
+        # Newest frame captured at or before `timestamp` (clamped to the oldest frame).
+        first, end = self.range()
+        if first == end:
+            raise IndexError("Recording is empty.")
+        keys = _IndexTimestamps(self, first, end)
+        return first + max(0, bisect.bisect_right(keys, timestamp) - 1)
+
+    def frame_at(self, timestamp: float) -> tuple[float, np.ndarray]:
+        index = self.index_at(timestamp)
+        return self.timestamp(index), self.frame(index)
+
+    def frame(self, index: int) -> np.ndarray:
+        # Decoded (height, width, 4) uint8 BGRA frame, owned by the caller.
+        first, end = self.range()
+        if not first <= index < end:
+            raise IndexError(f"Frame {index} is not in the ring ({first}..{end - 1}).")
+        _, _, key_frame, _, width, height, _ = self._entry(index)
+        if key_frame < first:
+            # Its keyframe was overwritten; the earliest frames of the ring are undecodable.
+            raise IndexError(f"Frame {index} lost its keyframe to ring wrap-around.")
+
+        cached = self._cached_index
+        if cached is not None and key_frame <= cached <= index and self._entry(cached)[2] == key_frame:
+            start, pixels = cached + 1, self._cached_pixels
+        else:
+            start, pixels = key_frame, np.zeros(width * height, dtype="<u4")
+        for i in range(start, index + 1):
+            apply_runs(self._payload(i), pixels)
+        self._cached_index = index
+        self._cached_pixels = pixels
+        return pixels.copy().view(np.uint8).reshape(height, width, 4)
+
+    def _payload(self, index: int) -> memoryview:
+        _, offset, _, length, _, _, _ = self._entry(index)
+        pos = self._data_base + offset % self._capacity
+        return memoryview(self._map)[pos:pos + length]
+
+
+class _IndexTimestamps:
+    # Lazy sequence over index timestamps so bisect runs without materialising the ring.
+    def __init__(self, reader: RecordingReader, first: int, end: int):
+        self._reader = reader
+        self._first = first
+        self._end = end
+
+    def __len__(self):
+        return self._end - self._first
+
+    def __getitem__(self, i):
+        return self._reader.timestamp(self._first + i)
+
+
+class RecorderWorker(QtCore.QObject):
+    # Emitted (path, reason) when the ring file cannot be created; nothing is recorded.
+    failed = QtCore.pyqtSignal(str, str)
+
+    def __init__(self, queue: "RecorderQueue"):
+        super().__init__()
+        self._queue = queue
+        self._writer = None
+
+    @QtCore.pyqtSlot(str, int)
+    def open(self, path: str, capacity: int):
+        self.close()
+        try:
+            self._writer = RingWriter(path, capacity)
+        except (OSError, ValueError) as exc:
+            # E.g. disk full, no permission, a bad path. An exception must not leave the
+            # slot: PyQt would abort the process.
+            self.failed.emit(path, getattr(exc, "strerror", None) or str(exc))
+
+    @QtCore.pyqtSlot()
+    def close(self):
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+
+    @QtCore.pyqtSlot()
+    def drain(self):
+        while True:
+            item = self._queue.pop()
+            if item is None:
+                return
+            if self._writer is None:
+                continue
+            image, timestamp = item
+            t0 = time.perf_counter()
+            try:
+                written = self._writer.append(image, timestamp)
+            except ValueError:
+                self._queue.dropped += 1
+                continue
+            self._queue.record_write(written, (time.perf_counter() - t0) * 1000.0)
+
+
+class RecorderQueue:
+    # Small bounded handoff to the encoder. When the encoder falls behind, the oldest
+    # queued frame is discarded rather than stalling the GUI thread.
+    def __init__(self, depth: int = 8):
+        self._lock = threading.Lock()
+        self._items = deque(maxlen=depth)
+        self.frames = 0
+        self.dropped = 0
+        self.bytes = 0
+        self.encode_ms = 0.0
+
+    def push(self, item) -> bool:
+        with self._lock:
+            was_empty = not self._items
+            if len(self._items) == self._items.maxlen:
+                self.dropped += 1
+            self._items.append(item)
+        return was_empty
+
+    def pop(self):
+        with self._lock:
+            return self._items.popleft() if self._items else None
+
+    def record_write(self, written: int, encode_ms: float):
+        self.frames += 1
+        self.bytes += written
+        self.encode_ms = encode_ms
+
+
+class FrameRecorder(QtCore.QObject):
+    # Emitted (path, reason) when recording could not start; recording() is False again.
+    error = QtCore.pyqtSignal(str, str)
+    _open_requested = QtCore.pyqtSignal(str, int)
+    _close_requested = QtCore.pyqtSignal()
+    _wake = QtCore.pyqtSignal()
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._queue = RecorderQueue()
+        self._thread = QtCore.QThread(self)
+        self._thread.setObjectName("RecorderThread")
+        self._worker = RecorderWorker(self._queue)
+        self._worker.moveToThread(self._thread)
+        # Flush the ring file even if the queued close never ran before quit.
+        self._thread.finished.connect(self._worker.close)
+        self._thread.finished.connect(self._worker.deleteLater)
+        self._open_requested.connect(self._worker.open)
+        self._close_requested.connect(self._worker.close)
+        self._wake.connect(self._worker.drain)
+        self._worker.failed.connect(self._open_failed)
+        self._path = None
+        self._thread.start()
+
+    @property
+    def recording(self) -> bool:
+        return self._path is not None
+
+    @property
+    def path(self) -> str | None:
+        return self._path
+
+    def start(self, path: str, capacity: int):
+        try:
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        except OSError as exc:
+            self.error.emit(path, exc.strerror or str(exc))
+            return
+        self._path = path
+        self._open_requested.emit(path, capacity)
+
+    def _open_failed(self, path: str, reason: str):
+        # Queued from the recorder thread. Frames queued meanwhile were never written.
+        if self._path == path:
+            self._path = None
+        while self._queue.pop() is not None:
+            pass
+        self.error.emit(path, reason)
+
+    def stop(self):
+        if self._path is None:
+            return
+        self._path = None
+        self._close_requested.emit()
+
+    def submit(self, image: QtGui.QImage, timestamp: float | None = None):
+        if self._path is None or image.isNull():
+            return
+        if self._queue.push((image, time.time() if timestamp is None else timestamp)):
+            self._wake.emit()
+
+    def stats(self) -> dict:
+        return {
+            "frames": self._queue.frames,
+            "dropped": self._queue.dropped,
+            "bytes": self._queue.bytes,
+            "encode_ms": self._queue.encode_ms,
+        }
+
+    def shutdown(self):
+        self.stop()
+        self._thread.quit()
+        self._thread.wait()
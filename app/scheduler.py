@@ -0,0 +1,88 @@
+import time
+
+
+class JitterHistogram:
+    # Lateness of each tick relative to its deadline, in log2 millisecond buckets.
+    EDGES_MS = (0.5, 1.0, 2.0, 4.0, 8.0, 16.0)
+
+    def __init__(self):
+        self.counts = [0] * (len(self.EDGES_MS) + 1)
+
+    def add(self, late_ms: float):
+        for i, edge in enumerate(self.EDGES_MS):
+            if late_ms < edge:
+                self.counts[i] += 1
+                return
+        self.counts[-1] += 1
+
+    def reset(self):
+        self.counts = [0] * (len(self.EDGES_MS) + 1)
+
+    def labels(self) -> list[str]:
+        labels = []
+        lo = 0.0
+        for edge in self.EDGES_MS:
+            labels.append(f"{lo:g}-{edge:g}ms")
+            lo = edge
+        labels.append(f">={lo:g}ms")
+        return labels
+
+    def as_dict(self) -> dict:
+        return dict(zip(self.labels(), self.counts))
+
+
+class AdaptiveScheduler:
+    # Deadline-based capture pacing between min_fps and max_fps. Changed frames halve
+    # the interval immediately; a run of static frames backs it off gradually, so a
+    # fight ramps up within a frame or two while idle periods drift down to min_fps.
+
+    def __init__(self, min_fps: float, max_fps: float, backoff_after: int = 4, backoff: float = 1.25):
+        self.min_interval = 1.0 / max_fps
+        self.max_interval = 1.0 / min_fps
+        self._backoff_after = backoff_after
+        self._backoff = backoff
+        self.interval = self.min_interval
+        self._deadline = 0.0
+        self._static_run = 0
+        self.missed = 0
+        self.jitter = JitterHistogram()
+
+    @property
+    def fps(self) -> float:
+        return 1.0 / self.interval
+
+    def reset(self, interval_s: float, now: float | None = None):
+        self.interval = min(self.max_interval, max(self.min_interval, interval_s))
+        self._deadline = time.perf_counter() if now is None else now
+        self._static_run = 0
+
+    def tick_started(self, now: float | None = None):
+        now = time.perf_counter() if now is None else now
+        self.jitter.add(max(0.0, now - self._deadline) * 1000.0)
+
+    def frame_done(self, changed: bool, now: float | None = None) -> float:
+        # Returns the delay in seconds until the next tick.
+        now = time.perf_counter() if now is None else now
+        if changed:
+            self._static_run = 0
+            self.interval = max(self.min_interval, self.interval * 0.5)
+        else:
+            self._static_run += 1
+            if self._static_run >= self._backoff_after:
+                self.interval = min(self.max_interval, self.interval * self._backoff)
+
+        # Advance from the previous deadline, not from `now`, so pacing does not drift.
+        self._deadline += self.interval
+        if self._deadline < now:
+            # Overran: skip the missed slots instead of bursting to catch up.
+            skipped = int((now - self._deadline) / self.interval) + 1
+            self.missed += skipped
+            self._deadline += skipped * self.interval
+        return self._deadline - now
+
+    def stats(self) -> dict:
+        return {
+            "fps": self.fps,
+            "missed_ticks": self.missed,
+            "jitter": self.jitter.as_dict(),
+        }
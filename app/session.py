@@ -0,0 +1,86 @@
+import json
+import os
+from dataclasses import asdict, dataclass, field
+from PyQt6 import QtCore
+
+SESSION_VERSION = 1
+
+
+@dataclass
+class RegionSession:
+    rect: tuple[int, int, int, int]  # captured region, virtual desktop coordinates
+    zoom: float = 1.0
+    opacity: float = 0.95
+    geometry: tuple[int, int, int, int] | None = None  # preview window frame
+    capture_fps_ms: int = 33
+
+
+@dataclass
+class Session:
+    regions: list[RegionSession] = field(default_factory=list)
+
+
+def default_path() -> str:
+    return os.path.join(
+        QtCore.QStandardPaths.writableLocation(QtCore.QStandardPaths.StandardLocation.AppDataLocation),
+        "session.json",
+    )
+
+
+def load_session(path: str) -> Session | None:
+    # A missing, unreadable or foreign file just means a cold start.
+    try:
+        with open(path) as f:
+            data = json.load(f)
+        if data.get("version") != SESSION_VERSION:
+            return None
+        regions = []
+        for item in data.get("regions", []):
+            geometry = item.get("geometry")
+            regions.append(
+                RegionSession(
+                    rect=tuple(int(v) for v in item["rect"]),
+                    zoom=float(item.get("zoom", 1.0)),
+                    opacity=float(item.get("opacity", 0.95)),
+                    geometry=tuple(int(v) for v in geometry) if geometry else None,
+                    capture_fps_ms=int(item.get("capture_fps_ms", 33)),
+                )
+            )
+        return Session(regions)
+    except (OSError, ValueError, KeyError, TypeError, AttributeError):
+        return None
+
+
+def save_session(path: str, session: Session):
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp = path + ".tmp"
+    with open(tmp, "w") as f:
+        json.dump({"version": SESSION_VERSION, **asdict(session)}, f, indent=2)
+    # Atomic swap so a crash mid-write never leaves a truncated session behind.
+    os.replace(tmp, path)
+
+
+def _covered(rect: QtCore.QRect, screens: list[QtCore.QRect]) -> bool:
+    # Screens never overlap, so the rect is fully visible when the on-screen parts add up to it.
+    area = sum(
+        part.width() * part.height() for part in (rect.intersected(screen) for screen in screens) if not part.isEmpty()
+    )
+    return area == rect.width() * rect.height()
+
+
+def validate(session: Session, screens: list[QtCore.QRect], min_px: int) -> Session:
+    # Drops regions that no longer lie on the current screens, or that the overlay would
+    # not accept (min_px or less on a side); a window geometry that is now off-screen is
+    # discarded so the preview opens at its default position instead.
+    regions = []
+    for region in session.regions:
+        rect = QtCore.QRect(*region.rect)
+        if rect.width() <= min_px or rect.height() <= min_px or not _covered(rect, screens):
+            continue
+        geometry = region.geometry
+        if geometry and not any(QtCore.QRect(*geometry).intersects(screen) for screen in screens):
+            geometry = None
+        regions.append(
+            RegionSession(region.rect, region.zoom, region.opacity, geometry, max(1, region.capture_fps_ms))
+        )
+    return Session(regions)
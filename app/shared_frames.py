@@ -0,0 +1,229 @@
+import multiprocessing
+import os
+import struct
+import sys
+import threading
+import time
+from multiprocessing import shared_memory
+import numpy as np
+
+# Captured frames for other local processes (OBS scripts, analytics tools), published in
+# a multiprocessing.shared_memory ring, one segment per region. Needs only NumPy, not
+# Qt, so readers can import this module on its own.
+#
+# Segment layout:
+#   header (64 bytes) | slots x (slot header (64 bytes) | slot_bytes of pixels)
+# Frame N goes to slot N % slots. Every slot is guarded by a seqlock: the writer makes
+# the slot's lock word odd, writes pixels and metadata, then makes it even again, and
+# never waits for anyone. A reader notes the lock word, uses the slot, and checks the
+# word is unchanged afterwards; if not, the writer came round to that slot meanwhile
+# and what was read is discarded. Pixels are rows of width * 4 bytes, B, G, R, A.
+MAGIC = b"LMTSHM1\0"
+HEADER = struct.Struct("<8sIIQQQ")  # magic, version, slots, slot_bytes, frames written, writer PID
+HEADER_SIZE = 64
+SLOT = struct.Struct("<QQdIIII")  # lock word, frame seq, timestamp (time.time()), width, height, stride, format
+SLOT_HEADER_SIZE = 64
+FORMAT_BGRA8 = 1
+_FRAMES_OFFSET = 24  # of the frames-written counter in the header
+
+
+def attach(name: str) -> shared_memory.SharedMemory:
+    # Opens an existing segment without owning it. On POSIX before Python 3.13, opening
+    # registers the segment with this process's resource tracker, which unlinks it when
+    # the tracker exits; only the writer owns the segment. A reader with a tracker of its
+    # own unregisters it again. A reader sharing the writer's tracker (the writer's own
+    # process, or a multiprocessing child of it) must not: the tracker keeps one entry
+    # per name, so that would drop the writer's registration. The writer is the PID in
+    # the header; segments without one (the filter pool's) belong to this process or its
+    # multiprocessing parent.
+    if sys.version_info >= (3, 13):
+        return shared_memory.SharedMemory(name, track=False)
+    shm = shared_memory.SharedMemory(name)
+    if not _shares_tracker(_owner_pid(shm)):
+        _untrack(shm)
+    return shm
+
+
+def _untrack(shm: shared_memory.SharedMemory):
+    if os.name != "nt":
+        from multiprocessing import resource_tracker
+
+        resource_tracker.unregister(shm._name, "shared_memory")
+
+
+def _owner_pid(shm: shared_memory.SharedMemory) -> int | None:
+    if shm.size < HEADER.size:
+        return None
+    magic, version, *_, pid = HEADER.unpack_from(shm.buf, 0)
+    return pid if magic == MAGIC and version >= 2 else None
+
+
+def _shares_tracker(owner_pid: int | None) -> bool:
+    if owner_pid is None:
+        return True
+    parent = multiprocessing.parent_process()
+    return owner_pid == os.getpid() or (parent is not None and parent.pid == owner_pid)
+
+
+def _alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass  # exists, owned by another user
+    return True
+
+
+class SharedFrameWriter:
+    # Writer side, on the capture thread. One copy per frame, into the next slot.
+
+    def __init__(self, name: str, slots: int = 4, slot_bytes: int = 4 * 1024 * 1024):
+        size = HEADER_SIZE + slots * (SLOT_HEADER_SIZE + slot_bytes)
+        try:
+            self._shm = shared_memory.SharedMemory(name, create=True, size=size)
+        except FileExistsError:
+            if os.name == "nt":
+                # Another instance is exporting under this name.
+                raise
+            # Left behind by a crashed run, unless its writer is still running.
+            stale = shared_memory.SharedMemory(name)
+            owner = _owner_pid(stale)
+            if owner is None or _alive(owner):
+                _untrack(stale)
+                stale.close()
+                raise FileExistsError(f"{name} is in use by another process.") from None
+            stale.close()
+            stale.unlink()
+            self._shm = shared_memory.SharedMemory(name, create=True, size=size)
+        self.name = name
+        self._slots = slots
+        self._slot_bytes = slot_bytes
+        self._lock = threading.Lock()  # write() against close(), not against readers
+        self._buf = self._shm.buf
+        self._count = 0
+        self.frames = 0
+        self.oversized = 0
+        self.write_ms = 0.0
+        HEADER.pack_into(self._buf, 0, MAGIC, 2, slots, slot_bytes, 0, os.getpid())
+
+    def write(self, view: np.ndarray, seq: int, timestamp: float) -> bool:
+        # view: (height, width, 4) uint8, e.g. frames.frame_view(); rows may be padded.
+        h, w = view.shape[:2]
+        stride = w * 4
+        if h * stride > self._slot_bytes:
+            self.oversized += 1
+            return False
+        t0 = time.perf_counter()
+        with self._lock:
+            if self._buf is None:
+                return False
+            base = HEADER_SIZE + (self._count % self._slots) * (SLOT_HEADER_SIZE + self._slot_bytes)
+            (lock,) = struct.unpack_from("<Q", self._buf, base)
+            struct.pack_into("<Q", self._buf, base, lock + 1)  # odd: being written
+            pixels = np.ndarray((h, w, 4), np.uint8, self._buf, base + SLOT_HEADER_SIZE)
+            np.copyto(pixels, view)
+            del pixels
+            SLOT.pack_into(self._buf, base, lock + 1, seq, timestamp, w, h, stride, FORMAT_BGRA8)
+            struct.pack_into("<Q", self._buf, base, lock + 2)  # even: complete
+            self._count += 1
+            struct.pack_into("<Q", self._buf, _FRAMES_OFFSET, self._count)
+        self.frames += 1
+        self.write_ms = (time.perf_counter() - t0) * 1000.0
+        return True
+
+    def stats(self) -> dict:
+        return {"name": self.name, "frames": self.frames, "oversized": self.oversized, "write_ms": self.write_ms}
+
+    def close(self):
+        with self._lock:
+            if self._buf is None:
+                return
+            self._buf = None
+            self._shm.close()
+            # Readers that still have it open keep their mapping; new ones cannot attach.
+            self._shm.unlink()
+
+
+class SharedFrame:
+    # One frame as seen by a reader. `pixels` points straight into the shared segment:
+    # use it, then call valid() to learn whether the writer overwrote it meanwhile.
+
+    def __init__(self, reader: "SharedFrameReader", base: int, lock: int, meta: tuple, pixels: np.ndarray):
+        self._reader = reader
+        self._base = base
+        self._lock = lock
+        _, self.seq, self.timestamp, self.width, self.height, self.stride, self.format = meta
+        self.pixels = pixels
+
+    def valid(self) -> bool:
+        return self._reader._lock_word(self._base) == self._lock
+
+    def copy(self) -> np.ndarray | None:
+        # A private copy, or None if the slot was overwritten while copying.
+        out = self.pixels.copy()
+        return out if self.valid() else None
+
+
+class SharedFrameReader:
+    # Reader side, in any process. Never blocks or slows the writer.
+    #
+    #     reader = SharedFrameReader("lolmap-1")
+    #     frame = reader.latest()
+    #     if frame is not None:
+    #         red = frame.pixels[..., 2].mean()
+    #         if frame.valid():
+    #             ...  # red is from one complete frame
+    #     del frame
+    #     reader.close()
+
+    def __init__(self, name: str):
+        self._shm = attach(name)
+        magic, version, self._slots, self._slot_bytes, *_ = HEADER.unpack_from(self._shm.buf, 0)
+        if magic != MAGIC:
+            self._shm.close()
+            raise ValueError(f"{name} is not a frame export segment.")
+        self.name = name
+        self.torn = 0  # slots found mid-write
+
+    @property
+    def frames_written(self) -> int:
+        return HEADER.unpack_from(self._shm.buf, 0)[4]
+
+    def latest(self, after_seq: int = 0) -> SharedFrame | None:
+        # The newest complete frame with a capture seq above `after_seq`, or None.
+        count = self.frames_written
+        for index in range(count - 1, max(-1, count - 1 - self._slots), -1):
+            base = HEADER_SIZE + (index % self._slots) * (SLOT_HEADER_SIZE + self._slot_bytes)
+            meta = SLOT.unpack_from(self._shm.buf, base)
+            lock = meta[0]
+            if lock & 1:
+                self.torn += 1
+                continue
+            if meta[1] <= after_seq:
+                return None
+            h, w, stride = meta[4], meta[3], meta[5]
+            pixels = np.ndarray((h, w, 4), np.uint8, self._shm.buf, base + SLOT_HEADER_SIZE, (stride, 4, 1))
+            pixels.flags.writeable = False
+            if self._lock_word(base) != lock:
+                # Rewritten while the metadata was read.
+                self.torn += 1
+                continue
+            return SharedFrame(self, base, lock, meta, pixels)
+        return None
+
+    def wait(self, after_seq: int, timeout: float, poll_s: float = 0.002) -> SharedFrame | None:
+        # Polls for a frame newer than `after_seq`; there is no cross-process wake-up.
+        deadline = time.perf_counter() + timeout
+        while True:
+            frame = self.latest(after_seq)
+            if frame is not None or time.perf_counter() >= deadline:
+                return frame
+            time.sleep(poll_s)
+
+    def close(self):
+        # Drop every SharedFrame first: their pixel views keep the mapping in use.
+        self._shm.close()
+
+    def _lock_word(self, base: int) -> int:
+        return struct.unpack_from("<Q", self._shm.buf, base)[0]
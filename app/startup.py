@@ -0,0 +1,44 @@
+import json
+import os
+import sys
+import time
+
+# Imported first thing in main.py, so this stays free of Qt and other heavy imports.
+# _T0 is that import, not process creation: interpreter startup comes before it.
+_T0 = time.perf_counter()
+
+
+class StartupTrace:
+    # Milestone timeline from the start of main.py to the first event loop turn. Enabled with
+    # LOLMAP_STARTUP_TRACE=1 (printed to stderr) or LOLMAP_STARTUP_TRACE=<path>.json.
+
+    def __init__(self, target: str):
+        self.enabled = target.lower() not in ("", "0", "false", "no", "off")
+        self._path = "" if target.lower() in ("1", "true", "yes", "on") else target
+        self._marks = [("main.py started", _T0)]
+        self._reported = False
+
+    def mark(self, name: str):
+        if self.enabled:
+            self._marks.append((name, time.perf_counter()))
+
+    def timeline(self) -> list[tuple[str, float]]:
+        # (milestone, ms since main.py started)
+        return [(name, (t - _T0) * 1000.0) for name, t in self._marks]
+
+    def report(self):
+        if not self.enabled or self._reported:
+            return
+        self._reported = True
+        timeline = self.timeline()
+        if self._path:
+            with open(self._path, "w") as f:
+                json.dump([{"milestone": name, "ms": ms} for name, ms in timeline], f, indent=2)
+            return
+        prev = 0.0
+        for name, ms in timeline:
+            print(f"[startup] {ms:8.1f} ms  (+{ms - prev:7.1f})  {name}", file=sys.stderr)
+            prev = ms
+
+
+STARTUP = StartupTrace(os.environ.get("LOLMAP_STARTUP_TRACE", ""))
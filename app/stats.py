@@ -0,0 +1,34 @@
+from collections import deque
+
+
+def percentile(samples, pct: float) -> float:
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    k = (len(ordered) - 1) * pct / 100.0
+    lo = int(k)
+    hi = min(lo + 1, len(ordered) - 1)
+    return ordered[lo] + (ordered[hi] - ordered[lo]) * (k - lo)
+
+
+class RollingStats:
+    def __init__(self, size: int = 240):
+        self._samples = deque(maxlen=size)
+
+    def add(self, value: float):
+        self._samples.append(value)
+
+    def clear(self):
+        self._samples.clear()
+
+    def __len__(self):
+        return len(self._samples)
+
+    def percentile(self, pct: float) -> float:
+        return percentile(list(self._samples), pct)
+
+    def max(self) -> float:
+        return max(self._samples, default=0.0)
+
+    def mean(self) -> float:
+        return sum(self._samples) / len(self._samples) if self._samples else 0.0
@@ -0,0 +1,479 @@
+import base64
+import hashlib
+import http.server
+import ipaddress
+import json
+import select
+import socket
+import struct
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from urllib.parse import urlsplit
+from PyQt6 import QtCore, QtGui
+from .stats import RollingStats
+
+# Serves the captured frames to other devices on the network:
+#   /              a page showing every channel
+#   /mjpeg/<id>    multipart/x-mixed-replace JPEG stream, works in any browser <img>
+#   /ws/<id>       WebSocket, one binary message per encoded frame
+#   /stats.json    encode time, bytes/s and per-client lag
+# A channel is one capture region (CaptureChannel.id), registered by its preview with
+# add_channel(); any other id is a 404. Each published frame is encoded
+# once, on a small thread pool, and shared by every client of its channel. Clients always
+# take the newest encoded frame: a slow client skips frames instead of queueing them.
+# There is no authentication. Requests must name this server in `Host` (an IP address,
+# localhost or this machine's name), so a web page cannot reach it through DNS rebinding,
+# and a WebSocket opened by a web page must come from the stream's own page (`Origin`).
+
+_BOUNDARY = b"lolmapframe"
+_WS_GUID = b"258EAFA5-E914-47DA-95CA-C5AB0DC85B11"
+_FORMATS = {"jpeg": ("JPG", "image/jpeg"), "png": ("PNG", "image/png")}
+_RATE_WINDOW_S = 2.0
+_SEND_TIMEOUT_S = 10.0  # a client that takes longer than this for one frame is dropped
+# A small socket send buffer, so the kernel cannot queue seconds of frames for a slow
+# client: the write blocks instead, and the client then gets the newest frame.
+_SEND_BUFFER = 16 * 1024
+
+
+@dataclass
+class EncodedFrame:
+    seq: int
+    payload: bytes
+    captured_at: float  # time.perf_counter() of the grab
+
+
+class _Rate:
+    # Bytes per second over the last _RATE_WINDOW_S.
+
+    def __init__(self):
+        self._events = deque()
+        self._bytes = 0
+
+    def add(self, nbytes: int, now: float):
+        self._events.append((now, nbytes))
+        self._bytes += nbytes
+        self._trim(now)
+
+    def per_second(self, now: float) -> float:
+        self._trim(now)
+        return self._bytes / _RATE_WINDOW_S
+
+    def _trim(self, now: float):
+        while self._events and self._events[0][0] < now - _RATE_WINDOW_S:
+            self._bytes -= self._events.popleft()[1]
+
+
+class _Client:
+    def __init__(self, kind: str, address: str):
+        self.kind = kind
+        self.address = address
+        self.seq = 0  # last frame sent
+        self.frames = 0
+        self.skipped = 0
+        self.bytes = 0
+        self.rate = _Rate()
+        self.lag_ms = RollingStats()
+
+    def sent(self, frame: EncodedFrame, nbytes: int, now: float):
+        if self.seq:
+            self.skipped += max(0, frame.seq - self.seq - 1)
+        self.seq = frame.seq
+        self.frames += 1
+        self.bytes += nbytes
+        self.rate.add(nbytes, now)
+        # Grab to the last byte handed to the socket.
+        self.lag_ms.add((now - frame.captured_at) * 1000.0)
+
+    def stats(self, now: float) -> dict:
+        return {
+            "kind": self.kind,
+            "address": self.address,
+            "frames": self.frames,
+            "skipped": self.skipped,
+            "bytes_per_s": self.rate.per_second(now),
+            "lag_p50_ms": self.lag_ms.percentile(50),
+            "lag_max_ms": self.lag_ms.max(),
+        }
+
+
+class _Channel:
+    # Latest encoded frame of one region plus the newest frame waiting for an encoder.
+
+    def __init__(self):
+        self.cond = threading.Condition()
+        self.latest = None  # EncodedFrame
+        self.image = None  # newest published frame, (seq, QImage, captured_at)
+        self.pending = None  # published while every encoder was busy; latest wins
+        self.in_flight = 0
+        self.clients = []
+        self.dropped = False  # its preview closed; attached clients disconnect
+
+
+class StreamServer:
+    def __init__(self, host: str, port: int, encoders: int = 2, fmt: str = "jpeg", quality: int = 80):
+        if fmt not in _FORMATS:
+            raise ValueError(f"Unknown stream format {fmt!r}; expected one of {', '.join(_FORMATS)}.")
+        self._host = host
+        self._port = port
+        self._encoders = max(1, encoders)
+        self._format, self._mime = _FORMATS[fmt]
+        self._quality = quality
+        self._lock = threading.Lock()
+        self._channels = {}
+        self._httpd = None
+        self._thread = None
+        self._pool = None
+        self._closed = False
+        self.published = 0
+        self.encoded = 0
+        self.superseded = 0  # frames replaced before an encoder was free
+        self.encode_ms = RollingStats()
+        self._rate = _Rate()
+
+    @property
+    def running(self) -> bool:
+        return self._httpd is not None
+
+    @property
+    def address(self) -> tuple[str, int] | None:
+        return self._httpd.server_address[:2] if self._httpd is not None else None
+
+    def url(self) -> str | None:
+        # Where other devices reach the page; the host name when bound to every interface.
+        if self._httpd is None:
+            return None
+        host, port = self.address
+        if host in ("0.0.0.0", ""):
+            try:
+                host = socket.gethostbyname(socket.gethostname())
+            except OSError:
+                host = socket.gethostname()
+        return f"http://{host}:{port}/"
+
+    @property
+    def mime(self) -> str:
+        return self._mime
+
+    def start(self):
+        # Raises OSError when the port is taken.
+        if self._httpd is not None:
+            return
+        self._closed = False
+        httpd = http.server.ThreadingHTTPServer((self._host, self._port), _Handler)
+        httpd.daemon_threads = True
+        httpd.stream = self
+        self._httpd = httpd
+        self._pool = ThreadPoolExecutor(self._encoders, thread_name_prefix="StreamEncoder")
+        self._thread = threading.Thread(target=httpd.serve_forever, name="StreamServer", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        if self._httpd is None:
+            return
+        self._closed = True
+        with self._lock:
+            channels = list(self._channels.values())
+        for channel in channels:
+            with channel.cond:
+                channel.cond.notify_all()
+        self._httpd.shutdown()
+        self._httpd.server_close()
+        self._thread.join()
+        self._pool.shutdown(wait=True)
+        self._httpd = self._thread = self._pool = None
+        with self._lock:
+            for channel in self._channels.values():
+                channel.latest = channel.image = channel.pending = None
+
+    def add_channel(self, channel_id: int):
+        with self._lock:
+            self._channels.setdefault(channel_id, _Channel())
+
+    def publish(self, channel_id: int, image: QtGui.QImage, seq: int, captured_at: float):
+        # Called for every presented frame. Capture only delivers changed frames, so each
+        # one is encoded once, and only while someone is watching the channel.
+        if self._httpd is None or image.isNull():
+            return
+        channel = self._channel(channel_id)
+        if channel is None:
+            return
+        self.published += 1
+        with channel.cond:
+            channel.image = (seq, image, captured_at)
+            if not channel.clients:
+                return
+            self._submit(channel, channel.image)
+
+    def drop_channel(self, channel_id: int):
+        with self._lock:
+            channel = self._channels.pop(channel_id, None)
+        if channel is not None:
+            with channel.cond:
+                channel.image = channel.pending = None
+                channel.dropped = True
+                channel.cond.notify_all()
+
+    def channel_ids(self) -> list[int]:
+        with self._lock:
+            return sorted(self._channels)
+
+    def stats(self) -> dict:
+        now = time.perf_counter()
+        with self._lock:
+            channels = list(self._channels.items())
+            rate = self._rate.per_second(now)
+        clients = []
+        for channel_id, channel in channels:
+            with channel.cond:
+                clients += [{"channel": channel_id, **client.stats(now)} for client in channel.clients]
+        return {
+            "running": self.running,
+            "published": self.published,
+            "encoded": self.encoded,
+            "superseded": self.superseded,
+            "encode_p50_ms": self.encode_ms.percentile(50),
+            "encode_max_ms": self.encode_ms.max(),
+            "bytes_per_s": rate,
+            "clients": clients,
+        }
+
+    def _channel(self, channel_id: int) -> _Channel | None:
+        with self._lock:
+            return self._channels.get(channel_id)
+
+    def _submit(self, channel: _Channel, item):
+        # Holds channel.cond.
+        if channel.latest is not None and channel.latest.seq >= item[0]:
+            return
+        if channel.in_flight >= self._encoders:
+            if channel.pending is not None:
+                self.superseded += 1
+            channel.pending = item
+            return
+        channel.in_flight += 1
+        try:
+            self._pool.submit(self._encode, channel, item)
+        except RuntimeError:
+            # Pool shut down by stop().
+            channel.in_flight -= 1
+
+    def _encode(self, channel: _Channel, item):
+        seq, image, captured_at = item
+        payload = None
+        try:
+            t0 = time.perf_counter()
+            data = QtCore.QByteArray()
+            buffer = QtCore.QBuffer(data)
+            buffer.open(QtCore.QIODevice.OpenModeFlag.WriteOnly)
+            image.save(buffer, self._format, self._quality)
+            buffer.close()
+            payload = bytes(data)
+            with self._lock:
+                self.encode_ms.add((time.perf_counter() - t0) * 1000.0)
+                self.encoded += 1
+        finally:
+            # Even when encoding failed: a leaked slot would stall the channel for good.
+            with channel.cond:
+                channel.in_flight -= 1
+                # Encoders may finish out of order; an older frame never replaces a newer one.
+                if payload is not None and (channel.latest is None or seq > channel.latest.seq):
+                    channel.latest = EncodedFrame(seq, payload, captured_at)
+                    channel.cond.notify_all()
+                pending, channel.pending = channel.pending, None
+                if pending is not None and not self._closed:
+                    self._submit(channel, pending)
+
+    def _attach(self, channel_id: int, client: _Client) -> _Channel | None:
+        # None for a channel no preview registered.
+        channel = self._channel(channel_id)
+        if channel is None:
+            return None
+        with channel.cond:
+            channel.clients.append(client)
+            # A new viewer of an idle channel gets the current picture right away.
+            if channel.image is not None:
+                self._submit(channel, channel.image)
+        return channel
+
+    def _detach(self, channel: _Channel, client: _Client):
+        with channel.cond:
+            if client in channel.clients:
+                channel.clients.remove(client)
+
+    def _serving(self, channel: _Channel) -> bool:
+        return not self._closed and not channel.dropped
+
+    def _next_frame(self, channel: _Channel, client: _Client, timeout: float) -> EncodedFrame | None:
+        # The newest frame the client has not had yet, whatever it missed in between.
+        with channel.cond:
+            channel.cond.wait_for(
+                lambda: not self._serving(channel) or (channel.latest is not None and channel.latest.seq > client.seq),
+                timeout,
+            )
+            latest = channel.latest
+        if not self._serving(channel) or latest is None or latest.seq <= client.seq:
+            return None
+        return latest
+
+    def _allowed_host(self, host: str | None) -> bool:
+        # `Host` as sent by a client that really meant this server: an IP address,
+        # localhost or this machine's name, on our port if one is given.
+        if not host:
+            return False
+        try:
+            parsed = urlsplit(f"//{host}")
+            name, port = parsed.hostname, parsed.port
+        except ValueError:
+            return False
+        if not name or (port is not None and self.address is not None and port != self.address[1]):
+            return False
+        try:
+            ipaddress.ip_address(name)
+            return True
+        except ValueError:
+            pass
+        return name in ("localhost", socket.gethostname().lower(), socket.getfqdn().lower())
+
+    def _sent(self, client: _Client, frame: EncodedFrame, nbytes: int):
+        now = time.perf_counter()
+        client.sent(frame, nbytes, now)
+        with self._lock:
+            self._rate.add(nbytes, now)
+
+
+class _Handler(http.server.BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        stream = self.server.stream
+        if not stream._allowed_host(self.headers.get("Host")):
+            self._send_body(403, "text/plain", b"Unexpected Host")
+            return
+        parts = self.path.split("?")[0].strip("/").split("/")
+        if parts == [""]:
+            self._send_body(200, "text/html; charset=utf-8", _index_page(stream.channel_ids()).encode())
+        elif parts == ["stats.json"]:
+            self._send_body(200, "application/json", json.dumps(stream.stats()).encode())
+        elif len(parts) == 2 and parts[0] in ("mjpeg", "ws") and parts[1].isdigit():
+            self.connection.settimeout(_SEND_TIMEOUT_S)
+            self.connection.setsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF, _SEND_BUFFER)
+            if parts[0] == "mjpeg":
+                self._serve_mjpeg(stream, int(parts[1]))
+            else:
+                self._serve_websocket(stream, int(parts[1]))
+        else:
+            self._send_body(404, "text/plain", b"Not found")
+
+    def _send_body(self, code: int, content_type: str, body: bytes):
+        self.send_response(code)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("Cache-Control", "no-store")
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _serve_mjpeg(self, stream: StreamServer, channel_id: int):
+        client = _Client("mjpeg", self.client_address[0])
+        channel = stream._attach(channel_id, client)
+        if channel is None:
+            self._send_body(404, "text/plain", b"No such region")
+            return
+        self.close_connection = True
+        head = f"Content-Type: {stream.mime}\r\nContent-Length: %d\r\nX-Frame: %d\r\n\r\n".encode()
+        try:
+            self.send_response(200)
+            self.send_header("Content-Type", f"multipart/x-mixed-replace; boundary={_BOUNDARY.decode()}")
+            self.send_header("Cache-Control", "no-store")
+            self.send_header("Connection", "close")
+            self.end_headers()
+            while stream._serving(channel):
+                frame = stream._next_frame(channel, client, 1.0)
+                if frame is None:
+                    continue
+                part = b"--" + _BOUNDARY + b"\r\n" + head % (len(frame.payload), frame.seq)
+                self.wfile.write(part)
+                self.wfile.write(frame.payload)
+                self.wfile.write(b"\r\n")
+                stream._sent(client, frame, len(part) + len(frame.payload) + 2)
+        except OSError:
+            pass
+        finally:
+            stream._detach(channel, client)
+
+    def _serve_websocket(self, stream: StreamServer, channel_id: int):
+        key = self.headers.get("Sec-WebSocket-Key")
+        if not key or "websocket" not in self.headers.get("Upgrade", "").lower():
+            self._send_body(400, "text/plain", b"Expected a WebSocket upgrade")
+            return
+        origin = self.headers.get("Origin")
+        if origin is not None and urlsplit(origin).netloc.lower() != self.headers.get("Host", "").lower():
+            # A browser connecting for some other site's page. Clients outside a browser
+            # send no Origin.
+            self._send_body(403, "text/plain", b"Cross-origin WebSocket refused")
+            return
+        client = _Client("websocket", self.client_address[0])
+        channel = stream._attach(channel_id, client)
+        if channel is None:
+            self._send_body(404, "text/plain", b"No such region")
+            return
+        accept = base64.b64encode(hashlib.sha1(key.encode() + _WS_GUID).digest()).decode()
+        self.close_connection = True
+        try:
+            self.send_response(101, "Switching Protocols")
+            self.send_header("Upgrade", "websocket")
+            self.send_header("Connection", "Upgrade")
+            self.send_header("Sec-WebSocket-Accept", accept)
+            self.end_headers()
+            while stream._serving(channel) and not self._peer_closed():
+                frame = stream._next_frame(channel, client, 0.25)
+                if frame is None:
+                    continue
+                header = _ws_header(len(frame.payload))
+                self.wfile.write(header)
+                self.wfile.write(frame.payload)
+                stream._sent(client, frame, len(header) + len(frame.payload))
+            self.wfile.write(b"\x88\x00")
+        except OSError:
+            pass
+        finally:
+            stream._detach(channel, client)
+
+    def _peer_closed(self) -> bool:
+        # Reads whatever the client sent; anything but a close frame is ignored.
+        while select.select([self.connection], [], [], 0)[0]:
+            head = self.rfile.read(2)
+            if len(head) < 2:
+                return True
+            opcode, length = head[0] & 0x0F, head[1] & 0x7F
+            if length == 126:
+                (length,) = struct.unpack(">H", self.rfile.read(2))
+            elif length == 127:
+                (length,) = struct.unpack(">Q", self.rfile.read(8))
+            self.rfile.read((4 if head[1] & 0x80 else 0) + length)
+            if opcode == 0x8:
+                return True
+        return False
+
+
+def _ws_header(length: int) -> bytes:
+    # Final binary frame, unmasked (server to client).
+    if length < 126:
+        return struct.pack(">BB", 0x82, length)
+    if length < 1 << 16:
+        return struct.pack(">BBH", 0x82, 126, length)
+    return struct.pack(">BBQ", 0x82, 127, length)
+
+
+def _index_page(channel_ids: list[int]) -> str:
+    images = "".join(f'<img src="/mjpeg/{i}" alt="Region {i}">' for i in channel_ids) or "<p>No regions yet.</p>"
+    return (
+        "<!doctype html><title>LoL-Map_Tool</title>"
+        "<style>body{margin:0;background:#111;display:flex;flex-wrap:wrap;gap:8px;justify-content:center}"
+        "img{max-width:100vw;max-height:100vh;image-rendering:pixelated}p{color:#9AA4B2}</style>" + images
+    )
@@ -16,10 +16,22 @@ class Style:
         background: #1C1F26;
         border-bottom: 1px solid #2C313B;
     }
-    QLabel#Preview {
+    QWidget#Preview {
         background: #0F1115;
         border: 1px solid #2C313B;
     }
+    QWidget#ScrubBar {
+        background: #1C1F26;
+        border-top: 1px solid #2C313B;
+    }
+    QLabel#PerfHud {
+        background: rgba(15, 17, 21, 200);
+        color: #5ED5FF;
+        font-family: "Consolas";
+        font-size: 8pt;
+        padding: 4px 6px;
+        border-radius: 4px;
+    }
     QToolButton {
         background: #232833;
         border: 1px solid #2C313B;
@@ -32,13 +44,13 @@ class Style:
     QToolButton:pressed {
         background: #313849;
     }
-    QPushButton#CancelButton {
+    QPushButton#CancelButton, QPushButton#DetectButton {
         background: #2B3140;
         border: 1px solid #2C313B;
         padding: 4px 10px;
         border-radius: 4px;
     }
-    QPushButton#CancelButton:hover {
+    QPushButton#CancelButton:hover, QPushButton#DetectButton:hover {
         background: #343B4D;
     }
     QSlider::groove:horizontal {
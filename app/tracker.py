@@ -0,0 +1,384 @@
+import time
+import traceback
+import numpy as np
+from PyQt6 import QtCore, QtGui
+from . import frames
+from .minimap import find_minimap
+from .perf import PERF
+from .stats import RollingStats
+
+# Border signature: per side, the mean luma of a strip just inside the minimap edge, in
+# _DEPTH bands from the edge inwards and _SEGMENTS pieces along it. The frame is static
+# art while the map inside it changes.
+_SEGMENTS = 8
+_DEPTH = 4
+_SIGNATURE_TOLERANCE = 14.0  # mean absolute luma difference, 0-255
+_MIN_CORRELATION = 0.7  # the frame's light/dark pattern has to be there, not just its mean
+# A square found elsewhere is only taken for the minimap if its border looks like the
+# locked one, within this looser tolerance (scaling blurs it a little).
+_RELOCATE_TOLERANCE = 2 * _SIGNATURE_TOLERANCE
+_FIT_PX = 2
+# Locking needs a clear frame that (nearly) coincides with the selection, so tracking
+# never starts on an arbitrary square next to, say, an objective timer.
+_LOCK_SCORE = 24.0
+_LOCK_OVERLAP = 0.8
+# The local re-search looks this many minimap sides around the old position and accepts
+# this range of new sizes (HUD / minimap scale changes).
+_SEARCH_MARGIN = 1.0
+_SIZE_RANGE = (0.5, 2.0)
+_LOCK_ATTEMPTS = 3
+_MAX_BACKOFF = 8
+_MAX_MISSES = 10  # failed searches in a row before tracking gives up (about 30 s)
+
+
+class ScreenSource:
+    # Where the tracker looks: the real screens, grabbed on the tracker thread like the
+    # capture worker grabs on its own. Rects are global logical coordinates; grabs come
+    # back in device pixels.
+
+    def screen_rect(self, point: QtCore.QPoint) -> QtCore.QRect | None:
+        screen = QtGui.QGuiApplication.screenAt(point)
+        return screen.geometry() if screen is not None else None
+
+    def grab(self, rect: QtCore.QRect) -> QtGui.QImage:
+        screen = QtGui.QGuiApplication.screenAt(rect.center())
+        if screen is None:
+            return QtGui.QImage()
+        local = rect.translated(-screen.geometry().topLeft())
+        return screen.grabWindow(0, local.x(), local.y(), local.width(), local.height()).toImage()
+
+
+def _to_image(area: QtCore.QRect, image: QtGui.QImage, rect: QtCore.QRect) -> QtCore.QRect:
+    # Global logical `rect` in the pixels of `image`, which shows `area`.
+    ratio = image.width() / max(1, area.width())
+    return QtCore.QRect(
+        round((rect.x() - area.x()) * ratio),
+        round((rect.y() - area.y()) * ratio),
+        round(rect.width() * ratio),
+        round(rect.height() * ratio),
+    )
+
+
+def _to_global(area: QtCore.QRect, image: QtGui.QImage, rect: QtCore.QRect) -> QtCore.QRect:
+    ratio = image.width() / max(1, area.width())
+    return QtCore.QRect(
+        area.x() + round(rect.x() / ratio),
+        area.y() + round(rect.y() / ratio),
+        round(rect.width() / ratio),
+        round(rect.height() / ratio),
+    )
+
+
+def signature(image: QtGui.QImage, rect: QtCore.QRect) -> np.ndarray | None:
+    # (4, _DEPTH, _SEGMENTS) mean lumas of the strips just inside `rect` (image pixels).
+    image = frames.normalize(image)
+    if image.isNull() or not image.rect().contains(rect) or rect.width() < 4 * _SEGMENTS:
+        return None
+    view = frames.frame_view(image)
+    x, y, s = rect.x(), rect.y(), rect.width()
+    d = max(_DEPTH, s // 50)
+    box = view[y : y + s, x : x + s]
+    # Each strip as (depth from the edge, position along it, channel).
+    strips = (
+        box[:d],
+        box[-d:][::-1],
+        box[:, :d].swapaxes(0, 1),
+        box[:, -d:][:, ::-1].swapaxes(0, 1),
+    )
+    depth = np.linspace(0, d, _DEPTH + 1).astype(int)
+    along = np.linspace(0, s, _SEGMENTS + 1).astype(int)
+    counts = np.outer(np.diff(depth), np.diff(along)) * 4.0
+    out = np.empty((4, _DEPTH, _SEGMENTS), np.float32)
+    for i, strip in enumerate(strips):
+        luma = strip[..., frames.G].astype(np.float32) * 2.0
+        luma += strip[..., frames.R]
+        luma += strip[..., frames.B]
+        out[i] = np.add.reduceat(np.add.reduceat(luma, depth[:-1], axis=0), along[:-1], axis=1) / counts
+    return out
+
+
+class MinimapTracker:
+    # Keeps a preview's rect on the minimap when the game window moves, switches between
+    # windowed and borderless, or changes resolution or HUD scale. Every `interval_s` the
+    # newest presented frame is checked against a border signature of the minimap (a few
+    # slices and means); only on a mismatch is the area around the old position searched,
+    # then the whole screen. After `max_misses` failed searches in a row it stops until
+    # reset(). Synchronous; previews run it through TrackerThread.
+
+    def __init__(self, interval_s: float = 0.5, source: ScreenSource | None = None, max_misses: int = _MAX_MISSES):
+        self._interval = interval_s
+        self._source = source or ScreenSource()
+        self._max_misses = max_misses
+        self._misses = 0
+        self._minimap = None  # global logical rect of the minimap itself
+        self._signature = None
+        self._next_check = 0.0
+        self._backoff = 1
+        self._lock_attempts = 0
+        self.state = "idle"  # idle | locked | lost | stopped | no_minimap
+        self.frames = 0
+        self.checks = 0
+        self.mismatches = 0
+        self.relocations = 0
+        self.total_ms = 0.0
+        self.check_ms = RollingStats()
+        self.search_ms = RollingStats()
+
+    def reset(self):
+        # A new selection: lock on again from scratch.
+        self._minimap = None
+        self._signature = None
+        self._next_check = 0.0
+        self._backoff = 1
+        self._lock_attempts = 0
+        self._misses = 0
+        self.state = "idle"
+
+    def due(self, now: float) -> bool:
+        # Whether check() at `now` would look at the frame at all.
+        return now >= self._next_check and self.state not in ("no_minimap", "stopped")
+
+    def check(self, image: QtGui.QImage, rect: QtCore.QRect, now: float) -> QtCore.QRect | None:
+        # Called for every presented frame of `rect`; returns the rect to capture instead
+        # when the minimap has moved.
+        self.frames += 1
+        if not self.due(now):
+            return None
+        t0 = time.perf_counter()
+        moved = None
+        if self._minimap is None:
+            self._lock(rect)
+        else:
+            self.checks += 1
+            current = self._current_signature(image, rect)
+            self.check_ms.add((time.perf_counter() - t0) * 1000.0)
+            if current is None or not self._matches(current):
+                self.mismatches += 1
+                moved = self._relocate(rect)
+            else:
+                self.state = "locked"
+                self._backoff = 1
+        self._next_check = now + self._interval * self._backoff
+        self.total_ms += (time.perf_counter() - t0) * 1000.0
+        return moved
+
+    def stats(self) -> dict:
+        return {
+            "state": self.state,
+            "frames": self.frames,
+            "checks": self.checks,
+            "mismatches": self.mismatches,
+            "relocations": self.relocations,
+            "ms_per_frame": self.total_ms / self.frames if self.frames else 0.0,
+            "check_p50_ms": self.check_ms.percentile(50),
+            "search_p50_ms": self.search_ms.percentile(50),
+            "search_max_ms": self.search_ms.max(),
+        }
+
+    def _current_signature(self, image: QtGui.QImage, rect: QtCore.QRect) -> np.ndarray | None:
+        # Straight from the presented frame when it shows the whole minimap; a selection
+        # cropping into the minimap needs a small grab of its own.
+        if rect.contains(self._minimap):
+            return signature(image, _to_image(rect, image, self._minimap))
+        grab = self._source.grab(self._minimap)
+        return signature(grab, grab.rect()) if not grab.isNull() else None
+
+    def _matches(self, current: np.ndarray, tolerance: float = _SIGNATURE_TOLERANCE) -> bool:
+        if float(np.abs(current - self._signature).mean()) > tolerance:
+            return False
+        a = current - current.mean()
+        b = self._signature - self._signature.mean()
+        norm = float(np.sqrt((a * a).sum() * (b * b).sum()))
+        # A flat border (loading screen, desktop) correlates with nothing.
+        return norm > 1e-6 and float((a * b).sum()) / norm >= _MIN_CORRELATION
+
+    def _lock(self, rect: QtCore.QRect):
+        # Finds the minimap in and around the user's rect; the grab reaches past it so the
+        # rect's own boundary is never mistaken for the minimap frame.
+        self._lock_attempts += 1
+        side = min(rect.width(), rect.height())
+        found = self._search(rect, max(16, side // 4), (side * 0.5, side * 1.5), _LOCK_SCORE)
+        if found is not None:
+            common = found[0].intersected(rect)
+            smaller = min(found[0].width() * found[0].height(), rect.width() * rect.height())
+            if common.width() * common.height() < _LOCK_OVERLAP * smaller:
+                found = None
+        if found is not None:
+            self._minimap, self._signature = found
+            self.state = "locked"
+            self._backoff = 1
+        elif self._lock_attempts >= _LOCK_ATTEMPTS:
+            # Not a minimap selection (e.g. an objective timer): stop looking.
+            self.state = "no_minimap"
+
+    def _best_fit(self, image: QtGui.QImage, rect: QtCore.QRect) -> tuple[QtCore.QRect, np.ndarray | None]:
+        # The search and the locked signature may each sit a pixel or two inside or
+        # outside a given edge; move every side (top, bottom, left, right) on its own to
+        # where its strip matches best.
+        shifts = [0, 0, 0, 0]
+        best = [float("inf")] * 4
+        for k in range(-_FIT_PX, _FIT_PX + 1):
+            sig = signature(image, rect.adjusted(-k, -k, k, k))
+            if sig is None:
+                continue
+            for side in range(4):
+                diff = float(np.abs(sig[side] - self._signature[side]).mean())
+                if diff < best[side]:
+                    best[side], shifts[side] = diff, k
+        top, bottom, left, right = shifts
+        fitted = rect.adjusted(-left, -top, right, bottom)
+        if fitted.width() != fitted.height():
+            # Keep it square: the larger side wins, which is what find_minimap() prefers too.
+            side = max(fitted.width(), fitted.height())
+            fitted.setSize(QtCore.QSize(side, side))
+        return fitted, signature(image, fitted)
+
+    def _relocate(self, rect: QtCore.QRect) -> QtCore.QRect | None:
+        old = self._minimap
+        side = old.width()
+        lo, hi = side * _SIZE_RANGE[0], side * _SIZE_RANGE[1]
+        found = self._search(old, side * (_SEARCH_MARGIN + 0.5 * (_SIZE_RANGE[1] - 1)), (lo, hi), verify=True)
+        if found is None:
+            found = self._search(old, None, None, verify=True)
+        if found is None:
+            # Loading screen, alt-tab, game closed...: keep the rect and look again less
+            # often, and no longer at all once the game looks gone for good.
+            self._misses += 1
+            self.state = "stopped" if self._misses >= self._max_misses else "lost"
+            self._backoff = min(_MAX_BACKOFF, self._backoff * 2)
+            return None
+        new, self._signature = found
+        self._minimap = new
+        self.state = "locked"
+        self._backoff = 1
+        self._misses = 0
+        if new == old:
+            return None
+        self.relocations += 1
+        # Keep the user's framing relative to the minimap, scaled with it.
+        k = new.width() / old.width()
+        return QtCore.QRect(
+            new.x() + round((rect.x() - old.x()) * k),
+            new.y() + round((rect.y() - old.y()) * k),
+            round(rect.width() * k),
+            round(rect.height() * k),
+        )
+
+    def _search(
+        self, around: QtCore.QRect, margin: float | None, sides, min_score: float = 12.0, verify: bool = False
+    ) -> tuple[QtCore.QRect, np.ndarray] | None:
+        # Searches `around` grown by `margin` (logical px), or its whole screen when
+        # `margin` is None, for a minimap with a side in `sides` (logical px). With
+        # `verify`, the square must also carry the locked border signature.
+        t0 = time.perf_counter()
+        try:
+            screen = self._source.screen_rect(around.center())
+            if screen is None:
+                return None
+            if margin is None:
+                area = QtCore.QRect(screen)
+            else:
+                m = int(margin)
+                area = around.adjusted(-m, -m, m, m).intersected(screen)
+            image = frames.normalize(self._source.grab(area))
+            if image.isNull():
+                return None
+            ratio = image.width() / max(1, area.width())
+            device_sides = None if sides is None else (int(sides[0] * ratio), int(sides[1] * ratio) + 1)
+            edges = (
+                area.top() == screen.top(),
+                area.bottom() == screen.bottom(),
+                area.left() == screen.left(),
+                area.right() == screen.right(),
+            )
+            match = find_minimap(image, min_score, device_sides, edges)
+            if match is None:
+                return None
+            rect, sig = match.rect, signature(image, match.rect)
+            if verify:
+                rect, sig = self._best_fit(image, match.rect)
+                if sig is None or not self._matches(sig, _RELOCATE_TOLERANCE):
+                    return None
+            if sig is None:
+                return None
+            return _to_global(area, image, rect), sig
+        finally:
+            self.search_ms.add((time.perf_counter() - t0) * 1000.0)
+
+
+class _TrackerWorker(QtCore.QObject):
+    checked = QtCore.pyqtSignal(int, QtCore.QRect)  # generation, new rect (null: stay)
+
+    def __init__(self, tracker: MinimapTracker):
+        super().__init__()
+        self._tracker = tracker
+
+    @QtCore.pyqtSlot()
+    def reset(self):
+        self._tracker.reset()
+
+    @QtCore.pyqtSlot(int, QtGui.QImage, QtCore.QRect, float)
+    def check(self, generation: int, image: QtGui.QImage, rect: QtCore.QRect, now: float):
+        t0 = PERF.begin()
+        try:
+            moved = self._tracker.check(image, rect, now)
+        except Exception:
+            # A slot must not raise (PyQt aborts); the next due frame tries again.
+            traceback.print_exc()
+            moved = None
+        PERF.end("track", t0)
+        self.checked.emit(generation, moved if moved is not None else QtCore.QRect())
+
+
+class TrackerThread(QtCore.QObject):
+    # Runs a MinimapTracker off the GUI thread: submit() hands over a presented frame
+    # only when a check is due and none is in flight, so the GUI thread pays a flag test
+    # per frame and a search (a screen grab plus find_minimap()) never blocks it. Moves
+    # come back through `moved`; those computed before a reset() are dropped.
+    moved = QtCore.pyqtSignal(QtCore.QRect)
+    _check_requested = QtCore.pyqtSignal(int, QtGui.QImage, QtCore.QRect, float)
+    _reset_requested = QtCore.pyqtSignal()
+
+    def __init__(self, tracker: MinimapTracker, parent=None):
+        super().__init__(parent)
+        self._tracker = tracker
+        self._generation = 0
+        self._in_flight = False
+        self.frames = 0
+        self._thread = QtCore.QThread(self)
+        self._thread.setObjectName("TrackerThread")
+        self._worker = _TrackerWorker(tracker)
+        self._worker.moveToThread(self._thread)
+        self._thread.finished.connect(self._worker.deleteLater)
+        self._check_requested.connect(self._worker.check)
+        self._reset_requested.connect(self._worker.reset)
+        self._worker.checked.connect(self._on_checked)
+        self._thread.start()
+
+    def reset(self):
+        self._generation += 1
+        self._reset_requested.emit()
+
+    def submit(self, image: QtGui.QImage, rect: QtCore.QRect, now: float):
+        self.frames += 1
+        if self._in_flight or not self._tracker.due(now):
+            return
+        self._in_flight = True
+        self._check_requested.emit(self._generation, image, QtCore.QRect(rect), now)
+
+    def _on_checked(self, generation: int, rect: QtCore.QRect):
+        self._in_flight = False
+        if generation == self._generation and not rect.isNull():
+            self.moved.emit(rect)
+
+    def stats(self) -> dict:
+        # The tracker's own counters, with its thread's time spread over every presented
+        # frame rather than only the ones it was handed.
+        stats = self._tracker.stats()
+        stats["frames"] = self.frames
+        stats["ms_per_frame"] = self._tracker.total_ms / self.frames if self.frames else 0.0
+        return stats
+
+    def shutdown(self):
+        self._thread.quit()
+        self._thread.wait()
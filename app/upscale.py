@@ -0,0 +1,204 @@
+import functools
+import time
+from collections import OrderedDict
+import numpy as np
+from PyQt6 import QtCore, QtGui
+from . import frames
+from .buffers import FramePool
+from .stats import RollingStats
+
+# Engine modes. NEAREST replicates pixels, SHARP does the same after a 3x3 sharpening pass
+# on the (small) source, FRACTIONAL is "sharp bilinear": nearest inside each source pixel
+# and a linear blend only across the seams, so icons stay crisp at non-integer zoom.
+NEAREST = "nearest"
+SHARP = "sharp"
+FRACTIONAL = "fractional"
+
+# Zoom within this distance of a whole number is treated as integer zoom.
+_INTEGER_SNAP = 0.02
+
+# Unsharp-style kernel: 2x the pixel minus a quarter of each 4-neighbour; the weights sum
+# to 1 so flat areas are unchanged. Applied in int16 as (8 * centre - neighbours) / 4.
+_SHARPEN_NEIGHBOURS = ((-1, 0), (1, 0), (0, -1), (0, 1))
+_WEIGHT_ONE = 256  # fixed-point blend weights
+
+
+def mode_for(scale: float, sharpen: bool) -> str | None:
+    # Engine mode for a device-pixel scale factor; None leaves downscaling to the painter.
+    if scale < 1.0 + _INTEGER_SNAP:
+        return None
+    if abs(scale - round(scale)) <= _INTEGER_SNAP:
+        return SHARP if sharpen else NEAREST
+    return FRACTIONAL
+
+
+@functools.lru_cache(maxsize=32)
+def _axis_map(src: int, dst: int, blend: bool) -> tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    # For one axis: the nearest source index per target pixel, and for the target pixels
+    # that straddle a seam (blend only) the two source indices and the weight of the
+    # second. Built once per (source, target) size; frames only gather with them.
+    centres = (np.arange(dst, dtype=np.float64) + 0.5) * src / dst - 0.5
+    nearest = np.clip(np.floor(centres + 0.5), 0, src - 1).astype(np.intp)
+    empty = np.empty(0, np.intp)
+    if not blend:
+        return nearest, empty, empty, empty, np.empty(0, np.uint32)
+    lo = np.floor(centres)
+    frac = centres - lo
+    # Sharp bilinear: steepen the ramp by the zoom so it only spans one target pixel.
+    k = dst / src
+    w = np.clip((frac - 0.5) * k + 0.5, 0.0, 1.0)
+    weights = np.round(w * _WEIGHT_ONE).astype(np.uint32)
+    seams = np.nonzero((weights > 0) & (weights < _WEIGHT_ONE))[0]
+    i0 = np.clip(lo, 0, src - 1).astype(np.intp)
+    i1 = np.clip(lo + 1, 0, src - 1).astype(np.intp)
+    return nearest, seams, i0[seams], i1[seams], weights[seams]
+
+
+def _sharpen(src: np.ndarray, out: np.ndarray) -> np.ndarray:
+    # src, out: (h, w, 4) uint8, out contiguous. Border pixels are left as they are.
+    np.copyto(out, src)
+    h, w = src.shape[:2]
+    if h < 3 or w < 3:
+        return out
+    # All four channels as contiguous rows of bytes; alpha is put back afterwards.
+    rows = src.reshape(h, w * 4)
+    acc = rows[1:-1, 4:-4].astype(np.int16)
+    acc <<= 3
+    for dy, dx in _SHARPEN_NEIGHBOURS:
+        acc -= rows[1 + dy : h - 1 + dy, 4 + 4 * dx : (w - 1 + dx) * 4]
+    acc >>= 2
+    np.clip(acc, 0, 255, out=acc)
+    out.reshape(h, w * 4)[1:-1, 4:-4] = acc
+    out[1:-1, 1:-1, frames.A] = src[1:-1, 1:-1, frames.A]
+    return out
+
+
+_LANES = np.uint32(0x00FF00FF)
+
+
+def _blend(a: np.ndarray, b: np.ndarray, w: np.ndarray, even: np.ndarray, scratch: np.ndarray) -> np.ndarray:
+    # a, b: uint32 pixels; w: uint32 weights of b (0-256), shaped to broadcast. Two
+    # channels are blended per multiply, each in its own 16-bit lane of the word. Works
+    # in place: the result lands in `a`, `b`, `even` and `scratch` are clobbered.
+    inv = _WEIGHT_ONE - w
+    np.bitwise_and(a, _LANES, out=even)
+    even *= inv
+    np.bitwise_and(b, _LANES, out=scratch)
+    scratch *= w
+    even += scratch
+    even >>= 8
+    even &= _LANES
+    a >>= 8
+    a &= _LANES
+    a *= inv
+    b >>= 8
+    b &= _LANES
+    b *= w
+    a += b
+    a &= ~_LANES
+    a |= even
+    return a
+
+
+class Upscaler:
+    # NumPy upscaler for minimap pixel art. Index maps are cached per (source size, target
+    # size), so a frame costs two pixel gathers (as 32-bit words) plus, for FRACTIONAL,
+    # a small blend over the seam rows and columns. Output images and scratch arrays
+    # come from a FramePool: fresh multi-megabyte arrays every frame cost more in page
+    # faults than the gathers themselves. The last few outputs are kept in a small LRU
+    # keyed by (frame, target size, viewport, mode), so showing the same frame again
+    # (a pan back, a zoom back, a resize to the same size) costs nothing.
+
+    def __init__(self, cache_size: int = 4):
+        self.frames = 0
+        self.modes = {NEAREST: 0, SHARP: 0, FRACTIONAL: 0}
+        self.upscale_ms = RollingStats()
+        self.cache_hits = 0
+        self._cache = OrderedDict()
+        self._cache_size = cache_size
+        # Outputs take turns: the canvas still shows one while the next is written, and
+        # the cache holds the ones before it, so a buffer comes round only once evicted.
+        self.pool = FramePool(depth=2 + cache_size)
+
+    def upscale(
+        self, image: QtGui.QImage, scale: float, sharpen: bool = False, region: QtCore.QRect | None = None
+    ) -> QtGui.QImage | None:
+        # Returns `image` scaled by `scale` (frame pixels to target pixels), tagged with a
+        # device pixel ratio so its logical size stays that of the source; None when the
+        # mode leaves it to the painter. With `region` (image pixels) only that part is
+        # resampled, e.g. what is visible of a zoomed frame.
+        mode = mode_for(scale, sharpen)
+        image = frames.normalize(image)
+        if mode is None or image.isNull():
+            return None
+        key = (image.cacheKey(), scale, None if region is None else region.getRect(), mode)
+        cached = self._cache.get(key)
+        if cached is not None:
+            self._cache.move_to_end(key)
+            self.cache_hits += 1
+            return cached
+        t0 = time.perf_counter()
+        src = frames.frame_view(image)
+        if mode == SHARP:
+            # The whole source, so crop edges see their real neighbours; it is frame sized.
+            src = _sharpen(src, self.pool.array("sharpened", src.shape, np.uint8))
+        if region is not None:
+            region = region.intersected(image.rect())
+            if region.isEmpty():
+                return None
+            src = src[region.top() : region.bottom() + 1, region.left() : region.right() + 1]
+        sh, sw = src.shape[:2]
+        dw, dh = max(1, round(sw * scale)), max(1, round(sh * scale))
+        # A new zoom or region size releases the outputs of the old one.
+        self.pool.retain({(dw, dh)})
+        result, view = self.pool.image(dw, dh)
+        self._resample(src, view.view(np.uint32).reshape(dh, dw), mode == FRACTIONAL)
+        result.setDevicePixelRatio(image.devicePixelRatio() * dw / sw)
+        if self._cache_size:
+            self._cache[key] = result
+            while len(self._cache) > self._cache_size:
+                self._cache.popitem(last=False)
+        self.frames += 1
+        self.modes[mode] += 1
+        self.upscale_ms.add((time.perf_counter() - t0) * 1000.0)
+        return result
+
+    def clear(self):
+        # Releases every buffer, e.g. when the pixel-art qualities are switched off.
+        self._cache.clear()
+        self.pool.clear()
+
+    def stats(self) -> dict:
+        return {
+            "frames": self.frames,
+            "cache_hits": self.cache_hits,
+            **{f"{mode}_frames": count for mode, count in self.modes.items()},
+            "upscale_p50_ms": self.upscale_ms.percentile(50),
+            "cached_maps": _axis_map.cache_info().currsize,
+            **{f"pool_{key}": value for key, value in self.pool.stats().items()},
+        }
+
+    def _seam_blend(self, words: np.ndarray, i0, i1, w, axis: int, shape) -> np.ndarray:
+        # Blends words[i0] with words[i1] along `axis` into reused buffers.
+        # Scratch arrays are per axis, so neither pass reallocates the other's.
+        pool = self.pool
+        a = np.take(words, i0, axis=axis, out=pool.array(f"a{axis}", shape), mode="clip")
+        b = np.take(words, i1, axis=axis, out=pool.array(f"b{axis}", shape), mode="clip")
+        return _blend(a, b, w, pool.array(f"even{axis}", shape), pool.array(f"scratch{axis}", shape))
+
+    def _resample(self, src: np.ndarray, out: np.ndarray, blend: bool):
+        # Fills `out`, (dh, dw) uint32, with the resampled `src`.
+        sh, sw = src.shape[:2]
+        dh, dw = out.shape
+        xn, xs, x0, x1, xw = _axis_map(sw, dw, blend)
+        yn, ys, y0, y1, yw = _axis_map(sh, dh, blend)
+        # Horizontal pass on the source rows, whole pixels as uint32 words; a cropped
+        # source is gathered through its strides, not copied.
+        words = src.view(np.uint32)[..., 0]
+        rows = np.take(words, xn, axis=1, out=self.pool.array("rows", (sh, dw)), mode="clip")
+        if len(xs):
+            rows[:, xs] = self._seam_blend(words, x0, x1, xw[None, :], 1, (sh, len(xs)))
+        # Vertical pass.
+        np.take(rows, yn, axis=0, out=out, mode="clip")
+        if len(ys):
+            out[ys] = self._seam_blend(rows, y0, y1, yw[:, None], 0, (len(ys), dw))
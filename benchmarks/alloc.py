@@ -0,0 +1,139 @@
+import argparse
+import os
+import sys
+import tracemalloc
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+from PyQt6 import QtCore, QtGui, QtWidgets  # noqa: E402
+from app.canvas import PreviewCanvas  # noqa: E402
+from app.capture import CaptureManager, SyntheticBackend  # noqa: E402
+from app.history import FrameHistory  # noqa: E402
+from app.upscale import Upscaler  # noqa: E402
+
+# (name, regions, zoom); every region is 380x380 so the scenarios share one pool size.
+SCENARIOS = (
+    ("fast path", ((100, 100),), 1.0),
+    ("crop path, 2 regions", ((100, 100), (900, 300)), 1.0),
+    ("compose path", ((-190, 100),), 1.0),
+    ("pixel art 3x", ((100, 100),), 3.0),
+    ("pixel art 2.5x", ((100, 100),), 2.5),
+)
+SIDE = 380
+
+
+class Pipeline:
+    # Capture -> history -> present for N regions, the way CaptureWorker and
+    # PreviewWindow run it, on one thread. Frames are held as in the app: the newest
+    # waits in a mailbox while the one before it is on screen.
+
+    def __init__(self, regions: int, window: tuple[int, int]):
+        self.capture = CaptureManager(SyntheticBackend(icons=40, speed=7))
+        self.histories = [FrameHistory(10.0, 64 * 1024 * 1024) for _ in range(regions)]
+        self.upscalers = [Upscaler() for _ in range(regions)]
+        self.canvases = []
+        for _ in range(regions):
+            canvas = PreviewCanvas()
+            canvas.resize(*window)
+            self.canvases.append(canvas)
+        self.target = QtGui.QImage(window[0], window[1], QtGui.QImage.Format.Format_ARGB32_Premultiplied)
+        self.t = 0.0
+        self.mailbox = []
+
+    def totals(self) -> tuple[int, int]:
+        count, nbytes = self.capture.pool.totals()
+        for history, upscaler in zip(self.histories, self.upscalers):
+            count += history.allocations
+            nbytes += history.allocated_bytes
+            up = upscaler.pool.totals()
+            count += up[0]
+            nbytes += up[1]
+        return count, nbytes
+
+    def frame(self, rects: list[QtCore.QRect], zoom: float):
+        self.t += 1 / 60
+        images, self.mailbox = self.mailbox, self.capture.grab_images(rects)
+        for image, history, upscaler, canvas in zip(images, self.histories, self.upscalers, self.canvases):
+            history.push(image, self.t)
+            canvas.set_zoom(zoom)
+            region = canvas.visible_region(image)
+            shown = upscaler.upscale(image, canvas.scale_for(image.size()), False, region) if zoom > 1.0 else None
+            if shown is not None:
+                canvas.set_frame(shown, QtCore.QSizeF(image.size()), QtCore.QPointF(region.topLeft()))
+            else:
+                canvas.set_frame(image)
+            canvas.render(self.target)
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Frame buffer allocations per frame in steady state.")
+    parser.add_argument("--frames", type=int, default=240, help="Measured frames per scenario.")
+    parser.add_argument("--warmup", type=int, default=10)
+    parser.add_argument("--window", default="640x480")
+    args = parser.parse_args(argv)
+
+    app = QtWidgets.QApplication.instance() or QtWidgets.QApplication(sys.argv[:1])  # noqa: F841
+    window = tuple(int(v) for v in args.window.lower().split("x"))
+    failures = 0
+    print(f"{'scenario':<22} {'warmup allocs':>13} {'warmup KiB':>11} {'allocs/frame':>13} {'bytes/frame':>12} {'heap growth/frame':>18}")
+    for name, origins, zoom in SCENARIOS:
+        pipeline = Pipeline(len(origins), window)
+        rects = [QtCore.QRect(x, y, SIDE, SIDE) for x, y in origins]
+        start = pipeline.totals()
+        for _ in range(args.warmup):
+            pipeline.frame(rects, zoom)
+        warm = pipeline.totals()
+        # Net Python heap growth: the history's stored payloads, not frame buffers.
+        tracemalloc.start()
+        heap_before = tracemalloc.get_traced_memory()[0]
+        for _ in range(args.frames):
+            pipeline.frame(rects, zoom)
+        heap_after = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+        end = pipeline.totals()
+        per_frame = (end[0] - warm[0]) / args.frames
+        bytes_per_frame = (end[1] - warm[1]) / args.frames
+        ok = end[0] == warm[0]
+        failures += not ok
+        print(
+            f"{name:<22} {warm[0] - start[0]:>13} {(warm[1] - start[1]) / 1024:>11.0f} {per_frame:>13.2f} "
+            f"{bytes_per_frame:>12.0f} {(heap_after - heap_before) / args.frames:>18.0f}{'' if ok else '  FAIL'}"
+        )
+
+    # A frame kept by a consumer (a recorder or stream thread, say) must not be written
+    # into while later frames are captured: the pool hands out another buffer instead.
+    pipeline = Pipeline(2, window)
+    rects = [QtCore.QRect(x, y, SIDE, SIDE) for x, y in SCENARIOS[1][1]]
+    kept = pipeline.capture.grab_images(rects)
+    pixels = [image.copy() for image in kept]
+    for _ in range(args.warmup):
+        pipeline.frame(rects, 1.0)
+    intact = all(image == copy for image, copy in zip(kept, pixels))
+    failures += not intact
+    print(f"\nkept frames intact after {args.warmup} more: {intact}{'' if intact else '  FAIL'}")
+
+    # Changing zoom or region size allocates once for the new size and releases the old.
+    pipeline = Pipeline(1, window)
+    rect = QtCore.QRect(100, 100, SIDE, SIDE)
+    print("\nchange                 allocs  held KiB after")
+    for label, rect, zoom in (
+        ("start at 2x", rect, 2.0),
+        ("steady", rect, 2.0),
+        ("zoom to 3x", rect, 3.0),
+        ("steady", rect, 3.0),
+        ("region to 300x300", QtCore.QRect(100, 100, 300, 300), 3.0),
+    ):
+        before = pipeline.totals()
+        for _ in range(args.warmup):
+            pipeline.frame([rect], zoom)
+        if label.startswith("region"):
+            # What CaptureWorker does when a region is retargeted.
+            pipeline.capture.pool.retain({(rect.width(), rect.height())})
+        held = pipeline.capture.pool.held_bytes() + pipeline.upscalers[0].pool.held_bytes()
+        print(f"{label:<22} {pipeline.totals()[0] - before[0]:>6} {held / 1024:>15.0f}")
+    print(f"\n{failures} failure(s)")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
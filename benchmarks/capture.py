@@ -0,0 +1,87 @@
+import argparse
+import os
+import sys
+import time
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+from PyQt6 import QtCore, QtGui  # noqa: E402
+from app.capture import CaptureManager, QtScreenBackend, SyntheticBackend  # noqa: E402
+from app.stats import percentile  # noqa: E402
+
+# Minimap-ish regions: 1080p, 1440p and 4K HUD scale.
+DEFAULT_SIZES = ("280x280", "380x380", "560x560")
+
+
+def parse_size(text: str) -> QtCore.QSize:
+    w, h = text.lower().split("x")
+    return QtCore.QSize(int(w), int(h))
+
+
+def region_rects(origin: QtCore.QPoint, size: QtCore.QSize, count: int) -> list[QtCore.QRect]:
+    # The first region is the minimap; extras are smaller HUD-sized boxes to its right.
+    rects = [QtCore.QRect(origin, size)]
+    for i in range(1, count):
+        rects.append(QtCore.QRect(origin + QtCore.QPoint(size.width() + 40 * i, 20 * i), size / 2))
+    return rects
+
+
+def bench_rects(capture: CaptureManager, rects: list[QtCore.QRect], frames: int, warmup: int) -> dict:
+    for _ in range(warmup):
+        capture.grab_images(rects)
+    capture.counters.reset()
+    samples = []
+    start = time.perf_counter()
+    for _ in range(frames):
+        t0 = time.perf_counter()
+        capture.grab_images(rects)
+        samples.append((time.perf_counter() - t0) * 1000.0)
+    elapsed = time.perf_counter() - start
+    return {
+        "size": f"{rects[0].width()}x{rects[0].height()}",
+        "fps": frames / elapsed if elapsed else 0.0,
+        "p50_ms": percentile(samples, 50),
+        "p99_ms": percentile(samples, 99),
+        "fast": capture.counters.fast_path,
+        "crop": capture.counters.crop_path,
+        "compose": capture.counters.compose_path,
+        "grabs_per_tick": capture.counters.screen_grabs / frames,
+    }
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Headless capture throughput benchmark.")
+    parser.add_argument("--backend", choices=("synthetic", "qt"), default="synthetic")
+    parser.add_argument("--sizes", nargs="+", default=list(DEFAULT_SIZES))
+    parser.add_argument("--frames", type=int, default=200)
+    parser.add_argument("--warmup", type=int, default=10)
+    parser.add_argument(
+        "--span",
+        action="store_true",
+        help="Place rects across the seam between two screens (synthetic layout only).",
+    )
+    parser.add_argument("--regions", type=int, default=1, help="Regions captured together per tick.")
+    args = parser.parse_args(argv)
+
+    app = QtGui.QGuiApplication.instance() or QtGui.QGuiApplication(sys.argv[:1])
+    backend = SyntheticBackend() if args.backend == "synthetic" else QtScreenBackend()
+    capture = CaptureManager(backend)
+
+    print(f"backend={backend.name} platform={app.platformName()} frames={args.frames} regions={args.regions}")
+    print(f"{'size':>10} {'fps':>9} {'p50 ms':>9} {'p99 ms':>9} {'fast':>6} {'crop':>6} {'compose':>8} {'grabs/tick':>11}")
+    for text in args.sizes:
+        size = parse_size(text)
+        if args.span:
+            origin = QtCore.QPoint(-size.width() // 2, 0)
+        else:
+            origin = backend.screen_geometries()[-1].topLeft()
+        result = bench_rects(capture, region_rects(origin, size, args.regions), args.frames, args.warmup)
+        print(
+            f"{result['size']:>10} {result['fps']:>9.1f} {result['p50_ms']:>9.3f} {result['p99_ms']:>9.3f}"
+            f" {result['fast']:>6} {result['crop']:>6} {result['compose']:>8} {result['grabs_per_tick']:>11.1f}"
+        )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,129 @@
+import argparse
+import os
+import sys
+import threading
+import time
+import numpy as np
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+from PyQt6 import QtCore, QtWidgets  # noqa: E402
+from app import frames  # noqa: E402
+from app.capture import CaptureManager, SyntheticBackend  # noqa: E402
+from app.filters import FILTERS, FilterPool, FrameFilter  # noqa: E402
+from app.stats import percentile  # noqa: E402
+from benchmarks.render import time_frames  # noqa: E402
+
+
+def reference_chain(src: np.ndarray, dst: np.ndarray):
+    # The full chain with default parameters as straightforward float math, without
+    # lookup tables or pixel words: what the kernels are measured against.
+    x = src[..., :3].astype(np.float32) / 255.0
+    x = np.clip(((x**0.85) - 0.5) * 1.25 + 0.5, 0.0, 1.0) * 255.0
+    r, g, b = src[..., 2].astype(np.int16), src[..., 1].astype(np.int16), src[..., 0].astype(np.int16)
+    key = (r >= 150) & (r - np.maximum(g, b) >= 60)
+    x[key, :2] *= 0.35
+    x[key, 2] = 255.0
+    luma = x[..., 2] * 0.299 + x[..., 1] * 0.587 + x[..., 0] * 0.114
+    grey = x * 0.25 + luma[..., None] * 0.75
+    x = np.where(key[..., None], x, grey)
+    dst[..., :3] = x
+    dst[..., 3] = 255
+
+
+def pooled_apply(stage: FrameFilter):
+    # submit() and wait for the result, as PreviewWindow does across a queued signal:
+    # what a frame takes from handing it over to having it back.
+    done = threading.Event()
+
+    def apply(src: np.ndarray, dst: np.ndarray):
+        done.clear()
+        if not stage.submit(src, lambda ok: done.set()):
+            raise RuntimeError("Filter pool not ready.")
+        done.wait()
+        np.copyto(dst, stage.result())
+        stage.finish()
+
+    return apply
+
+
+def run(size: str, frame_count: int, workers: list[int]) -> dict:
+    w, h = (int(v) for v in size.lower().split("x"))
+    capture = CaptureManager(SyntheticBackend(icons=40, speed=7))
+    images = [capture.grab_image(QtCore.QRect(100, 100, w, h)).copy() for _ in range(8)]
+    views = [frames.frame_view(image) for image in images]
+    out = np.empty((h, w, 4), np.uint8)
+    turn = [0]
+
+    def timed(apply, count: int) -> list[float]:
+        def frame():
+            turn[0] += 1
+            apply(views[turn[0] % len(views)], out)
+
+        # The first frame builds the scratch arrays.
+        frame()
+        return time_frames(count, frame)
+
+    results = {}
+    for name in FILTERS:
+        stage = FrameFilter((name,))
+        results[name] = timed(stage.apply, frame_count)
+    chain = FrameFilter(tuple(FILTERS))
+    results["chain"] = timed(chain.apply, frame_count)
+    results["reference"] = timed(reference_chain, max(5, frame_count // 4))
+    expected = np.empty_like(out)
+    chain.apply(views[0], expected)
+    results["pooled"] = {}
+    for count in workers:
+        pool = FilterPool(count)
+        stage = FrameFilter(tuple(FILTERS), pool)
+        while not stage.pooled:
+            time.sleep(0.01)
+        apply = pooled_apply(stage)
+        results["pooled"][count] = timed(apply, frame_count)
+        apply(views[0], out)
+        # Bands are filtered separately; the result must not show it.
+        results.setdefault("pool_mismatch", 0)
+        results["pool_mismatch"] += int(np.count_nonzero(out != expected))
+        stage.close()
+        pool.close()
+    return results
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Frame filters: per-filter and chain cost, in-process and pooled.")
+    parser.add_argument("--sizes", nargs="+", default=["280x280", "380x380", "560x560"], help="Captured region sizes.")
+    parser.add_argument("--frames", type=int, default=60)
+    parser.add_argument("--workers", nargs="*", type=int, default=[2], help="Worker process counts to try.")
+    parser.add_argument(
+        "--budget-ms", type=float, default=11.0, help="p95 limit for the full chain: a third of a 30 FPS frame."
+    )
+    args = parser.parse_args(argv)
+
+    app = QtWidgets.QApplication.instance() or QtWidgets.QApplication(sys.argv[:1])  # noqa: F841
+    print(f"frames={args.frames} cpus={os.cpu_count()} budget={args.budget_ms:g} ms")
+    names = list(FILTERS)
+    pooled = [f"{n} workers" for n in args.workers]
+    header = f"{'region':>9} " + " ".join(f"{name:>15}" for name in names)
+    header += f" {'chain':>7} {'chain p95':>9} {'float ref':>9} " + " ".join(f"{label:>10}" for label in pooled)
+    print(header + "   (p50 ms)")
+    failures = 0
+    for size in args.sizes:
+        r = run(size, args.frames, args.workers)
+        row = f"{size:>9} " + " ".join(f"{percentile(r[name], 50):>15.3f}" for name in names)
+        chain = r["chain"]
+        row += f" {percentile(chain, 50):>7.3f} {percentile(chain, 95):>9.3f} {percentile(r['reference'], 50):>9.3f} "
+        row += " ".join(f"{percentile(r['pooled'][n], 50):>10.3f}" for n in args.workers)
+        print(row)
+        if percentile(chain, 95) > args.budget_ms:
+            print(f"FAIL: {size} chain p95 {percentile(chain, 95):.2f} ms over the {args.budget_ms:g} ms budget")
+            failures += 1
+        if r.get("pool_mismatch"):
+            print(f"FAIL: {size} pooled output differs in {r['pool_mismatch']} bytes")
+            failures += 1
+    print(f"\n{failures} failure(s)")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,143 @@
+import argparse
+import json
+import os
+import sys
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+import numpy as np  # noqa: E402
+from PyQt6 import QtCore, QtGui, QtWidgets  # noqa: E402
+from app.minimap import find_minimap  # noqa: E402
+from app.stats import percentile  # noqa: E402
+
+# Minimap side as a fraction of screen height at a few HUD/minimap scale settings.
+SCALES = (0.19, 0.26, 0.33, 0.40)
+SCREENS = {"1080p": (1920, 1080), "1440p": (2560, 1440), "4k": (3840, 2160)}
+
+
+def _noise(rng, h: int, w: int, cells: int, lo: int, hi: int) -> np.ndarray:
+    # Smooth blobs: bilinear upscale of a small random grid, plus a little grain.
+    small = rng.integers(lo, hi, size=(cells, max(2, cells * w // h), 3), dtype=np.uint8)
+    img = QtGui.QImage(small.shape[1], small.shape[0], QtGui.QImage.Format.Format_RGB888)
+    for y in range(small.shape[0]):
+        for x in range(small.shape[1]):
+            img.setPixelColor(x, y, QtGui.QColor(*(int(v) for v in small[y, x])))
+    big = img.scaled(w, h, QtCore.Qt.AspectRatioMode.IgnoreAspectRatio, QtCore.Qt.TransformationMode.SmoothTransformation)
+    big = big.convertToFormat(QtGui.QImage.Format.Format_RGB888)
+    ptr = big.constBits()
+    ptr.setsize(big.sizeInBytes())
+    arr = np.ndarray((h, w, 3), np.uint8, ptr, strides=(big.bytesPerLine(), 3, 1)).astype(np.int16)
+    arr += rng.integers(-6, 7, size=(h, w, 1), dtype=np.int16)
+    return np.clip(arr, 0, 255).astype(np.uint8)
+
+
+def make_scene(width: int, height: int, frac: float, corner: str, seed: int) -> tuple[QtGui.QImage, QtCore.QRect]:
+    # A game-like frame: textured terrain, HUD bars and small square icons (distractors),
+    # and a framed square minimap flush with a bottom corner.
+    rng = np.random.default_rng(seed)
+    rgb = _noise(rng, height, width, 12, 40, 140)
+    side = int(frac * height)
+    x = width - side if corner == "right" else 0
+    y = height - side
+    # Bottom HUD bar and ability icons.
+    bar_w = width // 3
+    rgb[height - height // 9 :, width // 2 - bar_w // 2 : width // 2 + bar_w // 2] = (20, 24, 30)
+    icon = height // 18
+    for i in range(6):
+        ix = width // 2 - bar_w // 2 + icon // 2 + i * (icon + icon // 4)
+        iy = height - height // 12
+        rgb[iy : iy + icon, ix : ix + icon] = rng.integers(60, 220, size=3)
+    # Top-right scoreboard panel.
+    rgb[: height // 30, width - width // 5 :] = (15, 15, 18)
+    # Minimap: dark terrain inside a bronze frame with a dark outline.
+    frame = max(2, side // 60)
+    outline = max(1, frame // 4)
+    minimap = rgb[y : y + side, x : x + side]
+    minimap[:] = (12, 10, 8)
+    minimap[outline:-outline, outline:-outline] = (150, 120, 70)
+    inner = side - 2 * frame
+    minimap[frame:-frame, frame:-frame] = _noise(rng, inner, inner, 6, 10, 90) // 2 + (10, 40, 20)
+    bgra = np.empty((height, width, 4), np.uint8)
+    bgra[..., 0], bgra[..., 1], bgra[..., 2], bgra[..., 3] = rgb[..., 2], rgb[..., 1], rgb[..., 0], 255
+    image = QtGui.QImage(bgra.data, width, height, width * 4, QtGui.QImage.Format.Format_RGB32).copy()
+    return image, QtCore.QRect(x, y, side, side)
+
+
+def scenes(seed: int):
+    for name, (w, h) in SCREENS.items():
+        for i, frac in enumerate(SCALES):
+            for corner in ("right", "left"):
+                image, expected = make_scene(w, h, frac, corner, seed + i)
+                yield f"{name} side={frac:.2f}h {corner}", image, expected
+
+
+def image_cases(directory: str):
+    # Real screenshots: <name>.png plus <name>.json holding {"rect": [x, y, w, h]}.
+    for entry in sorted(os.listdir(directory)):
+        if not entry.lower().endswith(".png"):
+            continue
+        image = QtGui.QImage(os.path.join(directory, entry))
+        with open(os.path.join(directory, os.path.splitext(entry)[0] + ".json")) as f:
+            expected = QtCore.QRect(*json.load(f)["rect"])
+        yield entry, image, expected
+
+
+def edge_error(found: QtCore.QRect, expected: QtCore.QRect) -> int:
+    return max(
+        abs(found.left() - expected.left()),
+        abs(found.top() - expected.top()),
+        abs(found.right() - expected.right()),
+        abs(found.bottom() - expected.bottom()),
+    )
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Minimap auto-detection: accuracy and latency budget.")
+    parser.add_argument("--images", help="Directory of screenshots (<name>.png + <name>.json with the expected rect).")
+    parser.add_argument("--budget-ms", type=float, default=100.0)
+    parser.add_argument("--tolerance-px", type=int, default=8, help="Allowed error per edge, at 4K scale.")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--save", help="Write the generated scenes (png + json) to this directory.")
+    args = parser.parse_args(argv)
+
+    QtWidgets.QApplication.instance() or QtWidgets.QApplication(sys.argv[:1])
+    cases = image_cases(args.images) if args.images else scenes(args.seed)
+    failures = 0
+    all_ms = []
+    print(f"{'case':<28} {'found':>24} {'err':>5} {'score':>6} {'p50 ms':>8} {'max ms':>8}")
+    for name, image, expected in cases:
+        if args.save:
+            os.makedirs(args.save, exist_ok=True)
+            stem = os.path.join(args.save, name.replace(" ", "_").replace("=", ""))
+            image.save(stem + ".png")
+            with open(stem + ".json", "w") as f:
+                json.dump({"rect": [expected.x(), expected.y(), expected.width(), expected.height()]}, f)
+        samples = []
+        match = None
+        for _ in range(args.repeat):
+            match = find_minimap(image)
+            samples.append(match.elapsed_ms if match else float("nan"))
+        tolerance = max(2, round(args.tolerance_px * image.height() / 2160))
+        if match is None:
+            failures += 1
+            print(f"{name:<28} {'not found':>24}  FAIL")
+            continue
+        all_ms.extend(samples)
+        r = match.rect
+        err = edge_error(r, expected)
+        ok = err <= tolerance and max(samples) <= args.budget_ms
+        failures += not ok
+        found = f"{r.x()},{r.y()} {r.width()}x{r.height()}"
+        print(
+            f"{name:<28} {found:>24} {err:>5} {match.score:>6.1f} "
+            f"{percentile(samples, 50):>8.2f} {max(samples):>8.2f}{'' if ok else '  FAIL'}"
+        )
+    if all_ms:
+        print(f"\noverall p50 {percentile(all_ms, 50):.2f} ms, p95 {percentile(all_ms, 95):.2f} ms, budget {args.budget_ms:g} ms")
+    print(f"{failures} failure(s)")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,146 @@
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+
+from PyQt6 import QtCore, QtGui, QtWidgets
+from app.config import CONFIG
+from app.overlay import SnipOverlay
+from app.stats import percentile
+from app.style import Style
+
+
+def _fake_screens(count: int, width: int, height: int) -> str:
+    # The offscreen platform reads its screen layout from a JSON file.
+    screens = [
+        {"name": f"S{i}", "x": i * width, "y": 0, "width": width, "height": height, "logicalDpi": 96, "dpr": 1}
+        for i in range(count)
+    ]
+    fd, path = tempfile.mkstemp(suffix=".json")
+    with os.fdopen(fd, "w") as f:
+        json.dump({"screens": screens}, f)
+    return path
+
+
+class TimedOverlay(SnipOverlay):
+    def __init__(self, config):
+        super().__init__(config)
+        self.paint_ms = []
+
+    def paintEvent(self, event):
+        t0 = time.perf_counter()
+        super().paintEvent(event)
+        self.paint_ms.append((time.perf_counter() - t0) * 1000.0)
+
+
+class FullRepaintOverlay(TimedOverlay):
+    # The pre-change behaviour: every mouse move invalidates the whole virtual desktop.
+    def mouseMoveEvent(self, event):
+        self.moves += 1
+        self._last_pos = event.position()
+        if self._origin is not None:
+            self._current = event.position()
+        self.update()
+
+
+def show_latency(overlay: SnipOverlay, timeout_s: float = 5.0) -> float:
+    paints = overlay.paints
+    t0 = time.perf_counter()
+    overlay.start(t0)
+    while overlay.paints == paints and time.perf_counter() - t0 < timeout_s:
+        QtWidgets.QApplication.processEvents()
+    return (time.perf_counter() - t0) * 1000.0
+
+
+def mouse(kind, pos: QtCore.QPoint, buttons) -> QtGui.QMouseEvent:
+    button = QtCore.Qt.MouseButton.LeftButton if kind != QtCore.QEvent.Type.MouseMove else QtCore.Qt.MouseButton.NoButton
+    return QtGui.QMouseEvent(
+        kind, QtCore.QPointF(pos), QtCore.QPointF(pos), button, buttons, QtCore.Qt.KeyboardModifier.NoModifier
+    )
+
+
+def drag(overlay: TimedOverlay, moves: int, rate_hz: float) -> dict:
+    # Drags a selection from the middle of the desktop at a fixed mouse report rate.
+    center = overlay.rect().center()
+    left = QtCore.Qt.MouseButton.LeftButton
+    QtWidgets.QApplication.sendEvent(overlay, mouse(QtCore.QEvent.Type.MouseButtonPress, center, left))
+    QtWidgets.QApplication.processEvents()
+    overlay.painted_px.clear()
+    overlay.paint_ms.clear()
+    period = 1.0 / rate_hz
+    start = time.perf_counter()
+    for i in range(moves):
+        pos = center + QtCore.QPoint(i * 3, i * 2)
+        QtWidgets.QApplication.sendEvent(overlay, mouse(QtCore.QEvent.Type.MouseMove, pos, left))
+        QtWidgets.QApplication.processEvents()
+        while time.perf_counter() < start + (i + 1) * period:
+            QtWidgets.QApplication.processEvents()
+    elapsed = time.perf_counter() - start
+    result = {
+        "paints": len(overlay.paint_ms),
+        "px_p50": overlay.painted_px.percentile(50),
+        "fraction": overlay.painted_px.percentile(50) / (overlay.width() * overlay.height()),
+        "paint_p50": percentile(overlay.paint_ms, 50),
+        "paint_total": sum(overlay.paint_ms),
+        # How far the drag fell behind the mouse; 0 means every move was handled in time.
+        "lag_ms": max(0.0, elapsed - moves * period) * 1000.0,
+    }
+    overlay._cancel()
+    return result
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Snip overlay: hotkey-to-visible latency and repaint area per move.")
+    parser.add_argument("--screens", type=int, default=3)
+    parser.add_argument("--screen", default="3840x2160", help="Size of each fake screen.")
+    parser.add_argument("--shows", type=int, default=10)
+    parser.add_argument("--moves", type=int, default=300)
+    parser.add_argument("--rate", type=float, default=500.0, help="Mouse report rate (Hz).")
+    args = parser.parse_args(argv)
+
+    sw, sh = (int(v) for v in args.screen.lower().split("x"))
+    config_path = _fake_screens(args.screens, sw, sh)
+    os.environ["QT_QPA_PLATFORM"] = f"offscreen:configfile={config_path}"
+    app = QtWidgets.QApplication.instance() or QtWidgets.QApplication(sys.argv[:1])
+    app.setStyleSheet(Style.BASE)
+    os.remove(config_path)
+    desktop = app.primaryScreen().virtualGeometry()
+    print(f"platform={app.platformName()} desktop={desktop.width()}x{desktop.height()} ({args.screens} screens)")
+
+    cold = TimedOverlay(CONFIG)
+    first = show_latency(cold)
+    cold._cancel()
+    warm = TimedOverlay(CONFIG)
+    warm.prewarm()
+    QtWidgets.QApplication.processEvents()
+    prewarmed = show_latency(warm)
+    warm._cancel()
+    repeat = []
+    for _ in range(args.shows):
+        repeat.append(show_latency(warm))
+        warm._cancel()
+    print(
+        f"hotkey-to-visible: cold first {first:.2f} ms, prewarmed first {prewarmed:.2f} ms, "
+        f"repeat p50 {percentile(repeat, 50):.2f} ms max {max(repeat):.2f} ms "
+        f"(desktop snapshot p50 {warm.stats()['snapshot_p50_ms']:.2f} ms)"
+    )
+
+    print(f"drag: {args.moves} moves at {args.rate:g} Hz")
+    print(
+        f"{'mode':<8} {'paints':>7} {'px/paint p50':>13} {'of desktop':>11} "
+        f"{'paint p50':>10} {'paint total':>12} {'lag':>9}"
+    )
+    for name, overlay in (("full", FullRepaintOverlay(CONFIG)), ("partial", warm)):
+        show_latency(overlay)
+        r = drag(overlay, args.moves, args.rate)
+        print(
+            f"{name:<8} {r['paints']:>7} {r['px_p50']:>13.0f} {r['fraction']:>10.2%} "
+            f"{r['paint_p50']:>7.2f} ms {r['paint_total']:>9.1f} ms {r['lag_ms']:>6.0f} ms"
+        )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,107 @@
+import argparse
+import os
+import sys
+import time
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+from PyQt6 import QtCore, QtGui, QtWidgets  # noqa: E402
+from app.canvas import PreviewCanvas, RenderQuality  # noqa: E402
+from app.capture import CaptureManager, SyntheticBackend  # noqa: E402
+from app.config import CONFIG  # noqa: E402
+from app.stats import percentile  # noqa: E402
+from app.upscale import Upscaler  # noqa: E402
+
+
+def zoom_levels(steps: int) -> list[float]:
+    lo, hi = CONFIG.zoom_min, CONFIG.zoom_max
+    return [lo + (hi - lo) * i / (steps - 1) for i in range(steps)]
+
+
+def time_frames(frames: int, fn) -> list[float]:
+    samples = []
+    for _ in range(frames):
+        t0 = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - t0) * 1000.0)
+    return samples
+
+
+def bench_label(label: QtWidgets.QLabel, target: QtGui.QImage, pix: QtGui.QPixmap, rect: QtCore.QRect, zoom: float):
+    # The pre-canvas path: a full smooth-scaled copy per frame, cropped by the QLabel.
+    def frame():
+        zoomed = QtCore.QSize(max(1, int(rect.width() * zoom)), max(1, int(rect.height() * zoom)))
+        size = label.size()
+        scaled = pix.scaled(
+            QtCore.QSize(max(zoomed.width(), size.width()), max(zoomed.height(), size.height())),
+            QtCore.Qt.AspectRatioMode.KeepAspectRatio,
+            QtCore.Qt.TransformationMode.SmoothTransformation,
+        )
+        label.setPixmap(scaled)
+        label.render(target)
+
+    return frame
+
+
+def bench_canvas(canvas: PreviewCanvas, target: QtGui.QImage, image: QtGui.QImage, zoom: float):
+    # The pixel-art qualities upscale the visible part first, as PreviewWindow._render_pixmap does.
+    # Without a cache: a live preview gets a new frame every time, so it never hits.
+    upscaler = Upscaler(cache_size=0)
+    sharpen = canvas.quality() == RenderQuality.PIXEL_SHARP
+
+    def frame():
+        canvas.set_zoom(zoom)
+        shown = image
+        if canvas.quality() in RenderQuality.UPSCALED:
+            frame_size = QtCore.QSizeF(image.size())
+            region = canvas.visible_region(image)
+            upscaled = upscaler.upscale(image, canvas.scale_for(frame_size), sharpen, region)
+            if upscaled is not None:
+                canvas.set_frame(upscaled, frame_size, QtCore.QPointF(region.topLeft()))
+                canvas.render(target)
+                return
+        canvas.set_frame(shown)
+        canvas.render(target)
+
+    return frame
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Per-frame render cost: QLabel + scaled() vs PreviewCanvas.")
+    parser.add_argument("--size", default="380x380", help="Captured region size.")
+    parser.add_argument("--window", default="640x480", help="Preview area size.")
+    parser.add_argument("--steps", type=int, default=6, help="Zoom levels between zoom_min and zoom_max.")
+    parser.add_argument("--frames", type=int, default=60)
+    args = parser.parse_args(argv)
+
+    app = QtWidgets.QApplication.instance() or QtWidgets.QApplication(sys.argv[:1])
+    w, h = (int(v) for v in args.size.lower().split("x"))
+    ww, wh = (int(v) for v in args.window.lower().split("x"))
+    rect = QtCore.QRect(0, 0, w, h)
+    image = CaptureManager(SyntheticBackend()).grab_image(rect)
+    pix = QtGui.QPixmap.fromImage(image)
+    target = QtGui.QImage(ww, wh, QtGui.QImage.Format.Format_ARGB32_Premultiplied)
+
+    label = QtWidgets.QLabel()
+    label.setAlignment(QtCore.Qt.AlignmentFlag.AlignCenter)
+    label.resize(ww, wh)
+    canvas = PreviewCanvas()
+    canvas.resize(ww, wh)
+
+    print(f"platform={app.platformName()} region={args.size} window={args.window} frames={args.frames}")
+    header = f"{'zoom':>6} {'label p50':>10}"
+    for quality in RenderQuality.ALL:
+        header += f" {quality + ' p50':>15}"
+    print(header + "   (ms)")
+    for zoom in zoom_levels(args.steps):
+        row = f"{zoom:>6.2f} {percentile(time_frames(args.frames, bench_label(label, target, pix, rect, zoom)), 50):>10.3f}"
+        for quality in RenderQuality.ALL:
+            canvas.set_quality(quality)
+            samples = time_frames(args.frames, bench_canvas(canvas, target, image, zoom))
+            row += f" {percentile(samples, 50):>15.3f}"
+        print(row)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
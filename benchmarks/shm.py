@@ -0,0 +1,143 @@
+import argparse
+import multiprocessing
+import os
+import sys
+import time
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+from app.shared_frames import SharedFrameReader, SharedFrameWriter  # noqa: E402
+from app.stats import percentile  # noqa: E402
+
+
+def reader_process(name: str, hold_s: float, ready, stop, results):
+    # Polls for new frames and touches every pixel of each (a channel mean), the way an
+    # analytics tool would, without copying. `hold_s` keeps each frame in use that long.
+    # Imports only the reader side: no Qt in this process.
+    reader = SharedFrameReader(name)
+    seen = valid = 0
+    lag_ms = []
+    # Only frames written from now on.
+    last = reader.latest().seq if reader.latest() is not None else 0
+    ready.put(True)
+    while not stop.is_set():
+        frame = reader.wait(last, 0.1)
+        if frame is None:
+            continue
+        seen += 1
+        frame.pixels[..., 2].mean()
+        if hold_s:
+            time.sleep(hold_s)
+        if frame.valid():
+            valid += 1
+            lag_ms.append((time.time() - frame.timestamp) * 1000.0)
+        last = frame.seq
+        del frame
+    reader.close()
+    results.put(
+        {
+            "seen": seen,
+            "valid": valid,
+            "torn": reader.torn,
+            "lag_p50_ms": percentile(lag_ms, 50),
+            "lag_max_ms": max(lag_ms, default=0.0),
+        }
+    )
+
+
+def write_frames(writer: SharedFrameWriter, frames: list, fps: float, seconds: float) -> list[float]:
+    samples = []
+    seq = 0
+    t0 = time.perf_counter()
+    next_frame = t0
+    while time.perf_counter() - t0 < seconds:
+        seq += 1
+        view = frames[seq % len(frames)]
+        start = time.perf_counter()
+        writer.write(view, seq, time.time())
+        samples.append((time.perf_counter() - start) * 1000.0)
+        next_frame += 1.0 / fps
+        time.sleep(max(0.0, next_frame - time.perf_counter()))
+    return samples
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Shared-memory frame export: writer cost and reader lag, torn reads.")
+    parser.add_argument("--size", default="560x560", help="Captured region size.")
+    parser.add_argument("--fps", type=float, default=60.0)
+    parser.add_argument("--seconds", type=float, default=3.0)
+    parser.add_argument("--readers", type=int, default=2, help="Fast reader processes.")
+    parser.add_argument("--hold-ms", type=float, default=100.0, help="How long the slow reader keeps each frame.")
+    parser.add_argument("--slots", type=int, default=4)
+    args = parser.parse_args(argv)
+
+    from PyQt6 import QtCore, QtWidgets
+    from app import frames as frame_views
+    from app.capture import CaptureManager, SyntheticBackend
+
+    app = QtWidgets.QApplication.instance() or QtWidgets.QApplication(sys.argv[:1])  # noqa: F841
+    w, h = (int(v) for v in args.size.lower().split("x"))
+    capture = CaptureManager(SyntheticBackend(icons=40, speed=7))
+    # A few distinct frames, kept alive: the writer copies from their views.
+    images = [capture.grab_image(QtCore.QRect(100, 100, w, h)).copy() for _ in range(8)]
+    views = [frame_views.frame_view(image) for image in images]
+    name = f"lolmap-bench-{os.getpid()}"
+    writer = SharedFrameWriter(name, args.slots, w * h * 4)
+
+    alone = write_frames(writer, views, args.fps, 1.0)
+    context = multiprocessing.get_context("spawn")
+    results = context.Queue()
+    ready = context.Queue()
+    stop = context.Event()
+    holds = [0.0] * args.readers + [args.hold_ms / 1000.0]
+    readers = [context.Process(target=reader_process, args=(name, hold, ready, stop, results)) for hold in holds]
+    for process in readers:
+        process.start()
+    for _ in readers:
+        ready.get(timeout=30)
+    shared = write_frames(writer, views, args.fps, args.seconds)
+    # The last frame still has to be picked up.
+    time.sleep(0.2)
+    stop.set()
+    reports = [results.get(timeout=30) for _ in readers]
+    for process in readers:
+        process.join()
+    writer.close()
+
+    print(
+        f"region={args.size} fps={args.fps:g} slots={args.slots} frame={w * h * 4 / 1024:.0f} KiB, "
+        f"{len(shared)} frames written with readers attached"
+    )
+    print(f"{'writer':<22} {'p50 ms':>8} {'p99 ms':>8} {'max ms':>8}")
+    for label, samples in (("no readers", alone), (f"{len(readers)} readers", shared)):
+        print(f"{label:<22} {percentile(samples, 50):>8.3f} {percentile(samples, 99):>8.3f} {max(samples):>8.3f}")
+    print(f"\n{'reader':<22} {'seen':>6} {'valid':>6} {'torn':>5} {'lag p50':>8} {'lag max':>8}   (ms)")
+    failures = 0
+    # Reports arrive in finishing order; the slow reader is the one that saw fewest frames.
+    reports.sort(key=lambda r: r["seen"], reverse=True)
+    for i, report in enumerate(reports):
+        label = f"held {args.hold_ms:g} ms" if i == len(reports) - 1 else "fast"
+        print(
+            f"{label:<22} {report['seen']:>6} {report['valid']:>6} {report['torn']:>5} "
+            f"{report['lag_p50_ms']:>8.2f} {report['lag_max_ms']:>8.2f}"
+        )
+    # Readers must not slow the writer: its p50 stays within noise of writing alone.
+    if percentile(shared, 50) > 2 * percentile(alone, 50) + 0.2:
+        print("FAIL: readers slowed the writer")
+        failures += 1
+    # Readers skip to the newest frame rather than queueing, so a fast one stays within
+    # a couple of frames of the writer (how many it sees at all depends on spare cores).
+    interval_ms = 1000.0 / args.fps
+    for report in reports[:-1]:
+        if report["lag_p50_ms"] > 2 * interval_ms:
+            print(f"FAIL: a fast reader lags {report['lag_p50_ms']:.1f} ms behind the writer")
+            failures += 1
+    if not reports[0]["valid"]:
+        print("FAIL: no reader got a complete frame")
+        failures += 1
+    print(f"\n{failures} failure(s)")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,227 @@
+import argparse
+import base64
+import json
+import os
+import socket
+import struct
+import sys
+import threading
+import time
+import urllib.request
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+from PyQt6 import QtCore, QtWidgets  # noqa: E402
+from app.capture import CaptureManager, SyntheticBackend  # noqa: E402
+from app.stats import percentile  # noqa: E402
+from app.stream import StreamServer  # noqa: E402
+
+CHANNEL = 1
+# seq -> time.perf_counter() of the grab, for lag measured on the client side.
+PUBLISHED = {}
+
+
+class _Reader:
+    # Buffered reads from a socket, just enough for the two stream protocols.
+
+    def __init__(self, sock: socket.socket):
+        self._sock = sock
+        self._buf = b""
+
+    def exactly(self, n: int) -> bytes:
+        while len(self._buf) < n:
+            chunk = self._sock.recv(max(65536, n - len(self._buf)))
+            if not chunk:
+                raise ConnectionError("closed")
+            self._buf += chunk
+        out, self._buf = self._buf[:n], self._buf[n:]
+        return out
+
+    def line(self) -> bytes:
+        while b"\r\n" not in self._buf:
+            chunk = self._sock.recv(65536)
+            if not chunk:
+                raise ConnectionError("closed")
+            self._buf += chunk
+        out, self._buf = self._buf.split(b"\r\n", 1)
+        return out
+
+
+class Client(threading.Thread):
+    # Loopback viewer. `delay_s` after each frame makes it a slow client; its receive
+    # buffer is kept small too, like a slow link where the frames wait on the sender side.
+
+    def __init__(self, name: str, port: int, kind: str, delay_s: float = 0.0):
+        super().__init__(name=name, daemon=True)
+        self.label = name
+        self._port = port
+        self._kind = kind
+        self._delay = delay_s
+        self.frames = 0
+        self.bytes = 0
+        self.lag_ms = []  # grab to fully received, MJPEG only (the part names its frame)
+        self.stop = threading.Event()
+
+    def run(self):
+        sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        if self._delay:
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, 4 * 1024)
+        sock.connect(("127.0.0.1", self._port))
+        sock.settimeout(5.0)
+        reader = _Reader(sock)
+        try:
+            if self._kind == "mjpeg":
+                sock.sendall(f"GET /mjpeg/{CHANNEL} HTTP/1.1\r\nHost: localhost:{self._port}\r\n\r\n".encode())
+                self._headers(reader)
+                while not self.stop.is_set():
+                    self._mjpeg_frame(reader)
+            else:
+                key = base64.b64encode(os.urandom(16)).decode()
+                sock.sendall(
+                    f"GET /ws/{CHANNEL} HTTP/1.1\r\nHost: localhost:{self._port}\r\nUpgrade: websocket\r\n"
+                    f"Connection: Upgrade\r\nSec-WebSocket-Key: {key}\r\nSec-WebSocket-Version: 13\r\n\r\n".encode()
+                )
+                self._headers(reader)
+                while not self.stop.is_set():
+                    self._ws_frame(reader)
+            # Masked close frame, as a browser would send.
+            if self._kind == "websocket":
+                sock.sendall(b"\x88\x80\x00\x00\x00\x00")
+        except (OSError, ConnectionError):
+            pass
+        finally:
+            sock.close()
+
+    def _headers(self, reader: _Reader):
+        while reader.line():
+            pass
+
+    def _mjpeg_frame(self, reader: _Reader):
+        reader.line()  # boundary
+        length = seq = 0
+        while True:
+            line = reader.line()
+            if not line:
+                break
+            name, _, value = line.partition(b":")
+            if name.lower() == b"content-length":
+                length = int(value)
+            elif name.lower() == b"x-frame":
+                seq = int(value)
+        reader.exactly(length + 2)
+        if seq in PUBLISHED:
+            self.lag_ms.append((time.perf_counter() - PUBLISHED[seq]) * 1000.0)
+        self._got(length)
+
+    def _ws_frame(self, reader: _Reader):
+        head = reader.exactly(2)
+        length = head[1] & 0x7F
+        if length == 126:
+            (length,) = struct.unpack(">H", reader.exactly(2))
+        elif length == 127:
+            (length,) = struct.unpack(">Q", reader.exactly(8))
+        reader.exactly(length)
+        self._got(length)
+
+    def _got(self, length: int):
+        self.frames += 1
+        self.bytes += length
+        if self._delay:
+            time.sleep(self._delay)
+
+
+def publish(stream: StreamServer, size: tuple[int, int], fps: float, seconds: float) -> int:
+    # Captures synthetic frames at `fps` and publishes them like PreviewWindow does.
+    capture = CaptureManager(SyntheticBackend(icons=40, speed=7))
+    rect = QtCore.QRect(100, 100, *size)
+    frames = 0
+    t0 = time.perf_counter()
+    next_frame = t0
+    while time.perf_counter() - t0 < seconds:
+        image = capture.grab_image(rect)
+        frames += 1
+        PUBLISHED[frames] = now = time.perf_counter()
+        stream.publish(CHANNEL, image, frames, now)
+        next_frame += 1.0 / fps
+        time.sleep(max(0.0, next_frame - time.perf_counter()))
+    return frames
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Network stream over loopback: encode cost, bytes/s and per-client lag.")
+    parser.add_argument("--size", default="380x380", help="Captured region size.")
+    parser.add_argument("--fps", type=float, default=60.0)
+    parser.add_argument("--seconds", type=float, default=3.0)
+    parser.add_argument("--format", default="jpeg", choices=("jpeg", "png"))
+    parser.add_argument("--quality", type=int, default=80)
+    parser.add_argument("--encoders", type=int, default=2)
+    parser.add_argument("--clients", type=int, default=3, help="Fast MJPEG clients.")
+    parser.add_argument("--slow-ms", type=float, default=200.0, help="Per-frame stall of the slow client.")
+    args = parser.parse_args(argv)
+
+    app = QtWidgets.QApplication.instance() or QtWidgets.QApplication(sys.argv[:1])  # noqa: F841
+    size = tuple(int(v) for v in args.size.lower().split("x"))
+    stream = StreamServer("127.0.0.1", 0, args.encoders, args.format, args.quality)
+    stream.add_channel(CHANNEL)
+    stream.start()
+    port = stream.address[1]
+    failures = 0
+
+    # Nobody watching: frames are published but never encoded.
+    publish(stream, size, args.fps, 0.5)
+    idle = stream.stats()
+    print(f"no viewers: published {idle['published']}, encoded {idle['encoded']}")
+    if idle["encoded"]:
+        print("FAIL: frames were encoded without viewers")
+        failures += 1
+
+    clients = [Client(f"mjpeg {i + 1}", port, "mjpeg") for i in range(args.clients)]
+    clients.append(Client("websocket", port, "websocket"))
+    clients.append(Client("mjpeg slow", port, "mjpeg", args.slow_ms / 1000.0))
+    for client in clients:
+        client.start()
+    time.sleep(0.2)
+    before = stream.stats()
+    frames = publish(stream, size, args.fps, args.seconds)
+    with urllib.request.urlopen(f"http://127.0.0.1:{port}/stats.json", timeout=5) as response:
+        stats = json.loads(response.read())
+    for client in clients:
+        client.stop.set()
+    for client in clients:
+        client.join(2.0)
+    stream.stop()
+
+    encoded = stats["encoded"] - before["encoded"]
+    print(
+        f"{args.format} q{args.quality} region={args.size} encoders={args.encoders} fps={args.fps:g}: "
+        f"published {frames}, encoded {encoded}, superseded {stats['superseded']}, "
+        f"encode p50 {stats['encode_p50_ms']:.2f} ms max {stats['encode_max_ms']:.2f} ms, "
+        f"{stats['bytes_per_s'] / 1e6:.2f} MB/s out"
+    )
+    print(f"\n{'server side':<12} {'frames':>7} {'skipped':>8} {'KB/s':>8} {'lag p50':>8} {'lag max':>8}   (ms, grab to socket)")
+    for row in sorted(stats["clients"], key=lambda c: c["frames"], reverse=True):
+        print(
+            f"{row['kind']:<12} {row['frames']:>7} {row['skipped']:>8} {row['bytes_per_s'] / 1e3:>8.0f} "
+            f"{row['lag_p50_ms']:>8.1f} {row['lag_max_ms']:>8.1f}"
+        )
+    print(f"\n{'client side':<12} {'frames':>7} {'lag p50':>8} {'lag max':>8}   (ms, grab to received)")
+    for client in clients:
+        lag = client.lag_ms
+        p50 = f"{percentile(lag, 50):>8.1f} {max(lag):>8.1f}" if lag else f"{'-':>8} {'-':>8}"
+        print(f"{client.label:<12} {client.frames:>7} {p50}")
+    fast = clients[:-1]
+    slow = clients[-1]
+    # Fast viewers keep up with the encoder; the slow one drops frames instead of
+    # building a queue, so its lag stays within a few of its own per-frame stalls.
+    if min(c.frames for c in fast) < 0.8 * encoded:
+        print("FAIL: a fast client missed more than 20% of the encoded frames")
+        failures += 1
+    if slow.lag_ms and percentile(slow.lag_ms, 50) > 4 * args.slow_ms + 100:
+        print(f"FAIL: the slow client lags {percentile(slow.lag_ms, 50):.0f} ms; frames are queueing")
+        failures += 1
+    print(f"\n{failures} failure(s)")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
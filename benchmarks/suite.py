@@ -0,0 +1,190 @@
+import argparse
+import json
+import os
+import platform
+import socket
+import sys
+import time
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+from PyQt6 import QtCore, QtGui, QtWidgets  # noqa: E402
+from app.capture import CaptureManager, SyntheticBackend  # noqa: E402
+from app.capture_worker import Frame  # noqa: E402
+from app.config import CONFIG  # noqa: E402
+from app.overlay import SnipOverlay  # noqa: E402
+from app.preview import PreviewWindow  # noqa: E402
+from app.stats import percentile  # noqa: E402
+from app.style import Style  # noqa: E402
+
+BASELINE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baselines")
+
+# Minimap size at default HUD scale on 1080p, 1440p and 4K.
+REGIONS = {"1080p": (280, 280), "1440p": (380, 380), "4k": (560, 560)}
+ZOOMS = (1.0, 2.0, 4.0, CONFIG.zoom_max)
+WINDOWS = {"small": (360, 300), "large": (1000, 900)}
+DESKTOPS = {"1080p": (1920, 1080), "4k": (3840, 2160)}
+
+# Regressions smaller than this are timer noise, whatever the ratio says.
+NOISE_FLOOR_MS = 0.05
+
+
+def measure(fn, iterations: int, warmup: int) -> dict:
+    for _ in range(warmup):
+        fn()
+    samples = []
+    for _ in range(iterations):
+        t0 = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - t0) * 1000.0)
+    return {
+        "p50_ms": percentile(samples, 50),
+        "p95_ms": percentile(samples, 95),
+        "mean_ms": sum(samples) / len(samples),
+    }
+
+
+def capture_cases():
+    capture = CaptureManager(SyntheticBackend())
+    for name, (w, h) in REGIONS.items():
+        rect = QtCore.QRect(0, 0, w, h)
+        yield f"capture.grab_images[{name}]", lambda rect=rect: capture.grab_images([rect])
+        # Region straddling two screens takes the compose path.
+        seam = QtCore.QRect(-w // 2, 0, w, h)
+        yield f"capture.grab_images.compose[{name}]", lambda seam=seam: capture.grab_images([seam])
+
+
+def preview_cases():
+    preview = PreviewWindow(lambda: None, lambda: None, lambda: None, CONFIG, "bench")
+    preview.show()
+    try:
+        yield from _preview_matrix(preview)
+    finally:
+        preview.shutdown()
+
+
+def _preview_matrix(preview: PreviewWindow):
+    capture = CaptureManager(SyntheticBackend())
+    for region, (w, h) in REGIONS.items():
+        rect = QtCore.QRect(0, 0, w, h)
+        image = capture.grab_image(rect)
+        for window, (ww, wh) in WINDOWS.items():
+            preview.resize(ww, wh)
+            QtWidgets.QApplication.processEvents()
+            target = QtGui.QImage(preview._canvas.size(), QtGui.QImage.Format.Format_ARGB32_Premultiplied)
+            for zoom in ZOOMS:
+                key = f"[{region},{window},{zoom:g}x]"
+
+                def update_frame(rect=rect, image=image, zoom=zoom, target=target):
+                    # Feed the mailbox directly instead of running the capture thread.
+                    preview._rect = rect
+                    preview._canvas.set_zoom(zoom)
+                    preview._capture._running = True
+                    preview._capture.mailbox.put(Frame(0, image, time.perf_counter(), 0.0))
+                    preview._update_frame()
+                    preview._canvas.render(target)
+
+                def render_pixmap(rect=rect, zoom=zoom, target=target):
+                    preview._rect = rect
+                    preview._canvas.set_zoom(zoom)
+                    preview._render_pixmap()
+                    preview._canvas.render(target)
+
+                yield f"preview.update_frame{key}", update_frame
+                yield f"preview.render_pixmap{key}", render_pixmap
+
+
+def overlay_cases():
+    overlay = SnipOverlay(CONFIG)
+    for name, (w, h) in DESKTOPS.items():
+        target = QtGui.QImage(w, h, QtGui.QImage.Format.Format_ARGB32_Premultiplied)
+
+        def paint(w=w, h=h, target=target):
+            overlay.setGeometry(0, 0, w, h)
+            overlay._origin = QtCore.QPointF(w // 2, h // 2)
+            overlay._current = QtCore.QPointF(w // 2 + 300, h // 2 + 300)
+            overlay._last_pos = overlay._current
+            overlay.render(target)
+
+        yield f"overlay.paint[{name}]", paint
+
+
+def run(iterations: int, warmup: int, only: str | None) -> dict:
+    results = {}
+    for group in (capture_cases, preview_cases, overlay_cases):
+        for case_id, fn in group():
+            if only and only not in case_id:
+                continue
+            results[case_id] = measure(fn, iterations, warmup)
+            print(f"{case_id:<55} p50 {results[case_id]['p50_ms']:8.3f} ms  p95 {results[case_id]['p95_ms']:8.3f} ms")
+    return results
+
+
+def compare(results: dict, baseline: dict, tolerance: float) -> list[str]:
+    failures = []
+    for case_id, base in baseline["results"].items():
+        current = results.get(case_id)
+        if current is None:
+            continue
+        limit = base["p50_ms"] * (1.0 + tolerance)
+        if current["p50_ms"] > limit and current["p50_ms"] - base["p50_ms"] > NOISE_FLOOR_MS:
+            failures.append(
+                f"{case_id}: p50 {current['p50_ms']:.3f} ms vs baseline {base['p50_ms']:.3f} ms "
+                f"(+{(current['p50_ms'] / base['p50_ms'] - 1.0):.0%}, tolerance {tolerance:.0%})"
+            )
+    return failures
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Capture/render benchmark suite with regression thresholds.")
+    parser.add_argument("--iterations", type=int, default=60)
+    parser.add_argument("--warmup", type=int, default=5)
+    parser.add_argument("--only", help="Run cases whose id contains this text.")
+    parser.add_argument("--output", help="Write results as JSON to this path.")
+    parser.add_argument(
+        "--machine",
+        default=socket.gethostname(),
+        help="Baseline name; baselines are stored per machine in benchmarks/baselines/<machine>.json.",
+    )
+    parser.add_argument("--tolerance", type=float, default=0.25, help="Allowed p50 slowdown vs baseline.")
+    parser.add_argument("--update-baseline", action="store_true", help="Store these results as the baseline.")
+    args = parser.parse_args(argv)
+
+    app = QtWidgets.QApplication.instance() or QtWidgets.QApplication(sys.argv[:1])
+    app.setStyleSheet(Style.BASE)
+    results = run(args.iterations, args.warmup, args.only)
+    report = {
+        "machine": args.machine,
+        "platform": f"{platform.system()} {platform.release()} / Qt {QtCore.QT_VERSION_STR} / {app.platformName()}",
+        "python": platform.python_version(),
+        "iterations": args.iterations,
+        "results": results,
+    }
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+
+    baseline_path = os.path.join(BASELINE_DIR, f"{args.machine}.json")
+    if args.update_baseline:
+        os.makedirs(BASELINE_DIR, exist_ok=True)
+        with open(baseline_path, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"Baseline written: {baseline_path}")
+        return 0
+    if not os.path.exists(baseline_path):
+        print(f"No baseline for '{args.machine}'; run with --update-baseline to create {baseline_path}.")
+        return 0
+
+    with open(baseline_path) as f:
+        failures = compare(results, json.load(f), args.tolerance)
+    if failures:
+        print(f"\n{len(failures)} regression(s) against {baseline_path}:")
+        for line in failures:
+            print(f"  {line}")
+        return 1
+    print(f"\nNo regressions against {baseline_path}.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,123 @@
+import argparse
+import os
+import sys
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+from PyQt6 import QtCore, QtGui, QtWidgets  # noqa: E402
+from app.tracker import MinimapTracker  # noqa: E402
+from benchmarks.minimap import edge_error, make_scene  # noqa: E402
+
+
+class SceneSource:
+    # A fake single-screen desktop the tracker grabs from; tests swap the picture.
+
+    def __init__(self, desktop: QtGui.QImage):
+        self.desktop = desktop
+        self.grabs = 0
+
+    def screen_rect(self, point: QtCore.QPoint) -> QtCore.QRect | None:
+        return self.desktop.rect() if self.desktop.rect().contains(point) else None
+
+    def grab(self, rect: QtCore.QRect) -> QtGui.QImage:
+        self.grabs += 1
+        return self.desktop.copy(rect.intersected(self.desktop.rect()))
+
+
+def desktop(size: tuple[int, int], game: tuple[int, int] | None, offset: tuple[int, int], frac: float, seed: int):
+    # The game (borderless when it fills the screen, windowed otherwise) on a plain
+    # desktop; no game at all when `game` is None.
+    image = QtGui.QImage(size[0], size[1], QtGui.QImage.Format.Format_RGB32)
+    image.fill(QtGui.QColor(32, 64, 96))
+    if game is None:
+        return image, None
+    scene, minimap = make_scene(game[0], game[1], frac, "right", seed)
+    painter = QtGui.QPainter(image)
+    painter.drawImage(QtCore.QPoint(*offset), scene)
+    painter.end()
+    return image, minimap.translated(*offset)
+
+
+def run_frames(tracker: MinimapTracker, source: SceneSource, rect: QtCore.QRect, count: int, fps: float, t0: float):
+    # Feeds `count` frames of `rect` at `fps`; follows the tracker like PreviewWindow does.
+    moved_at = None
+    for i in range(count):
+        frame = source.desktop.copy(rect)
+        moved = tracker.check(frame, rect, t0 + i / fps)
+        if moved is not None:
+            rect = moved
+            if moved_at is None:
+                moved_at = i
+    return rect, moved_at
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Minimap tracker: per-frame cost and relocation after game changes.")
+    parser.add_argument("--frames", type=int, default=600, help="Frames per phase.")
+    parser.add_argument("--fps", type=float, default=60.0)
+    parser.add_argument("--interval-ms", type=int, default=500)
+    parser.add_argument("--tolerance-px", type=int, default=4)
+    args = parser.parse_args(argv)
+
+    QtWidgets.QApplication.instance() or QtWidgets.QApplication(sys.argv[:1])
+    screen = (2560, 1440)
+    start, minimap = desktop(screen, screen, (0, 0), 0.26, 1)
+    source = SceneSource(start)
+    tracker = MinimapTracker(args.interval_ms / 1000.0, source)
+
+    rect, _ = run_frames(tracker, source, QtCore.QRect(minimap), args.frames, args.fps, 0.0)
+    steady = tracker.stats()
+    print(
+        f"steady: {args.frames} frames at {args.fps:g} fps, state {steady['state']}, {steady['checks']} checks, "
+        f"check p50 {steady['check_p50_ms']:.3f} ms, {steady['ms_per_frame']:.4f} ms/frame "
+        f"(lock search {steady['search_max_ms']:.1f} ms)"
+    )
+
+    phases = (
+        ("windowed 1600x900", (1600, 900), (300, 200), 0.26),
+        ("game minimised", None, (0, 0), 0.26),
+        ("borderless again", screen, (0, 0), 0.26),
+        ("HUD scale up", screen, (0, 0), 0.33),
+        ("windowed 1920x1080", (1920, 1080), (40, 60), 0.33),
+    )
+    failures = 0
+    print(f"\n{'change':<22} {'moved after':>12} {'search ms':>10} {'ms/frame':>9} {'err':>4}")
+    t = args.frames / args.fps
+    for i, (name, game, offset, frac) in enumerate(phases):
+        source.desktop, expected = desktop(screen, game, offset, frac, i + 2)
+        previous = QtCore.QRect(rect)
+        before = tracker.total_ms, tracker.frames
+        tracker.search_ms.clear()
+        rect, moved_at = run_frames(tracker, source, rect, args.frames, args.fps, t)
+        t += args.frames / args.fps
+        stats = tracker.stats()
+        per_frame = (tracker.total_ms - before[0]) / max(1, tracker.frames - before[1])
+        if expected is None:
+            # Nothing to follow: the rect stays put and the tracker backs off.
+            err = edge_error(rect, previous)
+            ok = moved_at is None and stats["state"] == "lost"
+        else:
+            err = edge_error(rect, expected)
+            ok = moved_at is not None and err <= args.tolerance_px and stats["state"] == "locked"
+        failures += not ok
+        moved = f"{moved_at} frames" if moved_at is not None else "never"
+        print(
+            f"{name:<22} {moved:>12} {tracker.search_ms.max():>10.1f} {per_frame:>9.4f} "
+            f"{err:>4}{'' if ok else '  FAIL'}"
+        )
+    # The game closed for good: after track_max_misses searches the tracker stops
+    # grabbing altogether.
+    source.desktop, _ = desktop(screen, None, (0, 0), 0.26, len(phases) + 2)
+    run_frames(tracker, source, rect, args.frames * 8, args.fps, t)
+    t += args.frames * 8 / args.fps
+    grabs = source.grabs
+    run_frames(tracker, source, rect, args.frames, args.fps, t)
+    ok = tracker.state == "stopped" and source.grabs == grabs
+    failures += not ok
+    print(f"{'game closed':<22} {'state ' + tracker.state:>12} {source.grabs - grabs:>10} grabs after{'' if ok else '  FAIL'}")
+    print(f"\n{failures} failure(s)")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
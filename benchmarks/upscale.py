@@ -0,0 +1,73 @@
+import argparse
+import os
+import sys
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+from PyQt6 import QtCore, QtGui, QtWidgets  # noqa: E402
+from app.capture import CaptureManager, SyntheticBackend  # noqa: E402
+from app.stats import percentile  # noqa: E402
+from app.upscale import Upscaler, mode_for  # noqa: E402
+from benchmarks.render import time_frames  # noqa: E402
+
+ZOOMS = (1.5, 2.0, 2.5, 3.0, 3.5, 4.0, 5.0, 6.0)
+
+
+def bench_qt(pix: QtGui.QPixmap, zoom: float, mode: QtCore.Qt.TransformationMode):
+    # The Qt path: a full scaled copy of the frame per present.
+    size = QtCore.QSize(round(pix.width() * zoom), round(pix.height() * zoom))
+
+    def frame():
+        pix.scaled(size, QtCore.Qt.AspectRatioMode.IgnoreAspectRatio, mode)
+
+    return frame
+
+
+def bench_engine(upscaler: Upscaler, image: QtGui.QImage, zoom: float, sharpen: bool):
+    # Built with cache_size=0 every call resamples, as for each new live frame; with the
+    # cache on, repeating the frame measures a cache hit instead.
+    def frame():
+        upscaler.upscale(image, zoom, sharpen)
+
+    return frame
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Minimap upscaling: Qt smooth/fast scaled() vs the NumPy upscaler.")
+    parser.add_argument("--sizes", nargs="+", default=["280x280", "380x380", "560x560"], help="Captured region sizes.")
+    parser.add_argument("--zooms", nargs="+", type=float, default=list(ZOOMS))
+    parser.add_argument("--frames", type=int, default=30)
+    args = parser.parse_args(argv)
+
+    app = QtWidgets.QApplication.instance() or QtWidgets.QApplication(sys.argv[:1])
+    print(f"platform={app.platformName()} frames={args.frames}")
+    print(
+        f"{'region':>9} {'zoom':>5} {'mode':>10} {'qt smooth':>10} {'qt fast':>8} "
+        f"{'engine':>8} {'sharpen':>8} {'speedup':>8} {'cached':>8}   (p50 ms)"
+    )
+    upscaler = Upscaler(cache_size=0)
+    cached = Upscaler()
+    for size in args.sizes:
+        w, h = (int(v) for v in size.lower().split("x"))
+        image = CaptureManager(SyntheticBackend()).grab_image(QtCore.QRect(0, 0, w, h))
+        pix = QtGui.QPixmap.fromImage(image)
+        for zoom in args.zooms:
+            smooth = percentile(time_frames(args.frames, bench_qt(pix, zoom, QtCore.Qt.TransformationMode.SmoothTransformation)), 50)
+            fast = percentile(time_frames(args.frames, bench_qt(pix, zoom, QtCore.Qt.TransformationMode.FastTransformation)), 50)
+            engine = percentile(time_frames(args.frames, bench_engine(upscaler, image, zoom, False)), 50)
+            sharp = percentile(time_frames(args.frames, bench_engine(upscaler, image, zoom, True)), 50)
+            hit = percentile(time_frames(args.frames, bench_engine(cached, image, zoom, False)), 50)
+            print(
+                f"{size:>9} {zoom:>5.2f} {mode_for(zoom, False):>10} {smooth:>10.3f} {fast:>8.3f} "
+                f"{engine:>8.3f} {sharp:>8.3f} {smooth / engine:>7.1f}x {hit:>8.3f}"
+            )
+    stats = upscaler.stats()
+    print(f"\nframes {stats['frames']}, cached index maps {stats['cached_maps']}")
+    stats = cached.stats()
+    calls = stats["frames"] + stats["cache_hits"]
+    print(f"cached column: {stats['cache_hits']} of {calls} calls were cache hits ({stats['cache_hits'] / max(1, calls):.0%})")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
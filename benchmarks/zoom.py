@@ -0,0 +1,112 @@
+import argparse
+import os
+import sys
+import time
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+from PyQt6 import QtCore, QtGui, QtWidgets  # noqa: E402
+from app.capture import SyntheticBackend  # noqa: E402
+from app.config import CONFIG  # noqa: E402
+from app.preview import PreviewWindow  # noqa: E402
+
+
+def wheel(preview: PreviewWindow, up: bool):
+    pos = QtCore.QPointF(preview.width() / 2, preview.height() / 2)
+    event = QtGui.QWheelEvent(
+        pos,
+        QtCore.QPointF(preview.mapToGlobal(pos)),
+        QtCore.QPoint(),
+        QtCore.QPoint(0, 120 if up else -120),
+        QtCore.Qt.MouseButton.NoButton,
+        QtCore.Qt.KeyboardModifier.NoModifier,
+        QtCore.Qt.ScrollPhase.NoScrollPhase,
+        False,
+    )
+    QtWidgets.QApplication.sendEvent(preview, event)
+
+
+def run_phase(preview: PreviewWindow, seconds: float, wheel_hz: float) -> dict:
+    # Runs the event loop for `seconds`, sending wheel ticks at `wheel_hz` (0: none) in
+    # bursts that alternate direction, like a user scrolling back and forth.
+    before = preview.perf_counters()
+    grabs = preview._capture.stats()["screen_grabs"]
+    wheels = 0
+    t0 = time.perf_counter()
+    next_wheel = t0
+    while time.perf_counter() - t0 < seconds:
+        now = time.perf_counter()
+        if wheel_hz and now >= next_wheel:
+            wheel(preview, (wheels // 10) % 2 == 0)
+            wheels += 1
+            next_wheel += 1.0 / wheel_hz
+        QtWidgets.QApplication.processEvents(QtCore.QEventLoop.ProcessEventsFlag.AllEvents, 1)
+    # Let the last glide finish.
+    end = time.perf_counter() + CONFIG.zoom_animation_ms / 1000.0 + 0.1
+    while time.perf_counter() < end:
+        QtWidgets.QApplication.processEvents(QtCore.QEventLoop.ProcessEventsFlag.AllEvents, 1)
+    after = preview.perf_counters()
+    return {
+        "wheels": wheels,
+        "grabs": preview._capture.stats()["screen_grabs"] - grabs,
+        "presented": after["presented"] - before["presented"],
+        "renders": after["renders"] - before["renders"],
+        "upscales": after.get("upscale_frames", 0) - before.get("upscale_frames", 0),
+        "cache_hits": after.get("upscale_cache_hits", 0) - before.get("upscale_cache_hits", 0),
+    }
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Zoom bursts: captures and renders per wheel event, live and frozen.")
+    parser.add_argument("--seconds", type=float, default=1.0, help="Length of each phase.")
+    parser.add_argument("--wheel-hz", type=float, default=250.0, help="Wheel events per second during a burst.")
+    parser.add_argument("--quality", default="pixel")
+    parser.add_argument("--size", default="380x380", help="Captured region size.")
+    args = parser.parse_args(argv)
+
+    app = QtWidgets.QApplication.instance() or QtWidgets.QApplication(sys.argv[:1])  # noqa: F841
+    w, h = (int(v) for v in args.size.lower().split("x"))
+    preview = PreviewWindow(lambda: None, lambda: None, lambda: None, CONFIG, "bench")
+    preview._capture.capture._backend = SyntheticBackend(icons=40, speed=7)
+    preview.resize(640, 520)
+    preview.show()
+    preview._set_quality(args.quality)
+    preview.set_rect(QtCore.QRect(0, 0, w, h))
+    run_phase(preview, 0.3, 0)
+
+    print(f"quality={args.quality} region={args.size} wheel={args.wheel_hz:g}/s phases={args.seconds:g}s")
+    print(f"{'phase':<18} {'wheels':>7} {'grabs':>6} {'presented':>10} {'renders':>8} {'upscales':>9} {'cache hits':>11}")
+    failures = 0
+    phases = [("live, no wheel", None, 0.0), ("live, wheel burst", None, args.wheel_hz)]
+    phases += [("frozen, wheel", True, args.wheel_hz), ("frozen, no wheel", True, 0.0)]
+    results = {}
+    for name, freeze, hz in phases:
+        if freeze and not preview._frozen:
+            preview._toggle_freeze()
+        r = results[name] = run_phase(preview, args.seconds, hz)
+        print(
+            f"{name:<18} {r['wheels']:>7} {r['grabs']:>6} {r['presented']:>10} {r['renders']:>8} "
+            f"{r['upscales']:>9} {r['cache_hits']:>11}"
+        )
+    # Zooming must not capture: a burst costs no more grabs than the same time idle
+    # (give or take the adaptive rate), and a frozen window grabs nothing.
+    live, burst, frozen = results["live, no wheel"], results["live, wheel burst"], results["frozen, wheel"]
+    if burst["grabs"] > live["grabs"] * 1.5 + 2:
+        print("FAIL: wheel events caused captures")
+        failures += 1
+    if frozen["grabs"]:
+        print("FAIL: a frozen window captured while zooming")
+        failures += 1
+    # Renders are coalesced: at most one per display frame on top of the presented frames.
+    rate = preview.screen().refreshRate() or 60.0
+    budget = (args.seconds + CONFIG.zoom_animation_ms / 1000.0 + 0.1) * rate + 2
+    if frozen["renders"] > budget:
+        print(f"FAIL: {frozen['renders']} renders for {frozen['wheels']} wheel events (budget {budget:.0f})")
+        failures += 1
+    preview.shutdown()
+    print(f"\n{failures} failure(s)")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,10 +1,15 @@
 #!/usr/bin/env python3
 
+from app.startup import STARTUP
+import multiprocessing
 import sys
 from app.application import App
 
 
 def main():
+    # Filter worker processes are spawned; a frozen .exe has to hand them over here.
+    multiprocessing.freeze_support()
+    STARTUP.mark("imports done")
     app = App(sys.argv)
     sys.exit(app.exec())
 